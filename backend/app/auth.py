@@ -1,21 +1,32 @@
 import os
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
 from . import database, models
+from .cache import TTLCache
+from .hashing import pwd_context
 
 SECRET_KEY = os.getenv("SECRET_KEY", "secret_key_change_me")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# token -> (email, exp) and email -> detached User snapshot. Other workers only see a
+# change once USER_CACHE_TTL passes, so keep it short.
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+token_cache = TTLCache("auth_tokens", maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+user_cache = TTLCache("auth_users", maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
 
+
+# Synchronous variants for scripts and seeding; request handlers use the hashing pool
 def verify_password(plain, hashed):
 	return pwd_context.verify(plain, hashed)
 
@@ -31,16 +42,58 @@ def create_access_token(data: dict):
 	return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+def _decode(token: str) -> str:
+	"""Return the token's subject, verifying signature and expiry at most once per TTL."""
+	cached = token_cache.get(token)
+	if cached and cached[1] > time.time(): return cached[0]
+	payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+	email = payload.get("sub")
+	if email is None: raise JWTError("missing subject")
+	token_cache.set(token, (email, payload["exp"]))
+	return email
+
+
+def _snapshot(user: models.User) -> models.User:
+	"""Copy of the loaded columns, detached from any session, safe to share between requests."""
+	copy = models.User(**{c.key: getattr(user, c.key) for c in inspect(models.User).column_attrs})
+	make_transient_to_detached(copy)
+	return copy
+
+
+def invalidate_user(email: str):
+	user_cache.pop(email)
+
+
+@event.listens_for(models.User, "after_update")
+def _user_changed(mapper, conn, target):
+	# Profile edits, deactivation and admin changes all go through a flush of User. Evicting
+	# here would let a concurrent request re-cache the old row before the commit, so the
+	# emails wait in the session until it commits.
+	state = inspect(target)
+	changed = state.session.info.setdefault("changed_users", set())
+	changed.add(target.email)
+	changed.update(state.attrs.email.history.deleted or ())
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_changed_users(session):
+	for email in session.info.pop("changed_users", ()): invalidate_user(email)
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(database.get_db)):
 	exception = HTTPException(status_code=401, detail="Invalid credentials", headers={"WWW-Authenticate": "Bearer"})
 	try:
-		payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-		email: str = payload.get("sub")
-		if email is None: raise exception
+		email = _decode(token)
 	except JWTError:
 		raise exception
 
-	user = db.query(models.User).filter(models.User.email == email).first()
+	snapshot = user_cache.get(email)
+	if snapshot is not None:
+		# Attach a copy to this request's session without a round trip
+		user = await db.merge(snapshot, load=False)
+	else:
+		user = await db.scalar(select(models.User).where(models.User.email == email))
+		if user is not None: user_cache.set(email, _snapshot(user))
 	if user is None or not user.is_active: raise exception
 	return user
 
@@ -0,0 +1,66 @@
+"""
+Small in-process caches.
+
+TTLCache is a bounded LRU map whose entries also expire after `ttl` seconds. Every
+instance registers itself by name so hit/miss counters can be reported in one place.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+_MISSING = object()
+registry = {}
+
+
+class TTLCache:
+	def __init__(self, name: str, maxsize: int = 1024, ttl: float = 60.0):
+		self.name = name
+		self.maxsize = maxsize
+		self.ttl = ttl
+		self.hits = 0
+		self.misses = 0
+		self._data = OrderedDict()
+		self._lock = threading.Lock()
+		registry[name] = self
+
+	def get(self, key: Hashable, default: Any = None) -> Any:
+		with self._lock:
+			entry = self._data.get(key, _MISSING)
+			if entry is not _MISSING and entry[0] > time.monotonic():
+				self._data.move_to_end(key)
+				self.hits += 1
+				return entry[1]
+			if entry is not _MISSING:
+				del self._data[key]
+			self.misses += 1
+			return default
+
+	def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+		with self._lock:
+			self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+			self._data.move_to_end(key)
+			while len(self._data) > self.maxsize:
+				self._data.popitem(last=False)
+
+	def pop(self, key: Hashable):
+		with self._lock:
+			self._data.pop(key, None)
+
+	def clear(self):
+		with self._lock:
+			self._data.clear()
+
+	def stats(self) -> dict:
+		total = self.hits + self.misses
+		return {
+			"size": len(self._data),
+			"maxsize": self.maxsize,
+			"hits": self.hits,
+			"misses": self.misses,
+			"hit_rate": round(self.hits / total, 4) if total else 0.0,
+		}
+
+
+def stats() -> dict:
+	return {name: cache.stats() for name, cache in registry.items()}
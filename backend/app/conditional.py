@@ -0,0 +1,49 @@
+"""
+Conditional GET support.
+
+Responses are rendered once to JSON bytes with a strong ETag (a hash of those bytes).
+Hierarchy routes cache the rendered bytes in `hierarchy`, so a matching If-None-Match
+is answered with 304 before anything is loaded or serialised; paged routes render per
+request and save the client the transfer.
+"""
+import hashlib
+from functools import lru_cache
+from typing import Any, NamedTuple, Optional
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+# Cache-Control per kind of route
+HIERARCHY = "public, max-age=60"
+LISTING = "public, no-cache"
+PRIVATE = "private, no-cache"
+
+
+class Rendered(NamedTuple):
+	body: bytes
+	etag: str
+
+
+@lru_cache(maxsize=None)
+def _adapter(type_) -> TypeAdapter:
+	return TypeAdapter(type_)
+
+
+def render(type_, data: Any) -> Rendered:
+	"""Validate `data` (ORM objects or dicts) as `type_` and serialise it."""
+	adapter = _adapter(type_)
+	body = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+	return Rendered(body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+
+
+def matches(if_none_match: Optional[str], etag: str) -> bool:
+	if not if_none_match: return False
+	# If-None-Match uses weak comparison: W/"x" matches "x"
+	candidates = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+	return "*" in candidates or etag in candidates
+
+
+def respond(request: Request, rendered: Rendered, cache_control: str) -> Response:
+	headers = {"ETag": rendered.etag, "Cache-Control": cache_control}
+	if matches(request.headers.get("if-none-match"), rendered.etag):
+		return Response(status_code=304, headers=headers)
+	return Response(rendered.body, media_type="application/json", headers=headers)
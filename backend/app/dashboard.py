@@ -0,0 +1,70 @@
+"""
+The signed-in user's dashboard: their approved notes, their favorites and everything
+they submitted that still awaits moderation.
+
+Three queries whatever the user's history: one keyset page of notes, one of favorites,
+and a single UNION ALL over the five moderated tables (at most MAX_PENDING rows). The
+rendered response is cached per user for DASHBOARD_CACHE_TTL seconds. The user's own
+writes call `invalidate()`, and moderation clears the whole cache of the worker that
+applied it (see main._invalidate_dashboards). Writes and moderation handled by other
+workers show up when the entry expires.
+"""
+import os
+import time
+from typing import Optional
+from sqlalchemy import literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from . import conditional, models, schemas
+from .cache import TTLCache
+from .pagination import paginate
+
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "30"))
+DASHBOARD_CACHE_SIZE = int(os.getenv("DASHBOARD_CACHE_SIZE", "4096"))
+MAX_PENDING = 100
+
+cache = TTLCache("dashboards", maxsize=DASHBOARD_CACHE_SIZE, ttl=DASHBOARD_CACHE_TTL)
+# user id -> version; outlives the entries it keys, so an expired version never revives one
+_versions = TTLCache("dashboard_versions", maxsize=DASHBOARD_CACHE_SIZE, ttl=DASHBOARD_CACHE_TTL * 2)
+
+_note_options = (joinedload(models.Note.author), joinedload(models.Note.subject))
+
+
+def invalidate(user_id: int):
+	"""Drop this worker's cached dashboards of `user_id`. Call after committing their write."""
+	_versions.set(user_id, time.monotonic_ns())
+
+
+def _pending(user_id: int):
+	Note, University, Faculty = models.Note, models.University, models.Faculty
+	FieldOfStudy, Subject = models.FieldOfStudy, models.Subject
+	parts = [
+		select(literal("note").label("type"), Note.id, Note.title.label("name"))
+		.where(Note.author_id == user_id, Note.is_approved == False),
+		*(select(literal(type).label("type"), model.id, model.name)
+		  .where(model.submitted_by_id == user_id, model.is_approved == False)
+		  for type, model in (("university", University), ("faculty", Faculty),
+		                      ("field", FieldOfStudy), ("subject", Subject))),
+	]
+	return union_all(*parts).limit(MAX_PENDING)
+
+
+async def load(db: AsyncSession, user_id: int, notes_cursor: Optional[str], favorites_cursor: Optional[str],
+               limit: int) -> conditional.Rendered:
+	key = (user_id, _versions.get(user_id, 0), notes_cursor, favorites_cursor, limit)
+	rendered = cache.get(key)
+	if rendered is not None: return rendered
+
+	notes = select(models.Note).options(*_note_options) \
+		.where(models.Note.author_id == user_id, models.Note.is_approved == True)
+	favorites = select(models.Note).options(*_note_options) \
+		.join(models.Favorite, models.Favorite.note_id == models.Note.id) \
+		.where(models.Favorite.user_id == user_id, models.Note.is_approved == True)
+	rendered = conditional.render(schemas.UserDashboard, {
+		"my_notes": await paginate(db, notes, (models.Note.created_at, models.Note.id), notes_cursor, limit),
+		"my_favorites": await paginate(db, favorites, (models.Favorite.created_at, models.Favorite.id),
+		                               favorites_cursor, limit),
+		"pending_submissions": [row._asdict() for row in await db.execute(_pending(user_id))],
+	})
+	cache.set(key, rendered)
+	return rendered
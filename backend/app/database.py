@@ -1,19 +1,105 @@
+import asyncio
+import fcntl
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
 
 # Use environment variable or default local DB
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://postgres:postgres@db:5432/colloq_db")
+# Optional read replica for read-only routes (see get_read_db)
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+
+# Connection pool, per engine and worker process. Ignored for SQLite, which does not pool.
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+# After a failed replica connection, reads go to the primary for this long
+REPLICA_RETRY = float(os.getenv("DB_REPLICA_RETRY", "30"))
+
+# Async drivers for plain URLs (docker-compose passes postgresql://...)
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_url(url: str):
+    url = make_url(url)
+    if url.drivername in ASYNC_DRIVERS:
+        url = url.set(drivername=ASYNC_DRIVERS[url.drivername])
+    return url
+
+
+def create_engine(url: str):
+    url = async_url(url)
+    if url.get_backend_name() == "sqlite":
+        return create_async_engine(url)
+    return create_async_engine(
+        url, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE, pool_pre_ping=POOL_PRE_PING,
+    )
+
 
 engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+read_engine = create_engine(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else engine
+# expire_on_commit=False: objects stay readable after commit without an implicit (sync) reload
+SessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+ReadSessionLocal = async_sessionmaker(read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+_replica_down_until = 0.0
 
 Base = declarative_base()
 
-def get_db():
+
+def insert(table):
+    """Dialect-specific INSERT, for on_conflict_do_nothing/do_update upserts."""
+    return (postgresql.insert if engine.dialect.name == "postgresql" else sqlite.insert)(table)
+
+
+async def get_db():
     """Dependency for getting DB session."""
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
+
+
+async def get_read_db():
+    """
+    Session for read-only routes that tolerate replica lag: the replica when one is
+    configured and reachable, otherwise the primary. Never write through it.
+    """
+    global _replica_down_until
+    if read_engine is not engine and time.monotonic() >= _replica_down_until:
+        async with ReadSessionLocal() as db:
+            try:
+                await db.connection()
+            except (DBAPIError, OSError):
+                _replica_down_until = time.monotonic() + REPLICA_RETRY
+            else:
+                yield db
+                return
+    async with SessionLocal() as db:
+        yield db
+
+
+@asynccontextmanager
+async def locked(name: str):
+    """
+    Connection in a transaction that holds the cluster-wide lock `name` until it commits
+    or rolls back: pg_advisory_xact_lock on Postgres, a file lock next to a SQLite database.
+    """
+    if engine.dialect.name == "postgresql":
+        async with engine.begin() as conn:
+            await conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": name})
+            yield conn
+        return
+    path = f"{engine.url.database}.{name}.lock" if engine.url.database not in (None, "", ":memory:") \
+        else os.path.join(tempfile.gettempdir(), f"colloq.{name}.lock")
+    with open(path, "a") as f:
+        await asyncio.to_thread(fcntl.flock, f.fileno(), fcntl.LOCK_EX)
+        async with engine.begin() as conn:
+            yield conn
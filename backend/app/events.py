@@ -0,0 +1,249 @@
+"""
+Live note and university events, pushed to browsers over Server-Sent Events.
+
+Write paths call `publish(topic, type, data)` after committing; topics are "note:<id>"
+and "university:<id>". The backend carries each event to every worker, whose broker
+fans it out to its own subscribers:
+
+	LocalBackend  - per process (default)
+	FileBackend   - a JSON-lines file shared by all workers on one host, tailed every
+	                EVENTS_POLL seconds and rotated at EVENTS_FILE_MAX bytes; a stand-in
+	                for Redis pub/sub or Postgres LISTEN/NOTIFY.
+
+Select with EVENTS_BACKEND=file:/path/to/events.log.
+
+Backpressure: each subscriber has a queue of EVENTS_QUEUE_SIZE events. A subscriber that
+falls that far behind has its backlog dropped and gets one "resync" event instead, telling
+the client to refetch; publishers never wait on slow consumers. A worker accepts at most
+EVENTS_MAX_SUBSCRIBERS streams (503 beyond that).
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import AsyncIterator, Dict, Optional, Set
+
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+EVENTS_MAX_SUBSCRIBERS = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", "2000"))
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "15"))
+EVENTS_POLL = float(os.getenv("EVENTS_POLL", "0.2"))
+EVENTS_FILE_MAX = int(os.getenv("EVENTS_FILE_MAX", str(16 * 1024 * 1024)))
+# Sent to clients as the SSE reconnection delay
+RETRY_MS = 3000
+
+log = logging.getLogger(__name__)
+
+
+class Stats:
+	def __init__(self):
+		self.published: Dict[str, int] = defaultdict(int)
+		self.delivered = 0
+		self.resyncs = 0
+		self.rejected = 0
+
+	def as_dict(self) -> dict:
+		return {"subscribers": broker.counts(), "published": dict(self.published), "delivered": self.delivered,
+		        "resyncs": self.resyncs, "rejected": self.rejected}
+
+
+stats = Stats()
+
+
+class Subscriber:
+	def __init__(self, topic: str):
+		self.topic = topic
+		self.queue: asyncio.Queue = asyncio.Queue(EVENTS_QUEUE_SIZE)
+
+	def offer(self, message: dict):
+		try:
+			self.queue.put_nowait(message)
+		except asyncio.QueueFull:
+			# Too far behind: drop the backlog, the client refetches on "resync"
+			while not self.queue.empty(): self.queue.get_nowait()
+			self.queue.put_nowait({"topic": self.topic, "type": "resync", "data": {}})
+			stats.resyncs += 1
+
+
+class Broker:
+	"""Fans events out to this worker's subscribers."""
+
+	def __init__(self):
+		self._topics: Dict[str, Set[Subscriber]] = defaultdict(set)
+		self._count = 0
+
+	def counts(self) -> Dict[str, int]:
+		"""Open subscriptions per topic kind ("note", "university")."""
+		counts = defaultdict(int)
+		for topic, subscribers in self._topics.items():
+			counts[topic.partition(":")[0]] += len(subscribers)
+		return dict(counts)
+
+	def has_room(self) -> bool:
+		if self._count < EVENTS_MAX_SUBSCRIBERS: return True
+		stats.rejected += 1
+		return False
+
+	def subscribe(self, topic: str) -> Subscriber:
+		subscriber = Subscriber(topic)
+		self._topics[topic].add(subscriber)
+		self._count += 1
+		return subscriber
+
+	def unsubscribe(self, subscriber: Subscriber):
+		subscribers = self._topics.get(subscriber.topic)
+		if not subscribers or subscriber not in subscribers: return
+		subscribers.discard(subscriber)
+		self._count -= 1
+		if not subscribers: del self._topics[subscriber.topic]
+
+	def dispatch(self, message: dict):
+		for subscriber in self._topics.get(message["topic"], ()):
+			subscriber.offer(message)
+			stats.delivered += 1
+
+
+broker = Broker()
+
+
+class LocalBackend:
+	def publish(self, message: dict):
+		broker.dispatch(message)
+
+	async def start(self):
+		pass
+
+	async def stop(self):
+		pass
+
+
+class FileBackend:
+	"""Every worker appends to, and tails, one file; each worker dispatches what it reads, its own events included."""
+
+	def __init__(self, path: str, poll: float = EVENTS_POLL):
+		self.path = path
+		self.poll = poll
+		self._file = None
+		self._task: Optional[asyncio.Task] = None
+
+	def publish(self, message: dict):
+		line = (json.dumps(message, separators=(",", ":")) + "\n").encode()
+		# One O_APPEND write per event keeps lines from different workers whole
+		fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+		try:
+			os.write(fd, line)
+			stat = os.fstat(fd)
+			# Rotate only the file we wrote to, not one another worker just started
+			if stat.st_size > EVENTS_FILE_MAX and os.stat(self.path).st_ino == stat.st_ino:
+				os.replace(self.path, self.path + ".1")
+		finally:
+			os.close(fd)
+
+	def _open(self, at_end: bool):
+		try:
+			self._file = open(self.path, "rb")
+		except FileNotFoundError:
+			self._file = None
+			return
+		if at_end: self._file.seek(0, os.SEEK_END)
+
+	def _drain(self):
+		for line in self._file.readlines():
+			try:
+				broker.dispatch(json.loads(line))
+			except (ValueError, KeyError):
+				log.warning("Skipping malformed event line %r", line[:200])
+
+	def _rotated(self) -> bool:
+		try:
+			return os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino
+		except FileNotFoundError:
+			return False
+
+	def poll_once(self):
+		if self._file is None:
+			# Created by the first publisher after we started: read it from the top
+			self._open(at_end=False)
+			if self._file is None: return
+		self._drain()
+		if self._rotated():
+			self._drain()
+			self._file.close()
+			self._open(at_end=False)
+			if self._file: self._drain()
+
+	async def _run(self):
+		while True:
+			try:
+				self.poll_once()
+			except OSError:
+				log.exception("Reading %s failed", self.path)
+			await asyncio.sleep(self.poll)
+
+	async def start(self):
+		self._open(at_end=True)
+		self._task = asyncio.create_task(self._run())
+
+	async def stop(self):
+		if self._task: self._task.cancel()
+		if self._file: self._file.close()
+
+
+def _make_backend():
+	spec = os.getenv("EVENTS_BACKEND", "local")
+	if spec.startswith("file:"): return FileBackend(spec[len("file:"):])
+	return LocalBackend()
+
+
+backend = _make_backend()
+
+
+def publish(topic: str, type: str, data: dict):
+	"""Send an event to every subscriber of `topic`, in all workers. Call after committing."""
+	stats.published[type] += 1
+	try:
+		backend.publish({"topic": topic, "type": type, "data": data})
+	except OSError:
+		# Live updates are best effort; the write they describe has already committed
+		log.exception("Publishing %s to %s failed", type, topic)
+
+
+def publish_note(note_id: int, university_id: Optional[int], type: str, data: dict):
+	"""Publish a note event to the note's stream and its university's."""
+	data = {"note_id": note_id, **data}
+	publish(note_topic(note_id), type, data)
+	if university_id is not None: publish(university_topic(university_id), type, data)
+
+
+def _frame(type: str, data, id: Optional[int] = None) -> str:
+	head = f"id: {id}\n" if id is not None else ""
+	return f"{head}event: {type}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+async def stream(topic: str) -> AsyncIterator[str]:
+	"""SSE body subscribed to `topic`, with heartbeats; unsubscribes when the client goes away."""
+	# Subscribed on first iteration, so a response that never starts cannot leak a subscriber
+	subscriber = broker.subscribe(topic)
+	try:
+		yield f"retry: {RETRY_MS}\n\n"
+		seq = 0
+		while True:
+			try:
+				message = await asyncio.wait_for(subscriber.queue.get(), EVENTS_HEARTBEAT)
+			except asyncio.TimeoutError:
+				# Keeps proxies from timing the stream out and surfaces dead clients
+				yield f": ping {int(time.time())}\n\n"
+				continue
+			seq += 1
+			yield _frame(message["type"], message["data"], seq)
+	finally:
+		broker.unsubscribe(subscriber)
+
+
+def note_topic(id: int) -> str:
+	return f"note:{id}"
+
+
+def university_topic(id: int) -> str:
+	return f"university:{id}"
@@ -0,0 +1,209 @@
+"""
+Full-text search for notes, subjects and fields of study.
+
+Text is normalised in Python (lowercase, Polish diacritics folded, light suffix
+stemming) and kept in a single `search_documents` index, one row per (kind, ref_id).
+PostgreSQL stores a generated tsvector with GIN and pg_trgm indexes, SQLite uses an
+FTS5 virtual table. Both return relevance-ranked ids that callers join back to the models.
+
+Rebuild the index from existing rows with: python -m app.fulltext
+"""
+import asyncio
+import re
+import unicodedata
+from sqlalchemy import Float, Integer, column, event, inspect, select, text
+from . import database, models
+
+_FOLD = str.maketrans("ąćęłńóśźż", "acelnoszz")
+_WORD = re.compile(r"\w+")
+# Inflectional endings (after folding), longest first so "owie" wins over "e"
+_SUFFIXES = sorted([
+	"owie", "ami", "ach", "ego", "emu", "ymi", "imi", "ych", "ich", "owi", "iem",
+	"om", "ow", "ej", "ym", "im", "em", "ia", "ie", "iu", "ii",
+	"a", "e", "i", "o", "u", "y",
+], key=len, reverse=True)
+MIN_STEM = 3
+# Mobile e before a final k/c: "całek"/"całka", "wyjątek"/"wyjątku", "koniec"/"końca"
+_MOBILE_E = re.compile(r"(?:(?<=[^aeiouy])e|(?<=n)ie)([kc])$")
+
+# kind -> (model, indexed attributes)
+SOURCES = {
+	"note": (models.Note, ("title", "content")),
+	"subject": (models.Subject, ("name",)),
+	"field": (models.FieldOfStudy, ("name",)),
+}
+_KIND_CODE = {kind: i for i, kind in enumerate(SOURCES, start=1)}
+
+
+def fold(value: str) -> str:
+	"""Lowercase and strip diacritics, including the non-decomposable Polish 'ł'."""
+	value = (value or "").lower().translate(_FOLD)
+	return "".join(c for c in unicodedata.normalize("NFKD", value) if not unicodedata.combining(c))
+
+
+def stem(word: str) -> str:
+	for suffix in _SUFFIXES:
+		if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+			return word[:-len(suffix)]
+	# No ending: a genitive plural or nominative whose other forms drop the e
+	if len(word) > MIN_STEM + 1: return _MOBILE_E.sub(r"\1", word)
+	return word
+
+
+def tokenize(value: str) -> list:
+	return [stem(w) for w in _WORD.findall(fold(value))]
+
+
+def _body(values) -> str:
+	return " ".join(tokenize(" ".join(v or "" for v in values)))
+
+
+def document(obj) -> str:
+	_, attrs = SOURCES[_kind_of(obj)]
+	return _body(getattr(obj, a) for a in attrs)
+
+
+def _kind_of(obj) -> str:
+	for kind, (model, _) in SOURCES.items():
+		if isinstance(obj, model): return kind
+	raise KeyError(type(obj).__name__)
+
+
+class PostgresBackend:
+	"""
+	tsvector('simple') over pre-stemmed text; pg_trgm catches typos the stemmer misses,
+	matching the query against the closest stretch of the body (word_similarity, `<%`)
+	rather than the whole document, which a long note would never resemble.
+	"""
+
+	ddl = [
+		"CREATE EXTENSION IF NOT EXISTS pg_trgm",
+		"""CREATE TABLE IF NOT EXISTS search_documents (
+			kind VARCHAR(16) NOT NULL,
+			ref_id INTEGER NOT NULL,
+			body TEXT NOT NULL,
+			tsv TSVECTOR GENERATED ALWAYS AS (to_tsvector('simple', body)) STORED,
+			PRIMARY KEY (kind, ref_id))""",
+		"CREATE INDEX IF NOT EXISTS ix_search_documents_tsv ON search_documents USING gin (tsv)",
+		# gin_trgm_ops serves the word-similarity operator (<%) as well as %
+		"CREATE INDEX IF NOT EXISTS ix_search_documents_trgm ON search_documents USING gin (body gin_trgm_ops)",
+	]
+
+	def upsert(self, conn, kind, ref_id, body):
+		self.upsert_many(conn, kind, [(ref_id, body)])
+
+	def upsert_many(self, conn, kind, docs):
+		conn.execute(text(
+			"INSERT INTO search_documents (kind, ref_id, body) VALUES (:kind, :ref_id, :body) "
+			"ON CONFLICT (kind, ref_id) DO UPDATE SET body = excluded.body"
+		), [{"kind": kind, "ref_id": ref_id, "body": body} for ref_id, body in docs])
+
+	def delete(self, conn, kind, ref_id):
+		conn.execute(text("DELETE FROM search_documents WHERE kind = :kind AND ref_id = :ref_id"),
+		             {"kind": kind, "ref_id": ref_id})
+
+	def hits(self, kind, tokens):
+		return text(
+			"SELECT ref_id, ts_rank(tsv, query) + word_similarity(:raw, body) AS rank "
+			"FROM search_documents, to_tsquery('simple', :tsq) AS query "
+			"WHERE kind = :kind AND (tsv @@ query OR :raw <% body)"
+		).bindparams(kind=kind, raw=" ".join(tokens), tsq=" & ".join(f"{t}:*" for t in tokens))
+
+
+class SQLiteBackend:
+	"""FTS5 table; rowid encodes (kind, ref_id) so updates never scan the UNINDEXED columns."""
+
+	ddl = [
+		"CREATE VIRTUAL TABLE IF NOT EXISTS search_documents "
+		"USING fts5(body, kind UNINDEXED, ref_id UNINDEXED, tokenize = 'unicode61')",
+	]
+
+	@staticmethod
+	def _rowid(kind, ref_id):
+		return ref_id * 8 + _KIND_CODE[kind]
+
+	def upsert(self, conn, kind, ref_id, body):
+		self.upsert_many(conn, kind, [(ref_id, body)])
+
+	def upsert_many(self, conn, kind, docs):
+		params = [{"rowid": self._rowid(kind, ref_id), "body": body, "kind": kind, "ref_id": ref_id} for ref_id, body in docs]
+		conn.execute(text("DELETE FROM search_documents WHERE rowid = :rowid"), params)
+		conn.execute(text("INSERT INTO search_documents (rowid, body, kind, ref_id) VALUES (:rowid, :body, :kind, :ref_id)"), params)
+
+	def delete(self, conn, kind, ref_id):
+		conn.execute(text("DELETE FROM search_documents WHERE rowid = :rowid"), {"rowid": self._rowid(kind, ref_id)})
+
+	def hits(self, kind, tokens):
+		return text(
+			"SELECT ref_id, -bm25(search_documents) AS rank FROM search_documents "
+			"WHERE search_documents MATCH :match AND kind = :kind"
+		).bindparams(kind=kind, match=" ".join(f'"{t}"*' for t in tokens))
+
+
+backend = PostgresBackend() if database.engine.dialect.name == "postgresql" else SQLiteBackend()
+
+
+def install(conn):
+	"""Create the index table and its indexes (idempotent)."""
+	for stmt in backend.ddl:
+		conn.execute(text(stmt))
+
+
+def hits(kind: str, query: str):
+	"""
+	Subquery of (ref_id, rank) for `kind` documents matching every term of `query`
+	as a prefix, higher rank first. Returns None when the query has no searchable terms.
+	"""
+	tokens = tokenize(query)
+	if not tokens: return None
+	return backend.hits(kind, tokens).columns(column("ref_id", Integer), column("rank", Float)).subquery(f"{kind}_hits")
+
+
+def rebuild(conn):
+	"""Re-index every note, subject and field of study."""
+	conn.execute(text("DELETE FROM search_documents"))
+	for kind, (model, attrs) in SOURCES.items():
+		index(conn, kind, conn.execute(select(model.id, *(getattr(model, a) for a in attrs))).all())
+
+
+def index(conn, kind: str, rows):
+	"""
+	Bulk (re-)index `rows` of (id, *indexed attribute values) for `kind`. For writes that
+	bypass the ORM (Core inserts/updates), which the mapper events below never see.
+	"""
+	docs = [(row[0], _body(row[1:])) for row in rows]
+	if docs: backend.upsert_many(conn, kind, docs)
+
+
+def _after_insert(mapper, conn, target):
+	backend.upsert(conn, _kind_of(target), target.id, document(target))
+
+
+def _after_update(mapper, conn, target):
+	# Votes and approvals update notes constantly; only re-index when indexed text changed
+	_, attrs = SOURCES[_kind_of(target)]
+	state = inspect(target)
+	if any(state.attrs[a].history.has_changes() for a in attrs):
+		backend.upsert(conn, _kind_of(target), target.id, document(target))
+
+
+def _after_delete(mapper, conn, target):
+	backend.delete(conn, _kind_of(target), target.id)
+
+
+for _model, _ in SOURCES.values():
+	event.listen(_model, "after_insert", _after_insert)
+	event.listen(_model, "after_update", _after_update)
+	event.listen(_model, "after_delete", _after_delete)
+
+
+async def _main():
+	async with database.engine.begin() as conn:
+		await conn.run_sync(install)
+		await conn.run_sync(rebuild)
+	await database.engine.dispose()
+	print("--- SEARCH INDEX REBUILT ---")
+
+
+if __name__ == "__main__":
+	asyncio.run(_main())
@@ -0,0 +1,111 @@
+"""
+Password hashing off the request path.
+
+bcrypt is deliberately slow (~200 ms at cost 12), so /token and /register run it on a
+small dedicated process pool instead of the event loop or the shared threadpool. When
+more than HASH_QUEUE_LIMIT hashes are already waiting, new requests get a 503 rather
+than queueing behind them. BCRYPT_ROUNDS sets the cost; hashes made with a lower cost
+are upgraded the next time their owner logs in.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", "2"))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", "64"))
+
+# min_rounds makes needs_update() flag hashes below the configured cost
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto",
+                           bcrypt__rounds=BCRYPT_ROUNDS, bcrypt__min_rounds=BCRYPT_ROUNDS)
+
+_pool: Optional[ProcessPoolExecutor] = None
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float("inf"))
+
+
+class PoolStats:
+	def __init__(self):
+		self.in_flight = 0
+		self.completed = 0
+		self.rejected = 0
+		self.wait_seconds = 0.0
+		self.run_seconds = 0.0
+		self.max_seconds = 0.0
+		self.buckets = [0] * len(BUCKETS)
+
+	def observe(self, total: float, run: float):
+		self.completed += 1
+		self.run_seconds += run
+		self.wait_seconds += max(total - run, 0.0)
+		self.max_seconds = max(self.max_seconds, total)
+		for i, bound in enumerate(BUCKETS):
+			if total <= bound:
+				self.buckets[i] += 1
+				break
+
+	def as_dict(self) -> dict:
+		n = self.completed or 1
+		return {
+			"workers": HASH_WORKERS,
+			"rounds": BCRYPT_ROUNDS,
+			"queue_limit": HASH_QUEUE_LIMIT,
+			"in_flight": self.in_flight,
+			"completed": self.completed,
+			"rejected": self.rejected,
+			"avg_wait_ms": round(self.wait_seconds / n * 1000, 2),
+			"avg_run_ms": round(self.run_seconds / n * 1000, 2),
+			"max_ms": round(self.max_seconds * 1000, 2),
+			"histogram": {str(b): c for b, c in zip(BUCKETS, self.buckets)},
+		}
+
+
+stats = PoolStats()
+
+
+# --- Executed in the pool processes ---
+def _hash(password: str) -> Tuple[str, float]:
+	start = time.perf_counter()
+	return pwd_context.hash(password), time.perf_counter() - start
+
+
+def _verify(password: str, hashed: str) -> Tuple[Tuple[bool, Optional[str]], float]:
+	start = time.perf_counter()
+	return pwd_context.verify_and_update(password, hashed), time.perf_counter() - start
+
+
+async def _submit(fn, *args):
+	global _pool
+	if stats.in_flight >= HASH_QUEUE_LIMIT:
+		stats.rejected += 1
+		raise HTTPException(503, "Server busy, try again shortly", headers={"Retry-After": "1"})
+	if _pool is None:
+		_pool = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+	stats.in_flight += 1
+	start = time.perf_counter()
+	try:
+		result, run = await asyncio.get_running_loop().run_in_executor(_pool, fn, *args)
+	finally:
+		stats.in_flight -= 1
+	stats.observe(time.perf_counter() - start, run)
+	return result
+
+
+async def hash_password(password: str) -> str:
+	return await _submit(_hash, password)
+
+
+async def verify_password(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+	"""Returns (valid, replacement hash or None when the stored hash is current)."""
+	return await _submit(_verify, password, hashed)
+
+
+def shutdown():
+	global _pool
+	if _pool is not None:
+		_pool.shutdown(wait=False, cancel_futures=True)
+		_pool = None
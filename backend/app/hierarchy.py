@@ -0,0 +1,108 @@
+"""
+Versioned cache for the University -> Faculty -> FieldOfStudy -> Subject hierarchy.
+
+The hierarchy changes only through moderation and a handful of submit/update routes,
+so reads are served from memory. Entries are keyed by (version, key); every write path
+calls `bump()` after committing, which makes all older entries unreachable (they age out
+of the LRU). The version lives in a channel:
+
+	LocalChannel  - per process (default)
+	FileChannel   - a version file shared by all workers on one host, re-read at most
+	                every HIERARCHY_POLL seconds; a stand-in for Redis/Postgres pub/sub.
+
+Select with HIERARCHY_CHANNEL=file:/path/to/version-file.
+"""
+import os
+import time
+from typing import Awaitable, Callable, Hashable
+from .cache import TTLCache
+
+HIERARCHY_CACHE_SIZE = int(os.getenv("HIERARCHY_CACHE_SIZE", "4096"))
+HIERARCHY_CACHE_TTL = float(os.getenv("HIERARCHY_CACHE_TTL", "600"))
+HIERARCHY_POLL = float(os.getenv("HIERARCHY_POLL", "0.5"))
+
+cache = TTLCache("hierarchy", maxsize=HIERARCHY_CACHE_SIZE, ttl=HIERARCHY_CACHE_TTL)
+
+
+class LocalChannel:
+	def __init__(self):
+		self._version = 0
+
+	def version(self) -> int:
+		return self._version
+
+	def publish(self) -> int:
+		self._version += 1
+		return self._version
+
+
+class FileChannel:
+	def __init__(self, path: str, poll: float = HIERARCHY_POLL):
+		self.path = path
+		self.poll = poll
+		self._version = 0
+		self._checked = 0.0
+
+	def _read(self) -> int:
+		try:
+			with open(self.path) as f: return int(f.read() or 0)
+		except (FileNotFoundError, ValueError):
+			return 0
+
+	def version(self) -> int:
+		now = time.monotonic()
+		if now - self._checked >= self.poll:
+			self._version = max(self._version, self._read())
+			self._checked = now
+		return self._version
+
+	def publish(self) -> int:
+		# Timestamp-based versions never collide between workers and never go backwards
+		self._version = max(self._read() + 1, time.time_ns())
+		tmp = f"{self.path}.{os.getpid()}"
+		with open(tmp, "w") as f: f.write(str(self._version))
+		os.replace(tmp, self.path)
+		self._checked = time.monotonic()
+		return self._version
+
+
+def _make_channel():
+	spec = os.getenv("HIERARCHY_CHANNEL", "local")
+	if spec.startswith("file:"): return FileChannel(spec[len("file:"):])
+	return LocalChannel()
+
+
+channel = _make_channel()
+
+
+def version() -> int:
+	return channel.version()
+
+
+def bump():
+	"""Invalidate every cached hierarchy read, in this worker and (with a shared channel) all others."""
+	channel.publish()
+
+
+def invalidate(*keys: Hashable):
+	"""
+	Drop this worker's entries for `keys` only, for writes that change a single entry's
+	counters rather than the hierarchy. Other workers refresh them when they expire.
+	"""
+	current = version()
+	for key in keys: cache.pop((current, key))
+
+
+def university_keys(university_id: int) -> tuple:
+	"""Keys of the cached reads that embed a university's stats."""
+	return "universities", ("university", university_id)
+
+
+async def cached(key: Hashable, load: Callable[[], Awaitable]):
+	"""Return the cached value for `key` at the current version, calling `load()` on a miss."""
+	versioned = (version(), key)
+	value = cache.get(versioned)
+	if value is None:
+		value = await load()
+		if value is not None: cache.set(versioned, value)
+	return value
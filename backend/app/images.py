@@ -0,0 +1,137 @@
+"""
+Responsive image derivatives.
+
+When an image lands in the blob store, `enqueue()` hands it to a process pool that
+writes resized WebP (and AVIF, when Pillow supports it) copies next to the original:
+
+	/uploads/blobs/ab/cd/<hash>.jpg            original
+	/uploads/blobs/ab/cd/<hash>.jpg.w320.webp  derivative, never wider than the original
+
+Derivative URLs are a pure function of the original URL, so schemas expose them
+without a lookup. Until a derivative exists `static.UploadFiles` serves the original
+in its place, so clients can use the variants immediately after uploading.
+
+Generate derivatives for blobs uploaded before this existed with:
+	python -m app.images backfill
+"""
+import logging
+import os
+import re
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+try:
+	from PIL import Image, ImageOps, features
+except ImportError:  # Pillow is optional; without it originals are served as-is
+	Image = None
+
+from .storage import BLOB_DIR, URL_PREFIX, path_for_url
+
+log = logging.getLogger(__name__)
+
+WIDTHS = (320, 640, 1280)
+FORMATS = tuple(f for f in ("webp", "avif") if Image is not None and features.check(f))
+QUALITY = {"webp": 80, "avif": 60}
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp")
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+IMAGE_QUEUE_LIMIT = int(os.getenv("IMAGE_QUEUE_LIMIT", "256"))
+
+_DERIVATIVE = re.compile(r"^(?P<original>.+)\.w\d+\.(?:webp|avif)$")
+_pool: Optional[ProcessPoolExecutor] = None
+# Done callbacks run on the executor's thread; _lock guards _pending and stats against them
+_lock = threading.Lock()
+_pending = set()
+stats = {"queued": 0, "generated": 0, "skipped": 0, "failed": 0}
+
+
+def is_image(url: Optional[str]) -> bool:
+	return bool(url) and url.startswith(URL_PREFIX) and url.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def variants(url: Optional[str]) -> Optional[Dict[str, Dict[str, str]]]:
+	"""{"webp": {"320": url, ...}, ...} for a stored image, else None."""
+	if not FORMATS or not is_image(url): return None
+	return {fmt: {str(w): f"{url}.w{w}.{fmt}" for w in WIDTHS} for fmt in FORMATS}
+
+
+# --- Executed in the pool processes ---
+def _generate(path: str) -> int:
+	written = 0
+	with Image.open(path) as img:
+		img = ImageOps.exif_transpose(img)
+		if img.mode not in ("RGB", "RGBA"): img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+		for width in WIDTHS:
+			resized = img.copy()
+			if resized.width > width:
+				resized = resized.resize((width, round(img.height * width / img.width)), Image.LANCZOS)
+			for fmt in FORMATS:
+				target = f"{path}.w{width}.{fmt}"
+				if os.path.exists(target): continue
+				tmp = f"{target}.{os.getpid()}.tmp"
+				resized.save(tmp, fmt.upper(), quality=QUALITY[fmt])
+				os.replace(tmp, target)
+				written += 1
+	return written
+
+
+def _done(path, future):
+	try:
+		generated, failed = future.result(), 0
+	except Exception:
+		generated, failed = 0, 1
+		log.exception("Derivative generation failed for %s", path)
+	with _lock:
+		_pending.discard(path)
+		stats["generated"] += generated
+		stats["failed"] += failed
+
+
+def enqueue(url: str):
+	"""Schedule derivative generation for a stored image. Never blocks the caller."""
+	global _pool
+	if not is_image(url) or not FORMATS: return
+	path = path_for_url(url)
+	with _lock:
+		if path in _pending or len(_pending) >= IMAGE_QUEUE_LIMIT:
+			stats["skipped"] += 1
+			return
+		_pending.add(path)
+		stats["queued"] += 1
+	if _pool is None:
+		_pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+	_pool.submit(_generate, path).add_done_callback(lambda f: _done(path, f))
+
+
+def snapshot() -> dict:
+	with _lock:
+		return {**stats, "pending": len(_pending), "formats": list(FORMATS)}
+
+
+def shutdown():
+	global _pool
+	if _pool is not None:
+		_pool.shutdown(wait=False, cancel_futures=True)
+		_pool = None
+
+
+def original_of(path: str) -> Optional[str]:
+	"""The original's path for a derivative path (`...png.w320.webp` -> `...png`), else None."""
+	match = _DERIVATIVE.match(path)
+	return match.group("original") if match else None
+
+
+def backfill() -> int:
+	"""Generate missing derivatives for every stored image, using all cores."""
+	paths = [os.path.join(root, name) for root, _, names in os.walk(BLOB_DIR) for name in names
+	         if name.lower().endswith(IMAGE_EXTENSIONS) and not _DERIVATIVE.match(name)]
+	with ProcessPoolExecutor() as pool:
+		return sum(pool.map(_generate, paths))
+
+
+if __name__ == "__main__":
+	if sys.argv[1:] != ["backfill"] or not FORMATS:
+		print("usage: python -m app.images backfill  (requires Pillow)")
+	else:
+		print(f"--- WROTE {backfill()} DERIVATIVES ---")
@@ -0,0 +1,73 @@
+"""
+Race-free vote/favorite toggles and note counters.
+
+Each toggle first locks the note row (SELECT ... FOR NO KEY UPDATE), so a missing note
+ends it before an insert could violate the note_id foreign key. It then DELETEs the
+user's row, or, if there was none, INSERTs it with ON CONFLICT DO NOTHING, followed by
+one `UPDATE notes SET counter = counter + delta`. The unique (user_id, note_id)
+constraints arbitrate concurrent requests, counters never go through a Python
+read-modify-write, and a double click can at worst be a no-op instead of a 500.
+
+Every counter change also rewrites the note's hot score, and committed changes are
+published to the note's and its university's event streams.
+"""
+from typing import Optional, Tuple
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import database, events, models, ranking
+
+
+async def _lock_note(db: AsyncSession, note_id: int) -> bool:
+	"""Lock the note row for this transaction (the lock bump()'s UPDATE takes anyway); False if it does not exist."""
+	found = await db.scalar(select(models.Note.id).where(models.Note.id == note_id).with_for_update(key_share=True))
+	return found is not None
+
+
+async def _toggle(db: AsyncSession, model, user_id: int, note_id: int, values: dict) -> int:
+	"""Flip the (user, note) row. Returns +1 if it was created, -1 if removed, 0 if a concurrent request won."""
+	removed = await db.execute(delete(model).where(model.user_id == user_id, model.note_id == note_id))
+	if removed.rowcount:
+		return -1
+	added = await db.execute(
+		database.insert(model).values(user_id=user_id, note_id=note_id, **values)
+		.on_conflict_do_nothing(index_elements=["user_id", "note_id"])
+	)
+	return 1 if added.rowcount else 0
+
+
+async def bump(db: AsyncSession, note_id: int, counter, delta) -> Optional[Tuple[float, int, bool]]:
+	"""
+	Server-side `counter = counter + delta`, then the note's hot score from the updated
+	counters; returns (new value, note's university_id, whether it is approved), or None if the
+	note does not exist.
+	"""
+	row = (await db.execute(
+		update(models.Note).where(models.Note.id == note_id)
+		.values({counter: counter + delta}).returning(counter, models.Note.university_id, models.Note.is_approved,
+		           *ranking.INPUTS)
+		.execution_options(synchronize_session=False)
+	)).first()
+	if row is None: return None
+	# The UPDATE holds the row lock until commit, so concurrent bumps see each other's counters
+	if delta: await ranking.store(db, note_id, *row[3:])
+	return row[0], row[1], row[2]
+
+
+async def toggle_vote(db: AsyncSession, user_id: int, note_id: int) -> Optional[Tuple[bool, float]]:
+	"""Returns (user_has_voted, new_score), or None if the note does not exist. Commits."""
+	if not await _lock_note(db, note_id): return None
+	delta = await _toggle(db, models.Vote, user_id, note_id, {"value": 1})
+	score, university_id, approved = await bump(db, note_id, models.Note.score, delta)
+	await db.commit()
+	if delta and approved: events.publish_note(note_id, university_id, "vote", {"score": score})
+	return delta >= 0, score
+
+
+async def toggle_favorite(db: AsyncSession, user_id: int, note_id: int) -> Optional[Tuple[bool, int]]:
+	"""Returns (is_favorited, new_favorite_count), or None if the note does not exist. Commits."""
+	if not await _lock_note(db, note_id): return None
+	delta = await _toggle(db, models.Favorite, user_id, note_id, {})
+	count, university_id, approved = await bump(db, note_id, models.Note.favorite_count, delta)
+	await db.commit()
+	if delta and approved: events.publish_note(note_id, university_id, "favorite", {"favorite_count": count})
+	return delta >= 0, count
@@ -1,26 +1,31 @@
+import asyncio
 import os
-import shutil
-from typing import List, Dict, Any
-from fastapi import Depends, FastAPI, File, Form, HTTPException, UploadFile
+from typing import List, Dict, Any, Literal
+from fastapi import Depends, FastAPI, File, Form, HTTPException, Query, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from fastapi.staticfiles import StaticFiles
-from sqlalchemy import or_
-from sqlalchemy.orm import Session
-from . import auth, database, models, schemas
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager, joinedload
+from . import auth, cache, conditional, dashboard, database, events, fulltext, hashing, hierarchy, images, interactions, metrics, migrate, models, moderation, ranking, ratelimit, schemas, seed, static, stats, storage, syllabus
+from .pagination import page_size, paginate
 
 
 class Config:
-	ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "admin@colloq.pl")
-	ADMIN_PASS = os.getenv("ADMIN_PASS", "admin123")
-	UPLOAD_DIR = "uploads"
-	# Ensure subdirectories exist
-	for d in ["universities", "faculties", "avatars"]:
-		os.makedirs(os.path.join(UPLOAD_DIR, d), exist_ok=True)
+	UPLOAD_DIR = storage.UPLOAD_DIR
+	AUTO_MIGRATE = os.getenv("AUTO_MIGRATE") == "1"
 
 
+# Relationships serialised by NoteOut; loaded in the same query (async sessions cannot lazy load)
+_note_out_options = (joinedload(models.Note.author), joinedload(models.Note.subject))
+
 app = FastAPI(title="Colloq PRO MVP", version="5.2.0")
 
+# Innermost, so shed requests still get CORS headers and are counted by metrics
+app.add_middleware(ratelimit.ConcurrencyLimit)
+# Outside it, so oversized uploads are refused without taking a slot
+app.add_middleware(storage.UploadLimit)
 # CORS setup
 app.add_middleware(
 	CORSMiddleware,
@@ -29,180 +34,156 @@ app.add_middleware(
 	allow_methods=["*"],
 	allow_headers=["*"],
 )
+# Outermost, so CORS preflights and errors are measured too
+app.add_middleware(metrics.Middleware)
+metrics.instrument(database.engine)
+if database.read_engine is not database.engine: metrics.instrument(database.read_engine, "replica")
 
 # Mount static files
-app.mount("/uploads", StaticFiles(directory=Config.UPLOAD_DIR), name="uploads")
+app.mount("/uploads", static.UploadFiles(directory=Config.UPLOAD_DIR), name="uploads")
+
+
+# Image derivatives are generated once an upload is committed
+storage.listeners.append(images.enqueue)
 
 
 @app.on_event("startup")
-def startup():
+async def startup():
 	"""
-	Initializes the database and seeds required data (Admin, University, Syllabus).
+	Checks that the schema is up to date; never writes to the database. Deploys run
+	`python -m app.migrate && python -m app.seed` first (AUTO_MIGRATE=1 does it here, for development).
 	"""
-	models.Base.metadata.create_all(bind=database.engine)
-	db = database.SessionLocal()
-	try:
-		# 1. Seed University: Politechnika Krakowska
-		uni_name = "Politechnika Krakowska"
-		uni = db.query(models.University).filter(models.University.name == uni_name).first()
-		if not uni:
-			uni = models.University(
-				name=uni_name,
-				name_pl=uni_name,
-				city="Kraków",
-				region="Małopolskie",
-				is_approved=True,
-				description="Technical university in Krakow."
-			)
-			db.add(uni)
-			db.commit()
-			db.refresh(uni)
-
-		# 2. Seed Admin User
-		if not db.query(models.User).filter(models.User.email == Config.ADMIN_EMAIL).first():
-			admin = models.User(
-				email=Config.ADMIN_EMAIL,
-				hashed_password=auth.get_password_hash(Config.ADMIN_PASS),
-				university_id=uni.id,
-				is_admin=True,
-				nickname="Admin",
-				is_verified=True
-			)
-			db.add(admin)
-			db.commit()
-
-		# 3. Seed Syllabus Hierarchy
-		fac_name = "Wydział Informatyki i Telekomunikacji"
-		fac = db.query(models.Faculty).filter(
-			models.Faculty.name == fac_name,
-			models.Faculty.university_id == uni.id
-		).first()
-
-		if not fac:
-			fac = models.Faculty(name=fac_name, university_id=uni.id, is_approved=True)
-			db.add(fac)
-			db.commit()
-			db.refresh(fac)
-
-		field_name = "Informatyka w Inżynierii Komputerowej"
-		field = db.query(models.FieldOfStudy).filter(
-			models.FieldOfStudy.name == field_name,
-			models.FieldOfStudy.faculty_id == fac.id
-		).first()
-
-		if not field:
-			print(f"--- SEEDING SYLLABUS: {field_name} ---")
-			field = models.FieldOfStudy(
-				name=field_name,
-				degree_level="I stopień",
-				faculty_id=fac.id,
-				is_approved=True
-			)
-			db.add(field)
-			db.commit()
-			db.refresh(field)
-
-			# Subject List (Semester, Name)
-			subjects_data = [
-				(1, "Analiza Matematyczna"), (1, "Algebra Liniowa"), (1, "Fizyka"), (1, "Wstęp do Informatyki"),
-				(2, "Matematyka Dyskretna"), (2, "Architektura Systemów Komputerowych"), (2, "Programowanie Obiektowe"),
-				(3, "Algorytmy i Struktury Danych"), (3, "Systemy Operacyjne"), (3, "Bazy Danych"),
-				(4, "Sieci Komputerowe"), (4, "Inżynieria Oprogramowania"), (4, "Grafika Komputerowa"),
-				(5, "Sztuczna Inteligencja"), (5, "Systemy Wbudowane"),
-				(6, "Bezpieczeństwo Systemów"), (6, "Praktyka Zawodowa"),
-				(7, "Seminarium Dyplomowe"), (7, "Praca Dyplomowa")
-			]
-
-			for sem, subj_name in subjects_data:
-				db.add(models.Subject(
-					name=subj_name,
-					semester=sem,
-					field_of_study_id=field.id,
-					is_approved=True
-				))
-			db.commit()
-			print("--- SYLLABUS SEEDED SUCCESSFULLY ---")
-
-	except Exception as e:
-		print(f"Startup Error: {e}")
-	finally:
-		db.close()
+	if Config.AUTO_MIGRATE:
+		async with database.locked("migrate") as conn:
+			await conn.run_sync(migrate.upgrade)
+		await seed.run()
+		return
+	async with database.engine.connect() as conn:
+		todo = await conn.run_sync(migrate.pending)
+	if todo:
+		print(f"--- {len(todo)} PENDING MIGRATIONS: run `python -m app.migrate` ---")
+
+
+_background = []
+
+
+@app.on_event("startup")
+async def start_background_jobs():
+	if ranking.REFRESH_SECONDS: _background.append(asyncio.create_task(ranking.refresh_forever()))
+	await events.backend.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+	for task in _background: task.cancel()
+	await events.backend.stop()
+	hashing.shutdown()
+	images.shutdown()
 
 
 # --- AUTH ROUTES ---
-@app.post("/token")
-def login(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
-	user = db.query(models.User).filter(models.User.email == form.username).first()
-	if not user or not auth.verify_password(form.password, user.hashed_password):
+@app.post("/token", dependencies=[Depends(ratelimit.by_ip("token"))])
+async def login(form: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(database.get_db)):
+	user = await db.scalar(select(models.User).where(models.User.email == form.username))
+	if not user:
+		raise HTTPException(400, "Invalid credentials")
+	valid, new_hash = await hashing.verify_password(form.password, user.hashed_password)
+	if not valid:
 		raise HTTPException(400, "Invalid credentials")
+	if new_hash:
+		# Stored hash predates the current BCRYPT_ROUNDS; upgrade it while we have the password
+		user.hashed_password = new_hash
+		await db.commit()
 	return {
 		"access_token": auth.create_access_token({"sub": user.email, "is_admin": user.is_admin}),
 		"token_type": "bearer"
 	}
 
 
-@app.post("/register", status_code=201)
-def register(r: schemas.RegisterRequest, db: Session = Depends(database.get_db)):
-	if db.query(models.User).filter(models.User.email == r.user.email).first():
+@app.post("/register", status_code=201, dependencies=[Depends(ratelimit.by_ip("register"))])
+async def register(r: schemas.RegisterRequest, db: AsyncSession = Depends(database.get_db)):
+	if await db.scalar(select(models.User).where(models.User.email == r.user.email)):
 		raise HTTPException(400, "Email taken")
 
 	new_user = models.User(
 		email=r.user.email,
-		hashed_password=auth.get_password_hash(r.user.password),
+		hashed_password=await hashing.hash_password(r.user.password),
 		university_id=r.user.university_id,
 		nickname=r.user.email.split("@")[0]
 	)
 	db.add(new_user)
-	db.commit()
+	await stats.adjust(db, r.user.university_id, user_count=1)
+	await db.commit()
+	hierarchy.invalidate(*hierarchy.university_keys(r.user.university_id))
 	return {"msg": "OK"}
 
 
 @app.get("/users/me", response_model=schemas.UserOut)
-def me(user: models.User = Depends(auth.get_current_user)):
+async def me(user: models.User = Depends(auth.get_current_user)):
 	return user
 
 
-@app.put("/users/me", response_model=schemas.UserOut)
-def update_profile(
+@app.put("/users/me", response_model=schemas.UserOut, dependencies=[Depends(ratelimit.by_user("upload"))])
+async def update_profile(
 		nickname: str = Form(None),
 		bio: str = Form(None),
 		avatar: UploadFile = File(None),
-		db: Session = Depends(database.get_db),
+		db: AsyncSession = Depends(database.get_db),
 		user: models.User = Depends(auth.get_current_user)
 ):
 	if nickname: user.nickname = nickname
 	if bio: user.bio = bio
 	if avatar:
-		file_path = os.path.join("uploads", "avatars", f"{user.id}_{avatar.filename}")
-		with open(file_path, "wb+") as f:
-			shutil.copyfileobj(avatar.file, f)
-		user.avatar_url = f"/{file_path}"
+		user.avatar_url = await storage.store(db, avatar)
 
-	db.commit()
-	db.refresh(user)
+	await db.commit()
+	await db.refresh(user)
+	dashboard.invalidate(user.id)
 	return user
 
 
+@app.get("/users/me/dashboard", response_model=schemas.UserDashboard)
+async def get_dashboard(request: Request, notes_cursor: str = None, favorites_cursor: str = None,
+                        limit: int = Depends(page_size), db: AsyncSession = Depends(database.get_db),
+                        user: models.User = Depends(auth.get_current_user)):
+	"""
+	The user's approved notes and favorites (newest first, paged independently) and their
+	submissions awaiting moderation. Cached briefly per user; see app.dashboard.
+	"""
+	rendered = await dashboard.load(db, user.id, notes_cursor, favorites_cursor, limit)
+	return conditional.respond(request, rendered, conditional.PRIVATE)
+
+
 # --- MVP TERM: GLOBAL SEARCH ---
 @app.get("/search/global")
-def global_search(q: str, db: Session = Depends(database.get_db)):
+async def global_search(q: str, fields_cursor: str = None, subjects_cursor: str = None,
+                        limit: int = Depends(page_size), db: AsyncSession = Depends(database.get_read_db)):
 	"""
 	Search for Fields of Study and Subjects across all universities.
-	Case-insensitive search matching the query string 'q'.
+	Diacritic-insensitive prefix search over the full-text index, best matches first.
+	Each list is paged independently; pass back the matching `next_cursor` entry.
 	"""
 	results = {
 		"fields": [],
-		"subjects": []
+		"subjects": [],
+		"next_cursor": {"fields": None, "subjects": None}
 	}
 
 	if not q or len(q) < 2:
 		return results
 
 	# Search Fields
-	fields = db.query(models.FieldOfStudy).join(models.Faculty).join(models.University) \
-		.filter(models.FieldOfStudy.name.ilike(f"%{q}%"), models.FieldOfStudy.is_approved == True).all()
-
-	for f in fields:
+	hits = fulltext.hits("field", q)
+	if hits is None:
+		return results
+	fields = select(models.FieldOfStudy).join(hits, hits.c.ref_id == models.FieldOfStudy.id) \
+		.join(models.Faculty).join(models.University) \
+		.options(contains_eager(models.FieldOfStudy.faculty).contains_eager(models.Faculty.university)) \
+		.where(models.FieldOfStudy.is_approved == True)
+	page = await paginate(db, fields, (hits.c.rank, models.FieldOfStudy.id), fields_cursor, limit)
+	results["next_cursor"]["fields"] = page["next_cursor"]
+
+	for f in page["items"]:
 		results["fields"].append({
 			"id": f.id,
 			"name": f.name,
@@ -213,10 +194,16 @@ def global_search(q: str, db: Session = Depends(database.get_db)):
 		})
 
 	# Search Subjects
-	subjects = db.query(models.Subject).join(models.FieldOfStudy).join(models.Faculty).join(models.University) \
-		.filter(models.Subject.name.ilike(f"%{q}%"), models.Subject.is_approved == True).all()
-
-	for s in subjects:
+	hits = fulltext.hits("subject", q)
+	subjects = select(models.Subject).join(hits, hits.c.ref_id == models.Subject.id) \
+		.join(models.FieldOfStudy).join(models.Faculty).join(models.University) \
+		.options(contains_eager(models.Subject.field_of_study).contains_eager(models.FieldOfStudy.faculty)
+		         .contains_eager(models.Faculty.university)) \
+		.where(models.Subject.is_approved == True)
+	page = await paginate(db, subjects, (hits.c.rank, models.Subject.id), subjects_cursor, limit)
+	results["next_cursor"]["subjects"] = page["next_cursor"]
+
+	for s in page["items"]:
 		results["subjects"].append({
 			"id": s.id,
 			"name": s.name,
@@ -230,267 +217,447 @@ def global_search(q: str, db: Session = Depends(database.get_db)):
 
 
 # --- STANDARD ENTITIES ---
+async def _render_all(db: AsyncSession, schema, stmt) -> conditional.Rendered:
+	return conditional.render(List[schema], (await db.scalars(stmt)).all())
+
+
 @app.get("/universities", response_model=List[schemas.UniversityOut])
-def get_unis(db: Session = Depends(database.get_db)):
-	return db.query(models.University).filter(models.University.is_approved == True).all()
+async def get_unis(request: Request, db: AsyncSession = Depends(database.get_db)):
+	rendered = await hierarchy.cached("universities", lambda: _render_all(
+		db, schemas.UniversityOut, select(models.University).where(models.University.is_approved == True)))
+	return conditional.respond(request, rendered, conditional.HIERARCHY)
 
 
 @app.get("/universities/{id}", response_model=schemas.UniversityOut)
-def get_uni(id: int, db: Session = Depends(database.get_db)):
-	uni = db.query(models.University).filter(models.University.id == id).first()
-	if not uni: raise HTTPException(404, "University not found")
-	return uni
+async def get_uni(id: int, request: Request, db: AsyncSession = Depends(database.get_db)):
+	async def load():
+		uni = await db.get(models.University, id)
+		return conditional.render(schemas.UniversityOut, uni) if uni else None
+	rendered = await hierarchy.cached(("university", id), load)
+	if not rendered: raise HTTPException(404, "University not found")
+	return conditional.respond(request, rendered, conditional.HIERARCHY)
 
 
-@app.post("/universities", status_code=201)
-def add_uni(
+@app.post("/universities", status_code=201, dependencies=[Depends(ratelimit.by_user("upload"))])
+async def add_uni(
 		name: str = Form(...), city: str = Form(...), region: str = Form(...),
 		image: UploadFile = File(None),
-		db: Session = Depends(database.get_db),
+		db: AsyncSession = Depends(database.get_db),
 		user: models.User = Depends(auth.get_current_user)
 ):
-	path = None
-	if image:
-		path = f"/uploads/universities/uni_{user.id}_{image.filename}"
-		with open(f".{path}", "wb+") as f: shutil.copyfileobj(image.file, f)
+	path = await storage.store(db, image) if image else None
 	db.add(models.University(name=name, city=city, region=region, image_url=path, submitted_by_id=user.id))
-	db.commit()
+	await db.commit()
+	hierarchy.bump()
+	dashboard.invalidate(user.id)
 	return {"msg": "OK"}
 
 
-@app.post("/universities/{id}/image_request")
-def img_req(id: int, image: UploadFile = File(...), db: Session = Depends(database.get_db),
-            user: models.User = Depends(auth.get_current_user)):
-	path = f"uploads/universities/req_{id}_{user.id}_{image.filename}"
-	with open(path, "wb+") as f: shutil.copyfileobj(image.file, f)
-
+@app.post("/universities/{id}/image_request", dependencies=[Depends(ratelimit.by_user("upload"))])
+async def img_req(id: int, image: UploadFile = File(...), db: AsyncSession = Depends(database.get_db),
+                  user: models.User = Depends(auth.get_current_user)):
 	db.add(models.UniversityImageRequest(
 		university_id=id,
-		new_image_url=f"/{path}",
+		new_image_url=await storage.store(db, image),
 		submitted_by_id=user.id
 	))
-	db.commit()
+	await db.commit()
 	return {"msg": "Requested"}
 
 
-@app.get("/universities/{id}/reviews", response_model=List[schemas.ReviewOut])
-def get_reviews(id: int, db: Session = Depends(database.get_db)):
-	return db.query(models.Review).filter(models.Review.university_id == id).all()
+@app.get("/universities/{id}/reviews", response_model=schemas.Page[schemas.ReviewOut])
+async def get_reviews(id: int, request: Request, cursor: str = None, limit: int = Depends(page_size),
+                      db: AsyncSession = Depends(database.get_read_db)):
+	q = select(models.Review).options(joinedload(models.Review.user)).where(models.Review.university_id == id)
+	page = await paginate(db, q, (models.Review.created_at, models.Review.id), cursor, limit)
+	return conditional.respond(request, conditional.render(schemas.Page[schemas.ReviewOut], page), conditional.LISTING)
 
 
 @app.post("/reviews")
-def add_review(r: schemas.ReviewCreate, db: Session = Depends(database.get_db),
-               user: models.User = Depends(auth.get_current_user)):
+async def add_review(r: schemas.ReviewCreate, db: AsyncSession = Depends(database.get_db),
+                     user: models.User = Depends(auth.get_current_user)):
 	db.add(models.Review(user_id=user.id, university_id=r.university_id, rating=r.rating, content=r.content))
-	db.commit()
+	await stats.adjust(db, r.university_id, **{stats.rating_column(r.rating): 1})
+	await db.commit()
+	hierarchy.invalidate(*hierarchy.university_keys(r.university_id))
 	return {"msg": "Added"}
 
 
-@app.get("/notes", response_model=List[schemas.NoteOut])
-def get_notes(search: str = None, university_id: int = None, db: Session = Depends(database.get_db)):
-	q = db.query(models.Note).filter(models.Note.is_approved == True)
-	if university_id: q = q.filter(models.Note.university_id == university_id)
-	if search: q = q.filter(or_(models.Note.title.ilike(f"%{search}%"), models.Note.content.ilike(f"%{search}%")))
-	return q.order_by(models.Note.score.desc()).all()
+@app.get("/notes", response_model=schemas.Page[schemas.NoteOut])
+async def get_notes(request: Request, search: str = None, university_id: int = None, subject_id: int = None,
+                    sort: Literal["top", "hot"] = "top", cursor: str = None,
+                    limit: int = Depends(page_size), db: AsyncSession = Depends(database.get_read_db)):
+	"""Approved notes by score ("top") or time-decayed engagement ("hot"); a search orders by relevance."""
+	q = select(models.Note).options(*_note_out_options).where(models.Note.is_approved == True)
+	if university_id: q = q.where(models.Note.university_id == university_id)
+	if subject_id: q = q.where(models.Note.subject_id == subject_id)
+	page = {"items": [], "next_cursor": None}
+	if search:
+		hits = fulltext.hits("note", search)
+		if hits is not None:
+			q = q.join(hits, hits.c.ref_id == models.Note.id)
+			page = await paginate(db, q, (hits.c.rank, models.Note.id), cursor, limit)
+	else:
+		rank = models.Note.hot if sort == "hot" else models.Note.score
+		page = await paginate(db, q, (rank, models.Note.id), cursor, limit)
+	return conditional.respond(request, conditional.render(schemas.Page[schemas.NoteOut], page), conditional.LISTING)
 
 
-@app.post("/notes", status_code=201)
-def add_note(
+@app.post("/notes", status_code=201, dependencies=[Depends(ratelimit.by_user("upload"))])
+async def add_note(
 		university_id: int = Form(...), subject_id: int = Form(...),
 		title: str = Form(None), content: str = Form(None),
 		image: UploadFile = File(None),
-		db: Session = Depends(database.get_db),
+		db: AsyncSession = Depends(database.get_db),
 		user: models.User = Depends(auth.get_current_user)
 ):
-	path = None
-	if image:
-		path = f"/uploads/{image.filename}"
-		with open(f".{path}", "wb+") as f: shutil.copyfileobj(image.file, f)
-
+	path = await storage.store(db, image) if image else None
 	db.add(models.Note(
-		title=title, content=content, image_url=path,
+		title=title, content=content, image_url=path, hot=ranking.hot(0, 0, 0),
 		university_id=university_id, subject_id=subject_id, author_id=user.id
 	))
-	db.commit()
+	await db.commit()
+	dashboard.invalidate(user.id)
 	return {"msg": "OK"}
 
 
-@app.get("/notes/{id}/comments", response_model=List[schemas.CommentOut])
-def get_comments(id: int, db: Session = Depends(database.get_db)):
-	return db.query(models.Comment).filter(models.Comment.note_id == id).all()
+@app.get("/notes/{id}/comments", response_model=schemas.Page[schemas.CommentOut])
+async def get_comments(id: int, cursor: str = None, order: Literal["oldest", "newest"] = "oldest",
+                       limit: int = Depends(page_size), db: AsyncSession = Depends(database.get_read_db)):
+	"""
+	Oldest first by default, so a thread reads top to bottom and new pages append.
+	order=newest puts the latest comments on the first page (chat-style clients reverse
+	it and page backwards), so a new comment shows up without paging through the thread.
+	"""
+	q = select(models.Comment).options(joinedload(models.Comment.user)).where(models.Comment.note_id == id)
+	return await paginate(db, q, (models.Comment.created_at, models.Comment.id), cursor, limit,
+	                      descending=order == "newest")
+
+
+async def _event_stream(topic: str, exists) -> StreamingResponse:
+	# A short-lived session: a Depends() one would stay checked out for the whole stream
+	async with database.SessionLocal() as db:
+		if await db.scalar(exists) is None: raise HTTPException(404)
+	if not events.broker.has_room(): raise HTTPException(503, "Too many live connections", headers={"Retry-After": "30"})
+	return StreamingResponse(events.stream(topic), media_type="text/event-stream",
+	                         headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 
+@app.get("/notes/{id}/events")
+async def note_events(id: int):
+	"""Server-Sent Events for one approved note: vote, favorite, comment (and resync after falling behind)."""
+	approved = select(models.Note.id).where(models.Note.id == id, models.Note.is_approved == True)
+	return await _event_stream(events.note_topic(id), approved)
 
-@app.post("/notes/{id}/comments", response_model=schemas.CommentOut)
-def add_comment(id: int, c: schemas.CommentCreate, db: Session = Depends(database.get_db),
-                user: models.User = Depends(auth.get_current_user)):
-	comm = models.Comment(user_id=user.id, note_id=id, content=c.content)
+
+@app.get("/universities/{id}/events")
+async def university_events(id: int):
+	"""Server-Sent Events for every approved note of a university: vote, favorite, comment (counts), approved."""
+	return await _event_stream(events.university_topic(id),
+	                           select(models.University.id).where(models.University.id == id))
+
+
+@app.post("/notes/{id}/comments", response_model=schemas.CommentOut,
+          dependencies=[Depends(ratelimit.by_user("comment"))])
+async def add_comment(id: int, c: schemas.CommentCreate, db: AsyncSession = Depends(database.get_db),
+                      user: models.User = Depends(auth.get_current_user)):
+	bumped = await interactions.bump(db, id, models.Note.comment_count, 1)
+	if bumped is None: raise HTTPException(404)
+	comm = models.Comment(user_id=user.id, note_id=id, content=c.content, user=user)
 	db.add(comm)
-	db.commit()
-	db.refresh(comm)
+	await db.commit()
+	await db.refresh(comm, ["created_at"])
+	comment_count, university_id, approved = bumped
+	if approved:
+		events.publish(events.note_topic(id), "comment",
+		               {"note_id": id, "comment": schemas.CommentOut.model_validate(comm).model_dump(mode="json")})
+		events.publish(events.university_topic(university_id), "comment", {"note_id": id, "comment_count": comment_count})
 	return comm
 
 
-@app.post("/notes/{id}/vote")
-def vote(id: int, db: Session = Depends(database.get_db), user: models.User = Depends(auth.get_current_user)):
-	note = db.query(models.Note).get(id)
-	if not note: raise HTTPException(404)
+@app.post("/notes/{id}/vote", response_model=schemas.VoteResponse, dependencies=[Depends(ratelimit.by_user("vote"))])
+async def vote(id: int, db: AsyncSession = Depends(database.get_db), user: models.User = Depends(auth.get_current_user)):
+	result = await interactions.toggle_vote(db, user.id, id)
+	if result is None: raise HTTPException(404)
+	voted, score = result
+	dashboard.invalidate(user.id)
+	return {"msg": "Voted" if voted else "Removed", "new_score": score, "user_has_voted": voted}
 
-	existing = db.query(models.Vote).filter(models.Vote.user_id == user.id, models.Vote.note_id == id).first()
-	if existing:
-		db.delete(existing)
-		note.score -= 1
-		msg = "Removed"
-	else:
-		db.add(models.Vote(user_id=user.id, note_id=id, value=1))
-		note.score += 1
-		msg = "Voted"
-	db.commit()
-	return {"msg": msg}
-
-
-@app.post("/notes/{id}/favorite")
-def fav(id: int, db: Session = Depends(database.get_db), user: models.User = Depends(auth.get_current_user)):
-	existing = db.query(models.Favorite).filter(models.Favorite.user_id == user.id,
-	                                            models.Favorite.note_id == id).first()
-	if existing:
-		db.delete(existing)
-		msg = "Removed"
-	else:
-		db.add(models.Favorite(user_id=user.id, note_id=id))
-		msg = "Added"
-	db.commit()
-	return {"msg": msg}
+
+@app.post("/notes/{id}/favorite", response_model=schemas.FavoriteResponse,
+          dependencies=[Depends(ratelimit.by_user("vote"))])
+async def fav(id: int, db: AsyncSession = Depends(database.get_db), user: models.User = Depends(auth.get_current_user)):
+	result = await interactions.toggle_favorite(db, user.id, id)
+	if result is None: raise HTTPException(404)
+	favorited, count = result
+	dashboard.invalidate(user.id)
+	return {"msg": "Added" if favorited else "Removed", "is_favorited": favorited, "favorite_count": count}
 
 
 # --- ADMIN ---
+def _invalidate_hierarchy(action: str, changed: Dict[str, List[int]]):
+	# Cached university responses include images (image requests) and note counts (notes)
+	if changed: hierarchy.bump()
+
+
+def _invalidate_dashboards(action: str, changed: Dict[str, List[int]]):
+	# Submitters are not known here without a query; moderation is rare enough to drop them all
+	if changed.keys() - {"image_request"}: dashboard.cache.clear()
+
+
+async def _publish_approved_notes(action: str, changed: Dict[str, List[int]]):
+	if action != "approve" or not changed.get("note"): return
+	async with database.SessionLocal() as db:
+		notes = (await db.scalars(select(models.Note).options(*_note_out_options)
+		                          .where(models.Note.id.in_(changed["note"])))).all()
+	for note in notes:
+		events.publish_note(note.id, note.university_id, "approved",
+		                    {"note": schemas.NoteOut.model_validate(note).model_dump(mode="json")})
+
+
+moderation.listeners += [_invalidate_hierarchy, _invalidate_dashboards, _publish_approved_notes]
+
+
 @app.get("/admin/pending_items", response_model=schemas.PendingItemsResponse)
-def get_pending(db: Session = Depends(database.get_db), _: models.User = Depends(auth.get_current_active_admin)):
+async def get_pending(limit: int = Depends(page_size), db: AsyncSession = Depends(database.get_db),
+                      _: models.User = Depends(auth.get_current_active_admin)):
+	"""First page of every queue; use /admin/pending/{type} to page further."""
 	return {
-		"notes": db.query(models.Note).filter(models.Note.is_approved == False).all(),
-		"universities": db.query(models.University).filter(models.University.is_approved == False).all(),
-		"faculties": db.query(models.Faculty).filter(models.Faculty.is_approved == False).all(),
-		"fields": db.query(models.FieldOfStudy).filter(models.FieldOfStudy.is_approved == False).all(),
-		"subjects": db.query(models.Subject).filter(models.Subject.is_approved == False).all(),
-		"image_requests": db.query(models.UniversityImageRequest).filter(
-			models.UniversityImageRequest.status == "pending").all()
+		"notes": (await moderation.page(db, "note", None, limit))["items"],
+		"universities": (await moderation.page(db, "university", None, limit))["items"],
+		"faculties": (await moderation.page(db, "faculty", None, limit))["items"],
+		"fields": (await moderation.page(db, "field", None, limit))["items"],
+		"subjects": (await moderation.page(db, "subject", None, limit))["items"],
+		"image_requests": (await moderation.page(db, "image_request", None, limit))["items"]
 	}
 
 
+@app.get("/admin/pending_counts", response_model=Dict[str, int])
+async def get_pending_counts(db: AsyncSession = Depends(database.get_db),
+                             _: models.User = Depends(auth.get_current_active_admin)):
+	"""Pending items per type, for queue badges."""
+	return await moderation.counts(db)
+
+
+@app.get("/admin/pending/{type}")
+async def get_pending_type(type: str, cursor: str = None, limit: int = Depends(page_size),
+                           db: AsyncSession = Depends(database.get_db),
+                           _: models.User = Depends(auth.get_current_active_admin)):
+	return await moderation.page(db, type, cursor, limit)
+
+
+@app.post("/admin/moderate", response_model=schemas.ModerationResult)
+async def moderate(body: schemas.ModerationRequest, db: AsyncSession = Depends(database.get_db),
+                   _: models.User = Depends(auth.get_current_active_admin)):
+	"""Approve or reject many queued items at once, in one transaction."""
+	changed = await moderation.apply(db, body.action, [(i.type, i.id) for i in body.items])
+	return {"action": body.action, "changed": changed}
+
+
+@app.get("/admin/cache_stats")
+async def cache_stats(_: models.User = Depends(auth.get_current_active_admin)):
+	return {**cache.stats(), "hierarchy_version": hierarchy.version()}
+
+
+@app.get("/admin/hash_stats")
+async def hash_stats(_: models.User = Depends(auth.get_current_active_admin)):
+	return hashing.stats.as_dict()
+
+
+@app.get("/admin/event_stats")
+async def event_stats(_: models.User = Depends(auth.get_current_active_admin)):
+	return events.stats.as_dict()
+
+
+@app.get("/admin/throttle_stats")
+async def throttle_stats(_: models.User = Depends(auth.get_current_active_admin)):
+	return ratelimit.stats.as_dict()
+
+
+@app.get("/admin/image_stats")
+async def image_stats(_: models.User = Depends(auth.get_current_active_admin)):
+	return images.snapshot()
+
+
+# --- METRICS ---
+metrics.Gauge("cache_entries", "Entries per in-process cache.",
+              lambda: {(n,): s["size"] for n, s in cache.stats().items()}, ("cache",))
+metrics.Gauge("cache_hits_total", "Cache hits.",
+              lambda: {(n,): s["hits"] for n, s in cache.stats().items()}, ("cache",), kind="counter")
+metrics.Gauge("cache_misses_total", "Cache misses.",
+              lambda: {(n,): s["misses"] for n, s in cache.stats().items()}, ("cache",), kind="counter")
+metrics.Gauge("hierarchy_version", "Current hierarchy cache version.", lambda: {(): hierarchy.version()})
+metrics.Gauge("password_hash_in_flight", "bcrypt jobs queued or running.", lambda: {(): hashing.stats.in_flight})
+metrics.Gauge("password_hash_completed_total", "bcrypt jobs completed.",
+              lambda: {(): hashing.stats.completed}, kind="counter")
+metrics.Gauge("password_hash_rejected_total", "bcrypt jobs rejected with 503.",
+              lambda: {(): hashing.stats.rejected}, kind="counter")
+metrics.Gauge("password_hash_seconds_total", "Time bcrypt jobs spent queued and running.",
+              lambda: {("wait",): hashing.stats.wait_seconds, ("run",): hashing.stats.run_seconds}, ("phase",), kind="counter")
+metrics.Gauge("events_subscribers", "Open live event streams.",
+              lambda: {(kind,): n for kind, n in events.broker.counts().items()}, ("topic",))
+metrics.Gauge("events_published_total", "Live events published by this worker.",
+              lambda: {(t,): n for t, n in events.stats.published.items()}, ("type",), kind="counter")
+metrics.Gauge("events_delivered_total", "Live events queued to subscribers.", lambda: {(): events.stats.delivered}, kind="counter")
+metrics.Gauge("events_resyncs_total", "Subscribers whose backlog overflowed and was dropped.",
+              lambda: {(): events.stats.resyncs}, kind="counter")
+metrics.Gauge("events_rejected_total", "Streams refused at EVENTS_MAX_SUBSCRIBERS.",
+              lambda: {(): events.stats.rejected}, kind="counter")
+metrics.Gauge("ratelimit_throttled_total", "Requests refused with 429, per budget.",
+              lambda: {(n,): c for n, c in ratelimit.stats.throttled.items()}, ("budget",), kind="counter")
+metrics.Gauge("concurrency_shed_total", "Requests refused with 503 at MAX_CONCURRENT_REQUESTS.",
+              lambda: {(): ratelimit.stats.shed}, kind="counter")
+metrics.Gauge("concurrency_in_flight", "Requests counted against MAX_CONCURRENT_REQUESTS.",
+              lambda: {(): ratelimit.stats.in_flight})
+metrics.Gauge("image_derivatives_pending", "Images waiting for derivatives.", lambda: {(): images.snapshot()["pending"]})
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+	"""Prometheus scrape endpoint; restrict access at the proxy."""
+	return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/admin/approve/{type}/{id}")
-def approve(type: str, id: int, db: Session = Depends(database.get_db),
-            _: models.User = Depends(auth.get_current_active_admin)):
-	model_map = {
-		"university": models.University,
-		"faculty": models.Faculty,
-		"field": models.FieldOfStudy,
-		"subject": models.Subject,
-		"note": models.Note
-	}
-	item = db.query(model_map[type]).get(id)
-	if item:
-		item.is_approved = True
-		db.commit()
+async def approve(type: str, id: int, db: AsyncSession = Depends(database.get_db),
+                  _: models.User = Depends(auth.get_current_active_admin)):
+	await moderation.apply(db, "approve", [(type, id)])
 	return {"msg": "Approved"}
 
 
 @app.delete("/admin/reject/{type}/{id}")
-def reject(type: str, id: int, db: Session = Depends(database.get_db),
-           _: models.User = Depends(auth.get_current_active_admin)):
-	model_map = {
-		"university": models.University,
-		"faculty": models.Faculty,
-		"field": models.FieldOfStudy,
-		"subject": models.Subject,
-		"note": models.Note
-	}
-	item = db.query(model_map[type]).get(id)
-	if item:
-		db.delete(item)
-		db.commit()
+async def reject(type: str, id: int, db: AsyncSession = Depends(database.get_db),
+                 _: models.User = Depends(auth.get_current_active_admin)):
+	await moderation.apply(db, "reject", [(type, id)])
 	return {"msg": "Rejected"}
 
 
+@app.post("/admin/import/syllabus")
+async def import_syllabus(file: UploadFile = File(...), dry_run: bool = Form(False),
+                          db: AsyncSession = Depends(database.get_db),
+                          _: models.User = Depends(auth.get_current_active_admin)):
+	"""Bulk-upsert a CSV/JSON syllabus (see app/syllabus.py for the format); returns counts and throughput."""
+	content = await file.read(storage.MAX_UPLOAD_BYTES + 1)
+	if len(content) > storage.MAX_UPLOAD_BYTES: raise HTTPException(413, "File too large")
+	try:
+		return await syllabus.import_rows(db, syllabus.parse(file.filename or "", content), dry_run)
+	except ValueError as e:
+		raise HTTPException(400, str(e))
+
+
 @app.post("/admin/approve_image_request/{id}")
-def approve_img(id: int, db: Session = Depends(database.get_db),
-                _: models.User = Depends(auth.get_current_active_admin)):
-	req = db.query(models.UniversityImageRequest).get(id)
-	if req:
-		uni = db.query(models.University).get(req.university_id)
-		uni.image_url = req.new_image_url
-		req.status = "approved"
-		db.commit()
+async def approve_img(id: int, db: AsyncSession = Depends(database.get_db),
+                      _: models.User = Depends(auth.get_current_active_admin)):
+	await moderation.apply(db, "approve", [("image_request", id)])
 	return {"msg": "Approved"}
 
 
 @app.post("/admin/reject_image_request/{id}")
-def reject_img(id: int, db: Session = Depends(database.get_db),
-               _: models.User = Depends(auth.get_current_active_admin)):
-	req = db.query(models.UniversityImageRequest).get(id)
-	if req:
-		req.status = "rejected"
-		db.commit()
+async def reject_img(id: int, db: AsyncSession = Depends(database.get_db),
+                     _: models.User = Depends(auth.get_current_active_admin)):
+	await moderation.apply(db, "reject", [("image_request", id)])
 	return {"msg": "Rejected"}
 
 
 @app.patch("/admin/universities/{id}/image")
-def update_uni_img(id: int, image: UploadFile = File(...), db: Session = Depends(database.get_db),
-                   _: models.User = Depends(auth.get_current_active_admin)):
-	path = f"/uploads/universities/admin_{id}_{image.filename}"
-	with open(f".{path}", "wb+") as f: shutil.copyfileobj(image.file, f)
-	uni = db.query(models.University).get(id)
-	uni.image_url = path
-	db.commit()
+async def update_uni_img(id: int, image: UploadFile = File(...), db: AsyncSession = Depends(database.get_db),
+                         _: models.User = Depends(auth.get_current_active_admin)):
+	uni = await db.get(models.University, id)
+	if not uni: raise HTTPException(404, "University not found")
+	uni.image_url = await storage.store(db, image)
+	await db.commit()
+	hierarchy.bump()
 	return {"msg": "Updated"}
 
 
 @app.put("/universities/{id}")
-def update_uni(id: int, description: str = Form(None), banner: UploadFile = File(None),
-               db: Session = Depends(database.get_db), user: models.User = Depends(auth.get_current_active_admin)):
-	uni = db.query(models.University).get(id)
+async def update_uni(id: int, description: str = Form(None), banner: UploadFile = File(None),
+                     db: AsyncSession = Depends(database.get_db),
+                     user: models.User = Depends(auth.get_current_active_admin)):
+	uni = await db.get(models.University, id)
 	if description: uni.description = description
 	if banner:
-		path = f"/uploads/universities/banner_{id}_{banner.filename}"
-		with open(f".{path}", "wb+") as f: shutil.copyfileobj(banner.file, f)
-		uni.banner_url = path
-	db.commit()
+		uni.banner_url = await storage.store(db, banner)
+	await db.commit()
+	hierarchy.bump()
 	return {"msg": "OK"}
 
 
 # --- FACULTIES/FIELDS/SUBJECTS CRUD ---
 @app.get("/universities/{id}/faculties", response_model=List[schemas.FacultyOut])
-def get_facs(id: int, db: Session = Depends(database.get_db)): return db.query(models.Faculty).filter(
-	models.Faculty.university_id == id, models.Faculty.is_approved == True).all()
+async def get_facs(id: int, request: Request, db: AsyncSession = Depends(database.get_db)):
+	rendered = await hierarchy.cached(("faculties", id), lambda: _render_all(db, schemas.FacultyOut, select(models.Faculty).where(
+		models.Faculty.university_id == id, models.Faculty.is_approved == True)))
+	return conditional.respond(request, rendered, conditional.HIERARCHY)
+
+
+@app.get("/universities/{id}/tree", response_model=schemas.UniversityTree)
+async def get_tree(id: int, request: Request, semester: int = Query(None, ge=1),
+                   db: AsyncSession = Depends(database.get_db)):
+	"""Approved Faculty -> FieldOfStudy -> Subject syllabus of a university in one response, from four queries regardless of size."""
+	async def load():
+		if not await db.get(models.University, id): return None
+		faculties = (await db.scalars(select(models.Faculty).where(
+			models.Faculty.university_id == id, models.Faculty.is_approved == True).order_by(models.Faculty.id))).all()
+		fields = (await db.scalars(select(models.FieldOfStudy).where(
+			models.FieldOfStudy.faculty_id.in_([f.id for f in faculties]),
+			models.FieldOfStudy.is_approved == True).order_by(models.FieldOfStudy.id))).all()
+		subjects = select(models.Subject).where(
+			models.Subject.field_of_study_id.in_([f.id for f in fields]), models.Subject.is_approved == True)
+		if semester: subjects = subjects.where(models.Subject.semester == semester)
+		subjects = (await db.scalars(subjects.order_by(models.Subject.semester, models.Subject.id))).all()
+
+		by_field = {f.id: {**schemas.FieldOfStudyOut.model_validate(f).model_dump(), "subjects": []} for f in fields}
+		for s in subjects: by_field[s.field_of_study_id]["subjects"].append(s)
+		by_faculty = {f.id: {**schemas.FacultyOut.model_validate(f).model_dump(), "fields": []} for f in faculties}
+		for f in by_field.values(): by_faculty[f["faculty_id"]]["fields"].append(f)
+		return conditional.render(schemas.UniversityTree,
+		                          {"university_id": id, "semester": semester, "faculties": list(by_faculty.values())})
+
+	rendered = await hierarchy.cached(("tree", id, semester), load)
+	if not rendered: raise HTTPException(404, "University not found")
+	return conditional.respond(request, rendered, conditional.HIERARCHY)
 
 
 @app.post("/faculties")
-def add_fac(name: str = Form(...), university_id: int = Form(...), db: Session = Depends(database.get_db),
-            user: models.User = Depends(auth.get_current_user)):
+async def add_fac(name: str = Form(...), university_id: int = Form(...), db: AsyncSession = Depends(database.get_db),
+                  user: models.User = Depends(auth.get_current_user)):
 	db.add(models.Faculty(name=name, university_id=university_id, submitted_by_id=user.id))
-	db.commit()
+	await db.commit()
+	hierarchy.bump()
+	dashboard.invalidate(user.id)
 	return {"msg": "OK"}
 
 
 @app.get("/faculties/{id}/fields", response_model=List[schemas.FieldOfStudyOut])
-def get_fields(id: int, db: Session = Depends(database.get_db)): return db.query(models.FieldOfStudy).filter(
-	models.FieldOfStudy.faculty_id == id, models.FieldOfStudy.is_approved == True).all()
+async def get_fields(id: int, request: Request, db: AsyncSession = Depends(database.get_db)):
+	rendered = await hierarchy.cached(("fields", id), lambda: _render_all(db, schemas.FieldOfStudyOut, select(models.FieldOfStudy).where(
+		models.FieldOfStudy.faculty_id == id, models.FieldOfStudy.is_approved == True)))
+	return conditional.respond(request, rendered, conditional.HIERARCHY)
 
 
 @app.post("/fields")
-def add_field(f: schemas.FieldOfStudyCreate, db: Session = Depends(database.get_db),
-              user: models.User = Depends(auth.get_current_user)):
+async def add_field(f: schemas.FieldOfStudyCreate, db: AsyncSession = Depends(database.get_db),
+                    user: models.User = Depends(auth.get_current_user)):
 	db.add(models.FieldOfStudy(**f.dict(), submitted_by_id=user.id))
-	db.commit()
+	await db.commit()
+	hierarchy.bump()
+	dashboard.invalidate(user.id)
 	return {"msg": "OK"}
 
 
 @app.get("/fields/{id}/subjects", response_model=List[schemas.SubjectOut])
-def get_subjects(id: int, db: Session = Depends(database.get_db)): return db.query(models.Subject).filter(
-	models.Subject.field_of_study_id == id, models.Subject.is_approved == True).all()
+async def get_subjects(id: int, request: Request, db: AsyncSession = Depends(database.get_db)):
+	rendered = await hierarchy.cached(("subjects", id), lambda: _render_all(db, schemas.SubjectOut, select(models.Subject).where(
+		models.Subject.field_of_study_id == id, models.Subject.is_approved == True)))
+	return conditional.respond(request, rendered, conditional.HIERARCHY)
 
 
 @app.post("/subjects")
-def add_subject(s: schemas.SubjectCreate, db: Session = Depends(database.get_db),
-                user: models.User = Depends(auth.get_current_user)):
+async def add_subject(s: schemas.SubjectCreate, db: AsyncSession = Depends(database.get_db),
+                      user: models.User = Depends(auth.get_current_user)):
 	db.add(models.Subject(**s.dict(), submitted_by_id=user.id))
-	db.commit()
-	return {"msg": "OK"}
\ No newline at end of file
+	await db.commit()
+	hierarchy.bump()
+	dashboard.invalidate(user.id)
+	return {"msg": "OK"}
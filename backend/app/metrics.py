@@ -0,0 +1,222 @@
+"""
+Request and database metrics in Prometheus text format (GET /metrics).
+
+`Middleware` times every request and labels it with its route template. SQLAlchemy
+events installed by `instrument(engine)` count statements and database time into the
+current request (a context variable), and a wrapper around the pool's connect() times
+checkout waits. Per route this gives latency, DB query count, DB time and response
+size histograms.
+
+Set SLOW_REQUEST_MS to log, at WARNING on "app.slow", every request slower than that,
+with the SQL statements it executed.
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import event
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+# Statements kept per slow request, and characters per statement
+SLOW_LOG_STATEMENTS = 50
+SLOW_LOG_SQL_CHARS = 500
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+slow_log = logging.getLogger("app.slow")
+
+
+def _escape(value: str) -> str:
+	return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+	parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+	if extra: parts.append(extra)
+	return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+	kind = "counter"
+
+	def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+		self.name, self.help, self.label_names = name, help, labels
+		self._values: Dict[Tuple, float] = {}
+		self._lock = threading.Lock()
+		registry.append(self)
+
+	def inc(self, amount: float = 1, **labels):
+		key = tuple(labels[n] for n in self.label_names)
+		with self._lock:
+			self._values[key] = self._values.get(key, 0) + amount
+
+	def samples(self) -> Iterable[str]:
+		for key, value in sorted(self._values.items()):
+			yield f"{self.name}{_labels(self.label_names, key)} {value}"
+
+
+class Histogram:
+	kind = "histogram"
+
+	def __init__(self, name: str, help: str, buckets: Tuple[float, ...], labels: Tuple[str, ...] = ()):
+		self.name, self.help, self.buckets, self.label_names = name, help, buckets, labels
+		# key -> [per-bucket counts..., +Inf count, sum]
+		self._values: Dict[Tuple, List[float]] = {}
+		self._lock = threading.Lock()
+		registry.append(self)
+
+	def observe(self, value: float, **labels):
+		key = tuple(labels[n] for n in self.label_names)
+		with self._lock:
+			row = self._values.get(key)
+			if row is None: row = self._values[key] = [0] * (len(self.buckets) + 2)
+			row[bisect.bisect_left(self.buckets, value)] += 1
+			row[-1] += value
+
+	def samples(self) -> Iterable[str]:
+		for key, row in sorted(self._values.items()):
+			cumulative = 0
+			for bound, count in zip((*self.buckets, "+Inf"), row[:-1]):
+				cumulative += count
+				le = f'le="{bound}"'
+				yield f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}"
+			yield f"{self.name}_sum{_labels(self.label_names, key)} {row[-1]}"
+			yield f"{self.name}_count{_labels(self.label_names, key)} {cumulative}"
+
+
+class Gauge:
+	"""
+	Values read at scrape time from `read()`, which returns {label values: value}. Also
+	exposes counters kept elsewhere (cache hits, hash pool stats) with kind="counter".
+	"""
+
+	def __init__(self, name: str, help: str, read, labels: Tuple[str, ...] = (), kind: str = "gauge"):
+		self.name, self.help, self.read, self.label_names, self.kind = name, help, read, labels, kind
+		registry.append(self)
+
+	def samples(self) -> Iterable[str]:
+		for key, value in sorted(self.read().items()):
+			yield f"{self.name}{_labels(self.label_names, key)} {value}"
+
+
+registry: list = []
+
+requests_total = Counter("http_requests_total", "Requests by route and status.", ("method", "route", "status"))
+request_seconds = Histogram("http_request_duration_seconds", "Request latency.", LATENCY_BUCKETS, ("method", "route"))
+response_bytes = Histogram("http_response_size_bytes", "Response body size.", SIZE_BUCKETS, ("method", "route"))
+db_queries = Histogram("http_request_db_queries", "SQL statements per request.", COUNT_BUCKETS, ("method", "route"))
+db_seconds = Histogram("http_request_db_seconds", "Time spent in SQL per request.", LATENCY_BUCKETS, ("method", "route"))
+checkout_seconds = Histogram("db_pool_checkout_seconds", "Wait for a pooled connection.", LATENCY_BUCKETS, ("engine",))
+_in_progress = 0
+Gauge("http_requests_in_progress", "Requests being handled.", lambda: {(): _in_progress})
+
+
+class RequestStats:
+	__slots__ = ("queries", "db_seconds", "statements")
+
+	def __init__(self, keep_statements: bool):
+		self.queries = 0
+		self.db_seconds = 0.0
+		self.statements: Optional[list] = [] if keep_statements else None
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+	conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+	elapsed = time.perf_counter() - conn.info["query_started"].pop()
+	stats = _current.get()
+	if stats is None: return
+	stats.queries += 1
+	stats.db_seconds += elapsed
+	if stats.statements is not None and len(stats.statements) < SLOW_LOG_STATEMENTS:
+		stats.statements.append(f"[{elapsed * 1000:.1f} ms] {statement[:SLOW_LOG_SQL_CHARS]}")
+
+
+def instrument(engine, name: str = "primary"):
+	"""Record statements, DB time and pool checkout waits of `engine` (sync or async)."""
+	engine = getattr(engine, "sync_engine", engine)
+	event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+	event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+	pool = engine.pool
+	connect = pool.connect
+
+	def timed_connect():
+		started = time.perf_counter()
+		try:
+			return connect()
+		finally:
+			checkout_seconds.observe(time.perf_counter() - started, engine=name)
+
+	pool.connect = timed_connect
+	Gauge("db_pool_checked_out", "Connections currently checked out.",
+	      lambda: {(name,): pool.checkedout()} if hasattr(pool, "checkedout") else {}, ("engine",))
+
+
+def _route(scope) -> str:
+	route = scope.get("route")
+	if route is not None: return route.path
+	# Mounted apps (static uploads) have no APIRoute; label them by mount prefix
+	if scope.get("root_path"): return scope["root_path"] + "/*"
+	return "unmatched"
+
+
+class Middleware:
+	"""Pure ASGI middleware, so streamed bodies are counted without buffering."""
+
+	def __init__(self, app):
+		self.app = app
+
+	async def __call__(self, scope, receive, send):
+		global _in_progress
+		if scope["type"] != "http" or scope["path"] == "/metrics":
+			return await self.app(scope, receive, send)
+		stats = RequestStats(keep_statements=SLOW_REQUEST_MS > 0)
+		token = _current.set(stats)
+		status, size = 500, 0
+
+		async def send_wrapper(message):
+			nonlocal status, size
+			if message["type"] == "http.response.start":
+				status = message["status"]
+			elif message["type"] == "http.response.body":
+				size += len(message.get("body", b""))
+			await send(message)
+
+		_in_progress += 1
+		started = time.perf_counter()
+		try:
+			await self.app(scope, receive, send_wrapper)
+		finally:
+			elapsed = time.perf_counter() - started
+			_in_progress -= 1
+			_current.reset(token)
+			method, route = scope["method"], _route(scope)
+			requests_total.inc(method=method, route=route, status=str(status))
+			request_seconds.observe(elapsed, method=method, route=route)
+			response_bytes.observe(size, method=method, route=route)
+			db_queries.observe(stats.queries, method=method, route=route)
+			db_seconds.observe(stats.db_seconds, method=method, route=route)
+			if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+				slow_log.warning("%s %s (%s) %d in %.1f ms, %d queries / %.1f ms in SQL\n  %s",
+				                 method, scope["path"], route, status, elapsed * 1000, stats.queries,
+				                 stats.db_seconds * 1000, "\n  ".join(stats.statements))
+
+
+def render() -> str:
+	"""The registry in Prometheus text exposition format."""
+	lines = []
+	for metric in registry:
+		lines.append(f"# HELP {metric.name} {metric.help}")
+		lines.append(f"# TYPE {metric.name} {metric.kind}")
+		lines.extend(metric.samples())
+	return "\n".join(lines) + "\n"
@@ -0,0 +1,130 @@
+"""
+Versioned schema migrations.
+
+Each migration is a module app/migrations/vNNNN_<name>.py with an `upgrade(conn)`
+function taking a sync Connection. Applied versions are recorded in `schema_migrations`.
+`python -m app.migrate` applies the pending ones in order, in one transaction and under
+an advisory lock, so several containers may run it at once. The app never changes the
+schema itself: startup only checks `pending()` and warns.
+
+v0001 creates the original tables as they were then (adopting databases made by the old
+create_all startup), so later migrations check before altering; use the helpers below.
+Migrations spell out their DDL instead of importing the models. Data derived by app code
+(search index, hot scores, stats) is named in a migration's REBUILD tuple and rebuilt by
+the live modules once every pending migration has run, against the current schema.
+
+	python -m app.migrate          apply pending migrations
+	python -m app.migrate status   list applied and pending migrations
+"""
+import asyncio
+import importlib
+import pkgutil
+import sys
+from typing import List, Tuple
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+from . import database, fulltext, migrations, ranking, stats
+
+_meta = MetaData()
+schema_migrations = Table(
+	"schema_migrations", _meta,
+	Column("version", Integer, primary_key=True),
+	Column("name", String, nullable=False),
+	Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+# REBUILD names -> rebuild(conn) of the live module owning that data
+REBUILDS = {
+	"search": fulltext.rebuild,
+	"ranking": ranking.refresh,
+	"stats": stats.rebuild,
+}
+
+
+def available() -> List[Tuple[int, str]]:
+	"""(version, module name) of every migration, in order."""
+	found = []
+	for info in pkgutil.iter_modules(migrations.__path__):
+		version, _, _ = info.name.partition("_")
+		if version.startswith("v") and version[1:].isdigit():
+			found.append((int(version[1:]), info.name))
+	return sorted(found)
+
+
+def _applied(conn) -> set:
+	if not inspect(conn).has_table(schema_migrations.name): return set()
+	return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def pending(conn) -> List[Tuple[int, str]]:
+	applied = _applied(conn)
+	return [m for m in available() if m[0] not in applied]
+
+
+def upgrade(conn) -> List[str]:
+	"""Apply pending migrations on `conn`; returns their names."""
+	_meta.create_all(conn)
+	done, rebuilds = [], {}
+	for version, name in pending(conn):
+		module = importlib.import_module(f"{migrations.__name__}.{name}")
+		module.upgrade(conn)
+		rebuilds.update(dict.fromkeys(getattr(module, "REBUILD", ())))
+		conn.execute(schema_migrations.insert().values(version=version, name=name))
+		done.append(name)
+	for rebuild in rebuilds:
+		REBUILDS[rebuild](conn)
+	return done
+
+
+# --- Helpers for idempotent migrations ---
+def has_column(conn, table: str, column: str) -> bool:
+	return any(c["name"] == column for c in inspect(conn).get_columns(table))
+
+
+def add_column(conn, table: str, column: Column):
+	"""ALTER TABLE ... ADD COLUMN unless it exists. `column` is a detached Column."""
+	if has_column(conn, table, column.name): return
+	ddl = column.type.compile(conn.dialect)
+	if column.server_default is not None: ddl += f" DEFAULT {column.server_default.arg}"
+	if not column.nullable: ddl += " NOT NULL"
+	conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column.name} {ddl}"))
+
+
+def index_columns(conn, table: str, name: str):
+	"""Column names of index `name` on `table`, or None if there is no such index."""
+	return next((i["column_names"] for i in inspect(conn).get_indexes(table) if i["name"] == name), None)
+
+
+def create_index(conn, name: str, table: str, *columns: str, where: str = None):
+	"""CREATE INDEX unless an index of that name exists on the table; `where` makes it partial."""
+	if index_columns(conn, table, name) is not None: return
+	ddl = f"CREATE INDEX {name} ON {table} ({', '.join(columns)})"
+	if where: ddl += f" WHERE {where}"
+	conn.execute(text(ddl))
+
+
+def drop_index(conn, name: str, table: str):
+	"""DROP INDEX if it exists on the table."""
+	if index_columns(conn, table, name) is None: return
+	conn.execute(text(f"DROP INDEX {name}"))
+
+
+async def _main(argv) -> int:
+	if argv[1:] == ["status"]:
+		async with database.engine.connect() as conn:
+			todo = await conn.run_sync(pending)
+		for version, name in available():
+			print(f"{'pending' if (version, name) in todo else 'applied'}  {name}")
+	elif not argv[1:]:
+		async with database.locked("migrate") as conn:
+			done = await conn.run_sync(upgrade)
+		print(f"--- APPLIED {len(done)} MIGRATIONS{': ' + ', '.join(done) if done else ''} ---")
+	else:
+		print("usage: python -m app.migrate [status]")
+		return 2
+	await database.engine.dispose()
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(asyncio.run(_main(sys.argv)))
@@ -0,0 +1,123 @@
+"""
+The original schema, as the app's create_all startup used to build it. Frozen here rather
+than taken from app.models, so later model changes never alter what this creates.
+"""
+from sqlalchemy import (Boolean, Column, DateTime, Float, ForeignKey, Integer, MetaData, String, Table, Text,
+                        UniqueConstraint, func)
+
+metadata = MetaData()
+
+
+def _id():
+	return Column("id", Integer, primary_key=True, index=True)
+
+
+def _created_at():
+	return Column("created_at", DateTime(timezone=True), server_default=func.now())
+
+
+Table(
+	"users", metadata, _id(),
+	Column("email", String, unique=True, index=True, nullable=False),
+	Column("hashed_password", String, nullable=False),
+	Column("nickname", String, nullable=True),
+	Column("bio", Text, nullable=True),
+	Column("avatar_url", String, nullable=True),
+	Column("is_verified", Boolean),
+	Column("is_admin", Boolean),
+	Column("is_active", Boolean),
+	Column("university_id", Integer, ForeignKey("universities.id"), nullable=False),
+	_created_at(),
+)
+Table(
+	"universities", metadata, _id(),
+	Column("name", String, nullable=False),
+	Column("name_pl", String, nullable=True),
+	Column("name_en", String, nullable=True),
+	Column("city", String, nullable=False),
+	Column("region", String, nullable=False),
+	Column("description", Text, nullable=True),
+	Column("banner_url", String, nullable=True),
+	Column("image_url", String, nullable=True),
+	Column("is_approved", Boolean),
+	Column("submitted_by_id", Integer, ForeignKey("users.id"), nullable=True),
+)
+Table(
+	"university_image_requests", metadata, _id(),
+	Column("university_id", Integer, ForeignKey("universities.id")),
+	Column("new_image_url", String),
+	Column("status", String),
+	Column("submitted_by_id", Integer, ForeignKey("users.id")),
+	_created_at(),
+)
+Table(
+	"faculties", metadata, _id(),
+	Column("name", String, nullable=False),
+	Column("image_url", String, nullable=True),
+	Column("university_id", Integer, ForeignKey("universities.id")),
+	Column("is_approved", Boolean),
+	Column("submitted_by_id", Integer, ForeignKey("users.id"), nullable=True),
+)
+Table(
+	"fields_of_study", metadata, _id(),
+	Column("name", String, nullable=False),
+	Column("degree_level", String),
+	Column("faculty_id", Integer, ForeignKey("faculties.id")),
+	Column("is_approved", Boolean),
+	Column("submitted_by_id", Integer, ForeignKey("users.id"), nullable=True),
+)
+Table(
+	"subjects", metadata, _id(),
+	Column("name", String, nullable=False),
+	Column("semester", Integer),
+	Column("field_of_study_id", Integer, ForeignKey("fields_of_study.id")),
+	Column("is_approved", Boolean),
+	Column("submitted_by_id", Integer, ForeignKey("users.id"), nullable=True),
+)
+Table(
+	"notes", metadata, _id(),
+	Column("title", String),
+	Column("content", Text),
+	Column("image_url", String),
+	Column("video_url", String),
+	Column("link_url", String),
+	Column("score", Float),
+	Column("is_approved", Boolean),
+	_created_at(),
+	Column("author_id", Integer, ForeignKey("users.id")),
+	Column("university_id", Integer, ForeignKey("universities.id")),
+	Column("subject_id", Integer, ForeignKey("subjects.id"), nullable=True),
+)
+Table(
+	"votes", metadata, _id(),
+	Column("user_id", Integer, ForeignKey("users.id")),
+	Column("note_id", Integer, ForeignKey("notes.id")),
+	Column("value", Integer),
+	UniqueConstraint("user_id", "note_id", name="_user_note_vote_uc"),
+)
+Table(
+	"favorites", metadata, _id(),
+	Column("user_id", Integer, ForeignKey("users.id")),
+	Column("note_id", Integer, ForeignKey("notes.id")),
+	_created_at(),
+	UniqueConstraint("user_id", "note_id", name="_user_note_fav_uc"),
+)
+Table(
+	"reviews", metadata, _id(),
+	Column("user_id", Integer, ForeignKey("users.id")),
+	Column("university_id", Integer, ForeignKey("universities.id")),
+	Column("rating", Integer),
+	Column("content", Text),
+	_created_at(),
+)
+Table(
+	"comments", metadata, _id(),
+	Column("user_id", Integer, ForeignKey("users.id")),
+	Column("note_id", Integer, ForeignKey("notes.id")),
+	Column("content", Text),
+	_created_at(),
+)
+
+
+def upgrade(conn):
+	metadata.create_all(conn)
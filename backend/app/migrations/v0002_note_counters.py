@@ -0,0 +1,13 @@
+"""Denormalized Note.favorite_count / comment_count, backfilled from their tables."""
+from sqlalchemy import Column, Integer, text
+from ..migrate import add_column
+
+
+def upgrade(conn):
+	add_column(conn, "notes", Column("favorite_count", Integer, server_default="0", nullable=False))
+	add_column(conn, "notes", Column("comment_count", Integer, server_default="0", nullable=False))
+	conn.execute(text(
+		"UPDATE notes SET "
+		"favorite_count = (SELECT count(*) FROM favorites WHERE favorites.note_id = notes.id), "
+		"comment_count = (SELECT count(*) FROM comments WHERE comments.note_id = notes.id)"
+	))
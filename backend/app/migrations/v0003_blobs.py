@@ -0,0 +1,16 @@
+"""Content-addressed upload registry (app.storage)."""
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func
+
+blobs = Table(
+	"blobs", MetaData(),
+	Column("hash", String(64), primary_key=True),
+	Column("url", String, unique=True, nullable=False),
+	Column("size", Integer, nullable=False),
+	Column("content_type", String, nullable=True),
+	Column("refcount", Integer, server_default="0", nullable=False),
+	Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+def upgrade(conn):
+	blobs.create(conn, checkfirst=True)
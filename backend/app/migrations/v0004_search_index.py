@@ -0,0 +1,25 @@
+"""Full-text index table (app.fulltext), populated from existing rows."""
+from sqlalchemy import text
+
+REBUILD = ("search",)
+
+POSTGRES = [
+	"CREATE EXTENSION IF NOT EXISTS pg_trgm",
+	"""CREATE TABLE IF NOT EXISTS search_documents (
+		kind VARCHAR(16) NOT NULL,
+		ref_id INTEGER NOT NULL,
+		body TEXT NOT NULL,
+		tsv TSVECTOR GENERATED ALWAYS AS (to_tsvector('simple', body)) STORED,
+		PRIMARY KEY (kind, ref_id))""",
+	"CREATE INDEX IF NOT EXISTS ix_search_documents_tsv ON search_documents USING gin (tsv)",
+	"CREATE INDEX IF NOT EXISTS ix_search_documents_trgm ON search_documents USING gin (body gin_trgm_ops)",
+]
+SQLITE = [
+	"CREATE VIRTUAL TABLE IF NOT EXISTS search_documents "
+	"USING fts5(body, kind UNINDEXED, ref_id UNINDEXED, tokenize = 'unicode61')",
+]
+
+
+def upgrade(conn):
+	for stmt in POSTGRES if conn.dialect.name == "postgresql" else SQLITE:
+		conn.execute(text(stmt))
@@ -0,0 +1,12 @@
+"""Note.hot (app.ranking) with its indexes, computed for existing notes."""
+from sqlalchemy import Column, Float
+from ..migrate import add_column, create_index
+
+REBUILD = ("ranking",)
+
+
+def upgrade(conn):
+	add_column(conn, "notes", Column("hot", Float, server_default="0", nullable=False))
+	create_index(conn, "ix_notes_hot", "notes", "hot", "id")
+	create_index(conn, "ix_notes_university_hot", "notes", "university_id", "hot", "id")
+	create_index(conn, "ix_notes_subject_hot", "notes", "subject_id", "hot", "id")
@@ -0,0 +1,17 @@
+"""Per-university stats table (app.stats), computed from existing rows."""
+from sqlalchemy import Column, ForeignKey, Integer, MetaData, Table
+
+REBUILD = ("stats",)
+
+metadata = MetaData()
+Table("universities", metadata, Column("id", Integer, primary_key=True))
+university_stats = Table(
+	"university_stats", metadata,
+	Column("university_id", Integer, ForeignKey("universities.id", ondelete="CASCADE"), primary_key=True),
+	*(Column(name, Integer, server_default="0", nullable=False)
+	  for name in ("rating_1", "rating_2", "rating_3", "rating_4", "rating_5", "note_count", "user_count")),
+)
+
+
+def upgrade(conn):
+	university_stats.create(conn, checkfirst=True)
@@ -0,0 +1,27 @@
+"""
+Indexes for the listing, moderation and cascade query shapes (see each model's
+__table_args__). Plain CREATE INDEX, so large tables are write-locked while it runs;
+on a busy Postgres create them CONCURRENTLY by hand first, this then skips them.
+"""
+from ..migrate import create_index
+
+INDEXES = (
+	("ix_users_university", "users", "university_id"),
+	("ix_image_requests_status", "university_image_requests", "status", "id"),
+	("ix_faculties_university", "faculties", "university_id", "is_approved"),
+	("ix_fields_of_study_faculty", "fields_of_study", "faculty_id", "is_approved"),
+	("ix_subjects_field_of_study", "subjects", "field_of_study_id", "is_approved"),
+	("ix_notes_approved_score", "notes", "is_approved", "score", "id"),
+	("ix_notes_approved_id", "notes", "is_approved", "id"),
+	("ix_notes_university_score", "notes", "university_id", "is_approved", "score", "id"),
+	("ix_notes_subject_score", "notes", "subject_id", "is_approved", "score", "id"),
+	("ix_votes_note", "votes", "note_id"),
+	("ix_favorites_note", "favorites", "note_id"),
+	("ix_reviews_university_created", "reviews", "university_id", "created_at", "id"),
+	("ix_comments_note_created", "comments", "note_id", "created_at", "id"),
+)
+
+
+def upgrade(conn):
+	for index in INDEXES:
+		create_index(conn, *index)
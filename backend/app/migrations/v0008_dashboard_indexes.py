@@ -0,0 +1,12 @@
+"""Indexes for the user dashboard: a user's notes and favorites, newest first."""
+from ..migrate import create_index
+
+INDEXES = (
+	("ix_notes_author_created", "notes", "author_id", "is_approved", "created_at", "id"),
+	("ix_favorites_user_created", "favorites", "user_id", "created_at", "id"),
+)
+
+
+def upgrade(conn):
+	for index in INDEXES:
+		create_index(conn, *index)
@@ -0,0 +1,7 @@
+"""Re-index search documents with the stemmer's mobile-e rule ("całek" -> "całk")."""
+
+REBUILD = ("search",)
+
+
+def upgrade(conn):
+	pass  # data only, see REBUILD
@@ -0,0 +1,17 @@
+"""
+(is_approved, id) indexes for the university, faculty, field and subject moderation
+queues, which v0007 only added for notes. Plain CREATE INDEX, like v0007.
+"""
+from ..migrate import create_index
+
+TABLES = {
+	"ix_universities_approved_id": "universities",
+	"ix_faculties_approved_id": "faculties",
+	"ix_fields_of_study_approved_id": "fields_of_study",
+	"ix_subjects_approved_id": "subjects",
+}
+
+
+def upgrade(conn):
+	for name, table in TABLES.items():
+		create_index(conn, name, table, "is_approved", "id")
@@ -0,0 +1,18 @@
+"""
+Partial (submitted_by_id, is_approved) indexes, over rows that have a submitter, for the
+dashboard's pending submissions on the university, faculty, field and subject tables
+(notes use ix_notes_author_created).
+"""
+from ..migrate import create_index
+
+TABLES = {
+	"ix_universities_submitter": "universities",
+	"ix_faculties_submitter": "faculties",
+	"ix_fields_of_study_submitter": "fields_of_study",
+	"ix_subjects_submitter": "subjects",
+}
+
+
+def upgrade(conn):
+	for name, table in TABLES.items():
+		create_index(conn, name, table, "submitted_by_id", "is_approved", where="submitted_by_id IS NOT NULL")
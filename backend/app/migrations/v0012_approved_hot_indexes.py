@@ -0,0 +1,17 @@
+"""
+Rebuild the hot indexes as (scope, is_approved, hot, id), like the score ones, so "hot"
+listings of approved notes read one index range. Plain CREATE INDEX, like v0007.
+"""
+from ..migrate import create_index, drop_index, index_columns
+
+INDEXES = (
+	("ix_notes_hot", "notes", "is_approved", "hot", "id"),
+	("ix_notes_university_hot", "notes", "university_id", "is_approved", "hot", "id"),
+	("ix_notes_subject_hot", "notes", "subject_id", "is_approved", "hot", "id"),
+)
+
+
+def upgrade(conn):
+	for name, table, *columns in INDEXES:
+		if index_columns(conn, table, name) not in (None, columns): drop_index(conn, name, table)
+		create_index(conn, name, table, *columns)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Float, DateTime, Boolean, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Text, Float, DateTime, Boolean, ForeignKey, UniqueConstraint, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -18,12 +18,19 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     university = relationship("University", back_populates="users", foreign_keys=[university_id])
+    __table_args__ = (Index("ix_users_university", "university_id"),)
     notes = relationship("Note", back_populates="author")
     votes = relationship("Vote", back_populates="user", cascade="all, delete-orphan")
     favorites = relationship("Favorite", back_populates="user", cascade="all, delete-orphan")
     reviews = relationship("Review", back_populates="user", cascade="all, delete-orphan")
     comments = relationship("Comment", back_populates="user", cascade="all, delete-orphan")
 
+def _submitter_index(name):
+    # Seeded and imported rows have no submitter; leaving them out keeps the index to user submissions
+    # (and keeps SQLite's ANALYZE from averaging the NULLs into "matches every row")
+    where = text("submitted_by_id IS NOT NULL")
+    return Index(name, "submitted_by_id", "is_approved", sqlite_where=where, postgresql_where=where)
+
 class University(Base):
     __tablename__ = "universities"
     id = Column(Integer, primary_key=True, index=True)
@@ -37,12 +44,28 @@ class University(Base):
     image_url = Column(String, nullable=True)
     is_approved = Column(Boolean, default=False)
     submitted_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    __table_args__ = (Index("ix_universities_approved_id", "is_approved", "id"),  # moderation queue, oldest first
+                      _submitter_index("ix_universities_submitter"))  # dashboard
 
     users = relationship("User", back_populates="university", foreign_keys="User.university_id")
     notes = relationship("Note", back_populates="university")
     faculties = relationship("Faculty", back_populates="university", cascade="all, delete-orphan")
     image_requests = relationship("UniversityImageRequest", back_populates="university", cascade="all, delete-orphan")
     reviews = relationship("Review", back_populates="university", cascade="all, delete-orphan")
+    # Loaded with the university itself, so listings stay one query
+    stats = relationship("UniversityStats", uselist=False, lazy="joined", cascade="all, delete-orphan")
+
+class UniversityStats(Base):
+    """Denormalized counters per university, maintained by app.stats."""
+    __tablename__ = "university_stats"
+    university_id = Column(Integer, ForeignKey("universities.id", ondelete="CASCADE"), primary_key=True)
+    rating_1 = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_2 = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_3 = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_4 = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_5 = Column(Integer, default=0, server_default="0", nullable=False)
+    note_count = Column(Integer, default=0, server_default="0", nullable=False)
+    user_count = Column(Integer, default=0, server_default="0", nullable=False)
 
 class UniversityImageRequest(Base):
     __tablename__ = "university_image_requests"
@@ -53,6 +76,7 @@ class UniversityImageRequest(Base):
     submitted_by_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     university = relationship("University", back_populates="image_requests")
+    __table_args__ = (Index("ix_image_requests_status", "status", "id"),)
 
 class Faculty(Base):
     __tablename__ = "faculties"
@@ -64,6 +88,9 @@ class Faculty(Base):
     submitted_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     university = relationship("University", back_populates="faculties")
     fields_of_study = relationship("FieldOfStudy", back_populates="faculty", cascade="all, delete-orphan")
+    __table_args__ = (Index("ix_faculties_university", "university_id", "is_approved"),
+                      Index("ix_faculties_approved_id", "is_approved", "id"),
+                      _submitter_index("ix_faculties_submitter"))
 
 class FieldOfStudy(Base):
     __tablename__ = "fields_of_study"
@@ -75,6 +102,9 @@ class FieldOfStudy(Base):
     submitted_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     faculty = relationship("Faculty", back_populates="fields_of_study")
     subjects = relationship("Subject", back_populates="field_of_study", cascade="all, delete-orphan")
+    __table_args__ = (Index("ix_fields_of_study_faculty", "faculty_id", "is_approved"),
+                      Index("ix_fields_of_study_approved_id", "is_approved", "id"),
+                      _submitter_index("ix_fields_of_study_submitter"))
 
 class Subject(Base):
     __tablename__ = "subjects"
@@ -86,6 +116,9 @@ class Subject(Base):
     submitted_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     field_of_study = relationship("FieldOfStudy", back_populates="subjects")
     notes = relationship("Note", back_populates="subject", cascade="all, delete-orphan")
+    __table_args__ = (Index("ix_subjects_field_of_study", "field_of_study_id", "is_approved"),
+                      Index("ix_subjects_approved_id", "is_approved", "id"),
+                      _submitter_index("ix_subjects_submitter"))
 
 class Note(Base):
     __tablename__ = "notes"
@@ -96,6 +129,11 @@ class Note(Base):
     video_url = Column(String)
     link_url = Column(String)
     score = Column(Float, default=0.0)
+    # Denormalized counters, maintained atomically by app.interactions
+    favorite_count = Column(Integer, default=0, server_default="0", nullable=False)
+    comment_count = Column(Integer, default=0, server_default="0", nullable=False)
+    # Time-decayed engagement, maintained by app.ranking
+    hot = Column(Float, default=0.0, server_default="0", nullable=False)
     is_approved = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     author_id = Column(Integer, ForeignKey("users.id"))
@@ -108,6 +146,17 @@ class Note(Base):
     votes = relationship("Vote", back_populates="note", cascade="all, delete-orphan")
     favorites = relationship("Favorite", back_populates="note", cascade="all, delete-orphan")
     comments = relationship("Comment", back_populates="note", cascade="all, delete-orphan")
+    # Listings filter on is_approved and a scope, then page on (score | hot, id)
+    __table_args__ = (
+        Index("ix_notes_approved_score", "is_approved", "score", "id"),
+        Index("ix_notes_approved_id", "is_approved", "id"),  # moderation queue, oldest first
+        Index("ix_notes_university_score", "university_id", "is_approved", "score", "id"),
+        Index("ix_notes_subject_score", "subject_id", "is_approved", "score", "id"),
+        Index("ix_notes_hot", "is_approved", "hot", "id"),
+        Index("ix_notes_university_hot", "university_id", "is_approved", "hot", "id"),
+        Index("ix_notes_subject_hot", "subject_id", "is_approved", "hot", "id"),
+        Index("ix_notes_author_created", "author_id", "is_approved", "created_at", "id"),  # dashboard
+    )
 
 class Vote(Base):
     __tablename__ = "votes"
@@ -117,7 +166,8 @@ class Vote(Base):
     value = Column(Integer, default=1)
     user = relationship("User", back_populates="votes")
     note = relationship("Note", back_populates="votes")
-    __table_args__ = (UniqueConstraint('user_id', 'note_id', name='_user_note_vote_uc'),)
+    # The unique constraint's index serves (user_id, note_id) lookups; note_id alone is for cascades
+    __table_args__ = (UniqueConstraint('user_id', 'note_id', name='_user_note_vote_uc'), Index("ix_votes_note", "note_id"))
 
 class Favorite(Base):
     __tablename__ = "favorites"
@@ -127,7 +177,8 @@ class Favorite(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     user = relationship("User", back_populates="favorites")
     note = relationship("Note", back_populates="favorites")
-    __table_args__ = (UniqueConstraint('user_id', 'note_id', name='_user_note_fav_uc'),)
+    __table_args__ = (UniqueConstraint('user_id', 'note_id', name='_user_note_fav_uc'), Index("ix_favorites_note", "note_id"),
+                      Index("ix_favorites_user_created", "user_id", "created_at", "id"))
 
 class Review(Base):
     __tablename__ = "reviews"
@@ -139,6 +190,7 @@ class Review(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     user = relationship("User", back_populates="reviews")
     university = relationship("University", back_populates="reviews")
+    __table_args__ = (Index("ix_reviews_university_created", "university_id", "created_at", "id"),)
 
 class Comment(Base):
     __tablename__ = "comments"
@@ -148,4 +200,15 @@ class Comment(Base):
     content = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     user = relationship("User", back_populates="comments")
-    note = relationship("Note", back_populates="comments")
\ No newline at end of file
+    note = relationship("Note", back_populates="comments")
+    __table_args__ = (Index("ix_comments_note_created", "note_id", "created_at", "id"),)
+
+class Blob(Base):
+    """Content-addressed upload; refcount = number of URL columns pointing at it (see app.storage)."""
+    __tablename__ = "blobs"
+    hash = Column(String(64), primary_key=True)
+    url = Column(String, unique=True, nullable=False)
+    size = Column(Integer, nullable=False)
+    content_type = Column(String, nullable=True)
+    refcount = Column(Integer, default=0, server_default="0", nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,128 @@
+"""
+Moderation queues: pending notes, universities, faculties, fields, subjects and image requests.
+
+Queues are paged oldest first, counted in a single query, and moderated in bulk:
+`apply()` approves or rejects any mix of (type, id) pairs in one transaction, then
+calls every function in `listeners` with what actually changed, so caches and derived
+data can follow without each route knowing about them.
+"""
+import inspect
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+from fastapi import HTTPException
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from . import models, schemas, stats
+from .pagination import paginate
+
+# type -> (model, pending condition, output schema)
+QUEUES = {
+	"note": (models.Note, models.Note.is_approved == False, schemas.NoteOut),
+	"university": (models.University, models.University.is_approved == False, schemas.UniversityOut),
+	"faculty": (models.Faculty, models.Faculty.is_approved == False, schemas.FacultyOut),
+	"field": (models.FieldOfStudy, models.FieldOfStudy.is_approved == False, schemas.FieldOfStudyOut),
+	"subject": (models.Subject, models.Subject.is_approved == False, schemas.SubjectOut),
+	"image_request": (models.UniversityImageRequest, models.UniversityImageRequest.status == "pending",
+	                  schemas.ImageRequestOut),
+}
+ACTIONS = ("approve", "reject")
+
+# Called (and awaited, if async) after each committed apply() as listener(action, {type: [changed ids]})
+listeners: List[Callable[[str, Dict[str, List[int]]], Any]] = []
+
+
+def _notes_under(type: str, ids: List[int]):
+	"""Condition on Note for the notes deleted with `ids` of `type`, directly or through the ORM cascades."""
+	if type == "note": return models.Note.id.in_(ids)
+	subjects = ids
+	if type != "subject":
+		fields = ids
+		if type != "field":
+			faculties = ids if type == "faculty" else \
+				select(models.Faculty.id).where(models.Faculty.university_id.in_(ids))
+			fields = select(models.FieldOfStudy.id).where(models.FieldOfStudy.faculty_id.in_(faculties))
+		subjects = select(models.Subject.id).where(models.Subject.field_of_study_id.in_(fields))
+	return models.Note.subject_id.in_(subjects)
+
+
+def _queue(type: str):
+	if type not in QUEUES: raise HTTPException(404, f"Unknown item type: {type}")
+	return QUEUES[type]
+
+
+async def page(db: AsyncSession, type: str, cursor: str, limit: int) -> dict:
+	"""Oldest-first page of pending items of one type."""
+	model, pending, schema = _queue(type)
+	q = select(model).where(pending)
+	if model is models.Note: q = q.options(joinedload(models.Note.author), joinedload(models.Note.subject))
+	result = await paginate(db, q, (model.id,), cursor, limit, descending=False)
+	result["items"] = [schema.model_validate(i) for i in result["items"]]
+	return result
+
+
+async def counts(db: AsyncSession) -> Dict[str, int]:
+	"""Pending items per type, in one round trip."""
+	row = (await db.execute(select(*(
+		select(func.count()).select_from(model).where(pending).scalar_subquery().label(type)
+		for type, (model, pending, _) in QUEUES.items()
+	)))).one()
+	return dict(row._mapping)
+
+
+async def _image_requests(db: AsyncSession, action: str, ids: List[int]) -> List[int]:
+	# ORM rather than a bulk UPDATE: the new university image must go through the blob refcount events
+	requests = (await db.scalars(select(models.UniversityImageRequest).where(
+		models.UniversityImageRequest.id.in_(ids), models.UniversityImageRequest.status == "pending"))).all()
+	for req in requests:
+		if action == "approve":
+			uni = await db.get(models.University, req.university_id)
+			if uni: uni.image_url = req.new_image_url
+		req.status = "approved" if action == "approve" else "rejected"
+	return [req.id for req in requests]
+
+
+async def apply(db: AsyncSession, action: str, items: Iterable[Tuple[str, int]]) -> Dict[str, List[int]]:
+	"""
+	Approve or reject (type, id) pairs in one transaction and notify `listeners`.
+	Approving touches only pending rows; rejecting deletes the row (with its ORM
+	cascades) whatever its state, or marks an image request rejected. Returns the
+	ids that changed, per type. Commits.
+	"""
+	if action not in ACTIONS: raise HTTPException(400, f"Unknown action: {action}")
+	by_type = defaultdict(set)
+	for type, id in items:
+		_queue(type)
+		by_type[type].add(id)
+
+	changed = {}
+	# Approved notes already taken off their university's note_count in this call
+	uncounted = set()
+	for type, ids in by_type.items():
+		model, pending, _ = QUEUES[type]
+		ids = sorted(ids)
+		if type == "image_request":
+			changed[type] = await _image_requests(db, action, ids)
+		elif action == "approve":
+			changed[type] = (await db.scalars(
+				update(model).where(model.id.in_(ids), pending).values(is_approved=True)
+				.returning(model.id).execution_options(synchronize_session=False)
+			)).all()
+			if type == "note": await stats.count_notes(db, changed[type], 1)
+		else:
+			rows = (await db.scalars(select(model).where(model.id.in_(ids)))).all()
+			if rows:
+				notes = set((await db.scalars(select(models.Note.id).where(
+					_notes_under(type, [row.id for row in rows]), models.Note.is_approved == True))).all())
+				await stats.count_notes(db, notes - uncounted, -1)
+				uncounted |= notes
+			for row in rows:
+				await db.delete(row)
+			changed[type] = [row.id for row in rows]
+	await db.commit()
+
+	changed = {type: ids for type, ids in changed.items() if ids}
+	for listener in listeners:
+		result = listener(action, changed)
+		if inspect.isawaitable(result): await result
+	return changed
@@ -0,0 +1,82 @@
+"""
+Keyset (cursor) pagination.
+
+A page is fetched with `WHERE (k1, k2) < (:last_k1, :last_k2) ORDER BY k1 DESC, k2 DESC
+LIMIT n + 1`, so every page costs one index range read regardless of depth. The cursor
+handed to clients is the last row's key, JSON-encoded and base64url-wrapped.
+
+Timestamp keys are read back untyped so the cursor carries the value exactly as the
+database stores it: SQLite keeps CURRENT_TIMESTAMP text without microseconds, which
+would no longer compare equal once round-tripped through a Python datetime.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException, Query
+from sqlalchemy import String, tuple_, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def page_size(limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)) -> int:
+	return limit
+
+
+def encode_cursor(values) -> str:
+	raw = json.dumps([{"dt": v.isoformat()} if isinstance(v, datetime) else v for v in values], separators=(",", ":"))
+	return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _python_type(key):
+	try:
+		return key.type.python_type
+	except NotImplementedError:
+		return None
+
+
+def _fits(value, key) -> bool:
+	"""Whether a cursor value can be bound against `key`; a mismatch would fail in the driver (500)."""
+	expected = _python_type(key)
+	if value is None or expected is None: return True
+	if isinstance(value, bool): return expected is bool
+	if expected is float: return isinstance(value, (int, float))
+	if expected is datetime and isinstance(value, str):
+		datetime.fromisoformat(value)  # timestamp keys travel as the database's own text
+		return True
+	return isinstance(value, expected)
+
+
+def decode_cursor(cursor: str, keys) -> list:
+	try:
+		values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+		if not isinstance(values, list) or len(values) != len(keys): raise ValueError
+		values = [datetime.fromisoformat(v["dt"]) if isinstance(v, dict) else v for v in values]
+		if not all(_fits(v, k) for v, k in zip(values, keys)): raise ValueError
+		return values
+	except (ValueError, TypeError, KeyError):
+		raise HTTPException(400, "Invalid cursor")
+
+
+def _is_datetime(key) -> bool:
+	return _python_type(key) is datetime
+
+
+async def paginate(db: AsyncSession, stmt, keys, cursor: Optional[str], limit: int, descending: bool = True) -> dict:
+	"""
+	Run `stmt` (a select of a single entity) one keyset page at a time.
+	`keys` are the sort columns, most significant first, ending in a unique column.
+	Returns {"items": [...], "next_cursor": str | None}.
+	"""
+	if cursor:
+		after = decode_cursor(cursor, keys)
+		stmt = stmt.where(tuple_(*keys) < tuple_(*after) if descending else tuple_(*keys) > tuple_(*after))
+	stmt = stmt.add_columns(*((type_coerce(k, String) if _is_datetime(k) else k).label(f"_key{i}")
+	                          for i, k in enumerate(keys))) \
+		.order_by(*(k.desc() if descending else k.asc() for k in keys)) \
+		.limit(limit + 1)
+	rows = (await db.execute(stmt)).all()
+	next_cursor = encode_cursor(rows[limit - 1][1:]) if len(rows) > limit else None
+	return {"items": [r[0] for r in rows[:limit]], "next_cursor": next_cursor}
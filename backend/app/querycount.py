@@ -0,0 +1,58 @@
+"""
+SQL statement counting for tests and benchmarks.
+
+	with QueryCounter(database.engine) as qc:
+		await client.get("/notes")
+	assert qc.count <= 3
+
+`assert_constant_queries` runs a call against growing datasets and fails when the
+number of statements grows with them, i.e. when a lazy load slipped into a list path.
+Used by tests/test_query_counts.py.
+"""
+import inspect
+from typing import Awaitable, Callable, Iterable, Union
+from sqlalchemy import event
+
+
+class QueryCounter:
+	def __init__(self, engine):
+		# Events are registered on the sync core of an AsyncEngine
+		self.engine = getattr(engine, "sync_engine", engine)
+		self.statements = []
+
+	def _record(self, conn, cursor, statement, parameters, context, executemany):
+		self.statements.append(statement)
+
+	def __enter__(self):
+		event.listen(self.engine, "before_cursor_execute", self._record)
+		return self
+
+	def __exit__(self, *exc):
+		event.remove(self.engine, "before_cursor_execute", self._record)
+
+	@property
+	def count(self) -> int:
+		return len(self.statements)
+
+
+async def _resolve(value):
+	return await value if inspect.isawaitable(value) else value
+
+
+async def assert_constant_queries(engine, call: Callable[[], Union[Awaitable, object]],
+                                  grow: Callable[[int], Union[Awaitable, None]], sizes: Iterable[int] = (1, 10, 50)):
+	"""
+	For each size, calls `grow(size)` to bring the dataset to that many rows, then counts
+	the statements issued by `call()`. Either may be a coroutine function (e.g. an httpx
+	request against the ASGI app). Raises AssertionError if the counts differ.
+	"""
+	counts = {}
+	for size in sizes:
+		await _resolve(grow(size))
+		with QueryCounter(engine) as qc:
+			await _resolve(call())
+		counts[size] = qc
+	if len({qc.count for qc in counts.values()}) > 1:
+		detail = "\n".join(f"  {size} rows: {qc.count} queries" for size, qc in counts.items())
+		last = list(counts.values())[-1].statements
+		raise AssertionError(f"Query count grows with result size:\n{detail}\nLast run:\n  " + "\n  ".join(last))
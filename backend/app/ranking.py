@@ -0,0 +1,114 @@
+"""
+"Hot" ranking of notes: engagement with time decay, stored in Note.hot and indexed.
+
+	hot = log2(1 + votes * VOTE_WEIGHT + favorites * FAVORITE_WEIGHT + comments * COMMENT_WEIGHT)
+	      + (created_at - EPOCH) / HALF_LIFE
+
+Each half-life of age is worth a doubling of engagement, so newer notes overtake older
+ones without anything being decayed in place: the score depends only on the note's own
+counters, `app.interactions` rewrites it whenever one of them changes, and the
+(university_id, hot) / (subject_id, hot) indexes serve /notes?sort=hot as a range read.
+
+`refresh()` recomputes every note in id batches and writes the ones that drifted (notes
+written by bulk tools, weight or half-life changes). It runs in the background every
+RANKING_REFRESH_SECONDS in every app process (0 disables it; passes that find nothing to
+fix only read) and from the command line:
+
+	python -m app.ranking
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import database, models
+
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+HALF_LIFE_HOURS = float(os.getenv("RANKING_HALF_LIFE_HOURS", "48"))
+VOTE_WEIGHT = 1.0
+FAVORITE_WEIGHT = 2.0
+COMMENT_WEIGHT = 0.5
+REFRESH_SECONDS = float(os.getenv("RANKING_REFRESH_SECONDS", "3600"))
+BATCH_SIZE = 5000
+# Scores closer than this are left alone by refresh()
+TOLERANCE = 1e-6
+
+# Note columns the score is computed from, in hot()'s argument order
+INPUTS = (models.Note.score, models.Note.favorite_count, models.Note.comment_count, models.Note.created_at)
+
+log = logging.getLogger(__name__)
+
+
+def hot(score: float, favorites: int, comments: int, created_at: Optional[datetime] = None) -> float:
+	"""Hot score of a note; `created_at` defaults to now (naive values are UTC, as SQLite stores them)."""
+	if created_at is None: created_at = datetime.now(timezone.utc)
+	elif created_at.tzinfo is None: created_at = created_at.replace(tzinfo=timezone.utc)
+	points = (score or 0) * VOTE_WEIGHT + (favorites or 0) * FAVORITE_WEIGHT + (comments or 0) * COMMENT_WEIGHT
+	age = (created_at - EPOCH).total_seconds() / (HALF_LIFE_HOURS * 3600)
+	return round(math.log2(1 + max(points, 0)) + age, 7)
+
+
+async def store(db: AsyncSession, note_id: int, *inputs):
+	"""Rewrite one note's score from its current INPUTS values. Does not commit."""
+	await db.execute(
+		update(models.Note).where(models.Note.id == note_id).values(hot=hot(*inputs))
+		.execution_options(synchronize_session=False)
+	)
+
+
+def refresh(conn, commit: bool = False) -> dict:
+	"""Recompute every note's score on a sync Connection, committing after each batch if asked."""
+	table = models.Note.__table__
+	stmt = table.update().where(table.c.id == bindparam("_id")).values(hot=bindparam("_hot"))
+	checked = changed = 0
+	last_id = 0
+	while True:
+		rows = conn.execute(
+			select(models.Note.id, models.Note.hot, *INPUTS).where(models.Note.id > last_id)
+			.order_by(models.Note.id).limit(BATCH_SIZE)
+		).all()
+		if not rows: break
+		updates = []
+		for id, current, *inputs in rows:
+			value = hot(*inputs)
+			if current is None or abs(current - value) > TOLERANCE:
+				updates.append({"_id": id, "_hot": value})
+		if updates: conn.execute(stmt, updates)
+		if commit: conn.commit()
+		checked += len(rows)
+		changed += len(updates)
+		last_id = rows[-1][0]
+	return {"checked": checked, "changed": changed}
+
+
+async def run() -> dict:
+	started = time.perf_counter()
+	async with database.engine.connect() as conn:
+		report = await conn.run_sync(refresh, True)
+	return {**report, "seconds": round(time.perf_counter() - started, 2)}
+
+
+async def refresh_forever():
+	"""Background task started by the app; one failed pass is logged, not fatal."""
+	while True:
+		await asyncio.sleep(REFRESH_SECONDS)
+		try:
+			report = await run()
+			if report["changed"]: log.info("Hot ranking refreshed: %s", report)
+		except Exception:
+			log.exception("Hot ranking refresh failed")
+
+
+async def _main():
+	report = await run()
+	await database.engine.dispose()
+	print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+	asyncio.run(_main())
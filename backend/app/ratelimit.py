@@ -0,0 +1,141 @@
+"""
+Request throttling: per-client token buckets and a global concurrency limit.
+
+Each budget in BUDGETS allows `requests` per `seconds` with bursts of up to `requests`,
+counted per user for authenticated routes (`by_user`) and per client IP otherwise
+(`by_ip`). An empty bucket answers 429 with Retry-After. Override a budget with e.g.
+RATE_LIMIT_TOKEN=20/60; RATE_LIMIT_ENABLED=0 turns budgets off (load tests). Buckets live
+in each worker's memory, so with N workers a client gets up to N times the budget.
+
+`ConcurrencyLimit` answers 503 straight away once MAX_CONCURRENT_REQUESTS requests are
+in flight in this worker, instead of letting a backlog build up behind them. Live event
+streams and /metrics are exempt.
+
+Client IPs come from the socket, or from the first X-Forwarded-For hop with TRUST_PROXY=1.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, NamedTuple
+from fastapi import Depends, HTTPException, Request
+from . import auth, models
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_KEYS = int(os.getenv("RATE_LIMIT_KEYS", "100000"))
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "256"))
+TRUST_PROXY = os.getenv("TRUST_PROXY") == "1"
+
+
+class Budget(NamedTuple):
+	requests: int
+	seconds: float
+
+
+def _budget(name: str, default: Budget) -> Budget:
+	spec = os.getenv(f"RATE_LIMIT_{name.upper()}")
+	if not spec: return default
+	requests, _, seconds = spec.partition("/")
+	return Budget(int(requests), float(seconds or 60))
+
+
+BUDGETS: Dict[str, Budget] = {
+	name: _budget(name, default) for name, default in {
+		"token": Budget(10, 60),        # bcrypt per attempt
+		"register": Budget(5, 3600),
+		"vote": Budget(60, 60),         # votes and favorites
+		"comment": Budget(10, 60),
+		"upload": Budget(30, 3600),
+	}.items()
+}
+
+
+class Stats:
+	def __init__(self):
+		self.throttled: Dict[str, int] = defaultdict(int)
+		self.shed = 0
+		self.in_flight = 0
+
+	def as_dict(self) -> dict:
+		return {"enabled": RATE_LIMIT_ENABLED, "budgets": {n: b._asdict() for n, b in BUDGETS.items()},
+		        "throttled": dict(self.throttled), "shed": self.shed, "in_flight": self.in_flight,
+		        "max_concurrent": MAX_CONCURRENT_REQUESTS, "tracked_keys": len(_buckets)}
+
+
+stats = Stats()
+
+# (budget, key) -> (tokens, monotonic time of last update); least recently used first
+_buckets: "OrderedDict[tuple, tuple]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def take(name: str, key) -> float:
+	"""Spend one token of `key`'s bucket; returns 0 if allowed, else seconds until a token is free."""
+	budget = BUDGETS[name]
+	rate = budget.requests / budget.seconds
+	now = time.monotonic()
+	with _lock:
+		tokens, updated = _buckets.pop((name, key), (budget.requests, now))
+		tokens = min(budget.requests, tokens + (now - updated) * rate)
+		wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+		if not wait: tokens -= 1
+		_buckets[(name, key)] = (tokens, now)
+		# An evicted bucket starts full again, which only ever errs towards allowing
+		while len(_buckets) > RATE_LIMIT_KEYS: _buckets.popitem(last=False)
+	return wait
+
+
+def _check(name: str, key):
+	if not RATE_LIMIT_ENABLED: return
+	wait = take(name, key)
+	if wait:
+		stats.throttled[name] += 1
+		raise HTTPException(429, "Too many requests", headers={"Retry-After": str(math.ceil(wait))})
+
+
+def client_ip(request: Request) -> str:
+	if TRUST_PROXY:
+		forwarded = request.headers.get("x-forwarded-for")
+		if forwarded: return forwarded.split(",")[0].strip()
+	return request.client.host if request.client else "unknown"
+
+
+def by_ip(name: str):
+	"""Route dependency spending from the caller IP's `name` budget."""
+	async def dependency(request: Request):
+		_check(name, client_ip(request))
+	return dependency
+
+
+def by_user(name: str):
+	"""Route dependency spending from the current user's `name` budget (authenticates first)."""
+	async def dependency(user: models.User = Depends(auth.get_current_user)):
+		_check(name, user.id)
+	return dependency
+
+
+class ConcurrencyLimit:
+	"""Pure ASGI middleware shedding requests beyond MAX_CONCURRENT_REQUESTS (0 disables it)."""
+
+	def __init__(self, app):
+		self.app = app
+
+	@staticmethod
+	def _exempt(path: str) -> bool:
+		return path == "/metrics" or path.endswith("/events")
+
+	async def __call__(self, scope, receive, send):
+		if scope["type"] != "http" or not MAX_CONCURRENT_REQUESTS or self._exempt(scope["path"]):
+			return await self.app(scope, receive, send)
+		if stats.in_flight >= MAX_CONCURRENT_REQUESTS:
+			stats.shed += 1
+			await send({"type": "http.response.start", "status": 503,
+			            "headers": [(b"content-type", b"application/json"), (b"retry-after", b"1")]})
+			await send({"type": "http.response.body", "body": b'{"detail":"Server busy"}'})
+			return
+		stats.in_flight += 1
+		try:
+			await self.app(scope, receive, send)
+		finally:
+			stats.in_flight -= 1
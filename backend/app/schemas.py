@@ -1,9 +1,19 @@
 """
 Pydantic schemas for Colloq PRO.
 """
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field, computed_field, field_validator
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Generic, Literal, Optional, List, TypeVar
+from . import images
+
+T = TypeVar("T")
+# {"webp": {"320": url, "640": url, ...}} for uploaded images, None otherwise
+Variants = Optional[Dict[str, Dict[str, str]]]
+
+# --- PAGINATION ---
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
 
 # --- USER ---
 class UserCreate(BaseModel):
@@ -23,10 +33,43 @@ class UserOut(BaseModel):
     class Config:
         from_attributes = True
 
+    @computed_field
+    @property
+    def avatar_variants(self) -> Variants:
+        return images.variants(self.avatar_url)
+
 class RegisterRequest(BaseModel):
     user: UserCreate
 
 # --- HIERARCHY ---
+class UniversityStatsOut(BaseModel):
+    rating_1: int = Field(0, exclude=True)
+    rating_2: int = Field(0, exclude=True)
+    rating_3: int = Field(0, exclude=True)
+    rating_4: int = Field(0, exclude=True)
+    rating_5: int = Field(0, exclude=True)
+    note_count: int = 0
+    user_count: int = 0
+    class Config:
+        from_attributes = True
+
+    @computed_field
+    @property
+    def rating_histogram(self) -> List[int]:
+        """Reviews with 1, 2, 3, 4 and 5 stars."""
+        return [self.rating_1, self.rating_2, self.rating_3, self.rating_4, self.rating_5]
+
+    @computed_field
+    @property
+    def review_count(self) -> int:
+        return sum(self.rating_histogram)
+
+    @computed_field
+    @property
+    def average_rating(self) -> Optional[float]:
+        if not self.review_count: return None
+        return round(sum(stars * n for stars, n in enumerate(self.rating_histogram, 1)) / self.review_count, 2)
+
 class UniversityOut(BaseModel):
     id: int
     name: str
@@ -38,9 +81,26 @@ class UniversityOut(BaseModel):
     image_url: Optional[str] = None
     banner_url: Optional[str] = None
     is_approved: bool = True
+    stats: UniversityStatsOut = UniversityStatsOut()
     class Config:
         from_attributes = True
 
+    @field_validator("stats", mode="before")
+    @classmethod
+    def _no_stats_yet(cls, v):
+        # Universities get a stats row with their first review, note or student
+        return UniversityStatsOut() if v is None else v
+
+    @computed_field
+    @property
+    def image_variants(self) -> Variants:
+        return images.variants(self.image_url)
+
+    @computed_field
+    @property
+    def banner_variants(self) -> Variants:
+        return images.variants(self.banner_url)
+
 class FacultyOut(BaseModel):
     id: int
     name: str
@@ -70,6 +130,17 @@ class SubjectOut(BaseModel):
     class Config:
         from_attributes = True
 
+class FieldOfStudyTree(FieldOfStudyOut):
+    subjects: List[SubjectOut] = []
+
+class FacultyTree(FacultyOut):
+    fields: List[FieldOfStudyTree] = []
+
+class UniversityTree(BaseModel):
+    university_id: int
+    semester: Optional[int] = None
+    faculties: List[FacultyTree]
+
 class FieldOfStudyCreate(BaseModel):
     name: str
     degree_level: str
@@ -78,7 +149,7 @@ class FieldOfStudyCreate(BaseModel):
 # --- COMMUNITY ---
 class ReviewCreate(BaseModel):
     university_id: int
-    rating: int
+    rating: int = Field(ge=1, le=5)
     content: str
 
 class ReviewOut(BaseModel):
@@ -107,6 +178,8 @@ class NoteOut(BaseModel):
     title: Optional[str] = None
     content: Optional[str] = None
     score: float
+    favorite_count: int = 0
+    comment_count: int = 0
     image_url: Optional[str] = None
     video_url: Optional[str] = None
     link_url: Optional[str] = None
@@ -117,6 +190,11 @@ class NoteOut(BaseModel):
     class Config:
         from_attributes = True
 
+    @computed_field
+    @property
+    def image_variants(self) -> Variants:
+        return images.variants(self.image_url)
+
 # --- ADMIN ---
 class ImageRequestOut(BaseModel):
     id: int
@@ -136,6 +214,18 @@ class PendingItemsResponse(BaseModel):
     subjects: List[SubjectOut]
     image_requests: List[ImageRequestOut]
 
+class ModerationItem(BaseModel):
+    type: str  # note, university, faculty, field, subject or image_request
+    id: int
+
+class ModerationRequest(BaseModel):
+    action: Literal["approve", "reject"]
+    items: List[ModerationItem] = Field(min_length=1, max_length=1000)
+
+class ModerationResult(BaseModel):
+    action: str
+    changed: Dict[str, List[int]]  # type -> ids actually approved/rejected
+
 # --- INTERACTIONS ---
 class VoteResponse(BaseModel):
     msg: str
@@ -145,11 +235,17 @@ class VoteResponse(BaseModel):
 class FavoriteResponse(BaseModel):
     msg: str
     is_favorited: bool
+    favorite_count: int
+
+class PendingSubmission(BaseModel):
+    type: str  # note, university, faculty, field or subject
+    id: int
+    name: Optional[str] = None
 
 class UserDashboard(BaseModel):
-    my_notes: List[NoteOut]
-    my_favorites: List[NoteOut]
-    pending_submissions: dict
+    my_notes: Page[NoteOut]
+    my_favorites: Page[NoteOut]
+    pending_submissions: List[PendingSubmission]
 
 class Token(BaseModel):
     access_token: str
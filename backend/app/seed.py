@@ -0,0 +1,88 @@
+"""
+Idempotent seed data: Politechnika Krakowska, the admin account and its syllabus.
+
+Runs in one transaction under the "seed" advisory lock, matching existing rows by
+name/email, so it is safe to run on every deploy and from several containers at once.
+
+	python -m app.seed
+"""
+import asyncio
+import os
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import auth, database, hierarchy, models, stats, syllabus
+
+ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "admin@colloq.pl")
+ADMIN_PASS = os.getenv("ADMIN_PASS", "admin123")
+
+UNIVERSITY = {
+	"name": "Politechnika Krakowska",
+	"name_pl": "Politechnika Krakowska",
+	"city": "Kraków",
+	"region": "Małopolskie",
+	"description": "Technical university in Krakow.",
+}
+FACULTY = "Wydział Informatyki i Telekomunikacji"
+FIELD = ("Informatyka w Inżynierii Komputerowej", "I stopień")
+# (Semester, Name)
+SUBJECTS = [
+	(1, "Analiza Matematyczna"), (1, "Algebra Liniowa"), (1, "Fizyka"), (1, "Wstęp do Informatyki"),
+	(2, "Matematyka Dyskretna"), (2, "Architektura Systemów Komputerowych"), (2, "Programowanie Obiektowe"),
+	(3, "Algorytmy i Struktury Danych"), (3, "Systemy Operacyjne"), (3, "Bazy Danych"),
+	(4, "Sieci Komputerowe"), (4, "Inżynieria Oprogramowania"), (4, "Grafika Komputerowa"),
+	(5, "Sztuczna Inteligencja"), (5, "Systemy Wbudowane"),
+	(6, "Bezpieczeństwo Systemów"), (6, "Praktyka Zawodowa"),
+	(7, "Seminarium Dyplomowe"), (7, "Praca Dyplomowa")
+]
+
+
+async def seed(db: AsyncSession) -> dict:
+	"""Insert whatever seed data is missing; returns what was created."""
+	created = {}
+	uni = await db.scalar(select(models.University).where(models.University.name == UNIVERSITY["name"]))
+	if not uni:
+		uni = models.University(**UNIVERSITY, is_approved=True)
+		db.add(uni)
+		await db.flush()
+		created["university"] = uni.name
+
+	if not await db.scalar(select(models.User.id).where(models.User.email == ADMIN_EMAIL)):
+		db.add(models.User(
+			email=ADMIN_EMAIL,
+			hashed_password=auth.get_password_hash(ADMIN_PASS),
+			university_id=uni.id,
+			is_admin=True,
+			nickname="Admin",
+			is_verified=True
+		))
+		await stats.adjust(db, uni.id, user_count=1)
+		await db.flush()
+		created["admin"] = ADMIN_EMAIL
+
+	report = await syllabus.import_rows(db, [{
+		"university": uni.name, "city": uni.city, "region": uni.region,
+		"faculty": FACULTY, "field_of_study": FIELD[0], "degree_level": FIELD[1],
+		"semester": semester, "subject": name,
+	} for semester, name in SUBJECTS])
+	if report["subjects"]["created"]:
+		created["subjects"] = report["subjects"]["created"]
+	return created
+
+
+async def run() -> dict:
+	async with database.locked("seed") as conn:
+		# Bound to the locked connection, the session's commits join its outer transaction
+		async with AsyncSession(bind=conn, expire_on_commit=False) as db:
+			created = await seed(db)
+	hierarchy.bump()
+	return created
+
+
+async def _main():
+	created = await run()
+	await database.engine.dispose()
+	print(f"--- SEEDED: {created} ---" if created else "--- SEED DATA ALREADY PRESENT ---")
+
+
+if __name__ == "__main__":
+	asyncio.run(_main())
@@ -0,0 +1,169 @@
+"""
+Serving of /uploads.
+
+Blob paths (uploads/blobs/...) are content-addressed, so their ETag is the file name
+and they are cached by clients as immutable. On top of what StaticFiles does this adds:
+
+	- single-range `Range` / `If-Range` requests (206/416), so PDF viewers can fetch pages
+	- `<file>.gz` siblings served to clients that accept gzip (see storage.precompress)
+	- the original in place of a not-yet-generated image derivative (see images)
+	- UPLOAD_SENDFILE=x-accel|x-sendfile: only headers are produced and the fronting
+	  proxy copies the bytes. With x-accel, nginx needs an internal location at
+	  UPLOAD_ACCEL_PREFIX aliased to UPLOAD_DIR.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+from email.utils import formatdate, parsedate
+from typing import Optional, Tuple
+import anyio
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from . import conditional, images
+
+UPLOAD_SENDFILE = os.getenv("UPLOAD_SENDFILE", "")
+UPLOAD_ACCEL_PREFIX = os.getenv("UPLOAD_ACCEL_PREFIX", "/protected-uploads").rstrip("/")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Legacy uploads and derivative fallbacks may change under the same URL
+REVALIDATE = "public, no-cache"
+FALLBACK = "public, max-age=60"
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+	"""
+	Inclusive (start, end) for a single byte range, or None to send the whole file
+	(no header, multiple ranges or a malformed one). Raises ValueError if unsatisfiable.
+	"""
+	match = _RANGE.match(header.strip()) if header else None
+	if not match or match.groups() == ("", ""): return None
+	first, last = match.groups()
+	if not first:
+		if int(last) == 0 or size == 0: raise ValueError(header)
+		return max(size - int(last), 0), size - 1
+	start = int(first)
+	if last and int(last) < start: return None
+	if start >= size: raise ValueError(header)
+	return start, min(int(last), size - 1) if last else size - 1
+
+
+class _FileRange(FileResponse):
+	"""FileResponse that sends only bytes start..end of the file."""
+
+	def __init__(self, path: str, start: int, end: int, **kwargs):
+		super().__init__(path, **kwargs)
+		self.start, self.end = start, end
+
+	async def __call__(self, scope, receive, send):
+		await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+		if not self.send_header_only:
+			async with await anyio.open_file(self.path, mode="rb") as f:
+				await f.seek(self.start)
+				remaining = self.end - self.start + 1
+				while remaining > 0:
+					chunk = await f.read(min(self.chunk_size, remaining))
+					if not chunk: break
+					remaining -= len(chunk)
+					await send({"type": "http.response.body", "body": chunk, "more_body": True})
+		await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def _etag(full_path: str, st: os.stat_result, hashed: bool) -> str:
+	if hashed: return f'"{os.path.basename(full_path)}"'
+	return f'"{hashlib.blake2b(f"{st.st_mtime_ns}-{st.st_size}".encode(), digest_size=8).hexdigest()}"'
+
+
+def _media_type(full_path: str) -> str:
+	return mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+
+
+def _stat(full_path: str) -> Optional[os.stat_result]:
+	try:
+		return os.stat(full_path)
+	except OSError:
+		return None
+
+
+class UploadFiles(StaticFiles):
+	"""StaticFiles for the upload directory; see the module docstring."""
+
+	def __init__(self, directory: str):
+		super().__init__(directory=directory, check_dir=False)
+
+	async def check_config(self):
+		# The directory appears with the first upload; until then every path is a 404
+		if os.path.isdir(self.directory): await super().check_config()
+
+	async def get_response(self, path: str, scope) -> Response:
+		if scope["method"] not in ("GET", "HEAD"):
+			raise HTTPException(status_code=405)
+		full_path, st = await anyio.to_thread.run_sync(self.lookup_path, path)
+		hashed = path.startswith("blobs/")
+		cache_control = IMMUTABLE if hashed else REVALIDATE
+		original = images.original_of(path) if st is None else None
+		if original:
+			full_path, st = await anyio.to_thread.run_sync(self.lookup_path, original)
+			cache_control = FALLBACK
+		if st is None or not stat.S_ISREG(st.st_mode):
+			raise HTTPException(status_code=404)
+		return await self.serve(full_path, st, scope, hashed, cache_control)
+
+	async def serve(self, full_path: str, st: os.stat_result, scope, hashed: bool, cache_control: str) -> Response:
+		request = Headers(scope=scope)
+		method = scope["method"]
+		etag = _etag(full_path, st, hashed)
+		last_modified = formatdate(st.st_mtime, usegmt=True)
+		headers = {"ETag": etag, "Last-Modified": last_modified,
+		           "Cache-Control": cache_control, "Accept-Ranges": "bytes"}
+
+		gz_st = await anyio.to_thread.run_sync(_stat, full_path + ".gz")
+		if gz_st is not None:
+			headers["Vary"] = "Accept-Encoding"
+
+		if_none_match = request.get("if-none-match")
+		if if_none_match is not None:
+			# A gzip representation carries a derived ETag; either one validates the cached copy
+			if conditional.matches(if_none_match, etag) or conditional.matches(if_none_match, etag[:-1] + '-gz"'):
+				return Response(status_code=304, headers=headers)
+		else:
+			since = parsedate(request.get("if-modified-since") or "")
+			if since is not None and since >= parsedate(last_modified):
+				return Response(status_code=304, headers=headers)
+
+		if UPLOAD_SENDFILE:
+			# The proxy handles Range, compression and the body itself
+			if UPLOAD_SENDFILE == "x-accel":
+				rel = os.path.relpath(full_path, os.path.realpath(self.directory)).replace(os.sep, "/")
+				headers["X-Accel-Redirect"] = f"{UPLOAD_ACCEL_PREFIX}/{rel}"
+			else:
+				headers["X-Sendfile"] = full_path
+			headers.pop("Accept-Ranges")
+			return Response(status_code=200, headers=headers, media_type=_media_type(full_path))
+
+		range_header = request.get("range")
+		if_range = request.get("if-range")
+		if range_header and if_range is not None and if_range not in (etag, last_modified):
+			range_header = None
+		try:
+			byte_range = parse_range(range_header, st.st_size)
+		except ValueError:
+			return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{st.st_size}"})
+		if byte_range is not None:
+			start, end = byte_range
+			headers["Content-Range"] = f"bytes {start}-{end}/{st.st_size}"
+			headers["Content-Length"] = str(end - start + 1)
+			return _FileRange(full_path, start, end, status_code=206, headers=headers,
+			                  stat_result=st, method=method)
+
+		if gz_st is not None and not range_header and "gzip" in request.get("accept-encoding", ""):
+			headers.update({"ETag": etag[:-1] + '-gz"', "Content-Encoding": "gzip"})
+			return FileResponse(full_path + ".gz", headers=headers, stat_result=gz_st, method=method,
+			                    media_type=_media_type(full_path))
+		return FileResponse(full_path, headers=headers, stat_result=st, method=method,
+		                    media_type=_media_type(full_path))
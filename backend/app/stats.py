@@ -0,0 +1,106 @@
+"""
+Per-university statistics: rating histogram, review, approved note and student counts.
+
+One UniversityStats row per university, joined into every University load, so listing
+universities with their ratings stays a single query. Write paths call `adjust()` inside
+their own transaction; it is one INSERT ... ON CONFLICT DO UPDATE adding the deltas, so
+concurrent writers never lose an increment and a missing row is created on first use.
+
+`rebuild()` recomputes every row from the source tables and reports how many had drifted:
+
+	python -m app.stats          rebuild
+	python -m app.stats check    report drift only; exits 1 if any
+"""
+import asyncio
+import json
+import sys
+import time
+from typing import Iterable
+from sqlalchemy import func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import database, models
+
+RATINGS = range(1, 6)
+COLUMNS = tuple(f"rating_{r}" for r in RATINGS) + ("note_count", "user_count")
+
+
+def rating_column(rating: int) -> str:
+	return f"rating_{rating}"
+
+
+async def adjust(db: AsyncSession, university_id: int, **deltas: int):
+	"""Add `deltas` (column=+n/-n) to a university's counters. Does not commit."""
+	deltas = {column: n for column, n in deltas.items() if n}
+	if university_id is None or not deltas: return
+	table = models.UniversityStats.__table__
+	await db.execute(
+		database.insert(table)
+		.values(university_id=university_id, **{column: max(n, 0) for column, n in deltas.items()})
+		.on_conflict_do_update(index_elements=["university_id"],
+		                       set_={column: table.c[column] + n for column, n in deltas.items()})
+	)
+
+
+async def count_notes(db: AsyncSession, note_ids: Iterable[int], sign: int):
+	"""Add `sign` to note_count once per note, for notes being approved (+1) or removed (-1)."""
+	note_ids = list(note_ids)
+	if not note_ids: return
+	rows = await db.execute(select(models.Note.university_id, func.count()).where(models.Note.id.in_(note_ids))
+	                        .group_by(models.Note.university_id))
+	for university_id, n in rows:
+		await adjust(db, university_id, note_count=sign * n)
+
+
+def _expected(conn) -> dict:
+	expected = {id: dict.fromkeys(COLUMNS, 0) for id in conn.execute(select(models.University.id)).scalars()}
+	reviews = conn.execute(select(models.Review.university_id, models.Review.rating, func.count())
+	                       .where(models.Review.rating.in_(RATINGS))
+	                       .group_by(models.Review.university_id, models.Review.rating))
+	for university_id, rating, n in reviews:
+		if university_id in expected: expected[university_id][rating_column(rating)] = n
+	for model, column, approved in ((models.Note, "note_count", models.Note.is_approved == True),
+	                                (models.User, "user_count", true())):
+		rows = conn.execute(select(model.university_id, func.count()).where(approved).group_by(model.university_id))
+		for university_id, n in rows:
+			if university_id in expected: expected[university_id][column] = n
+	return expected
+
+
+def rebuild(conn, write: bool = True) -> dict:
+	"""Recompute every university's row on a sync Connection; rewrite the drifted ones if `write`."""
+	table = models.UniversityStats.__table__
+	expected = _expected(conn)
+	current = {row.university_id: {c: getattr(row, c) for c in COLUMNS} for row in conn.execute(select(table))}
+	# A missing row reads as zeros (see UniversityOut.stats), so it is not drift
+	zeros = dict.fromkeys(COLUMNS, 0)
+	drifted = [id for id, values in expected.items() if current.get(id, zeros) != values]
+	orphans = current.keys() - expected.keys()
+	if write and drifted:
+		stmt = database.insert(table)
+		conn.execute(stmt.on_conflict_do_update(index_elements=["university_id"],
+		                                        set_={c: stmt.excluded[c] for c in COLUMNS}),
+		             [{"university_id": id, **expected[id]} for id in drifted])
+	if write and orphans:
+		conn.execute(table.delete().where(table.c.university_id.in_(orphans)))
+	return {"universities": len(expected), "drifted": len(drifted), "orphans": len(orphans)}
+
+
+async def run(write: bool = True) -> dict:
+	started = time.perf_counter()
+	async with database.engine.begin() as conn:
+		report = await conn.run_sync(rebuild, write)
+	return {**report, "seconds": round(time.perf_counter() - started, 2)}
+
+
+async def _main(argv) -> int:
+	if argv[1:] not in ([], ["check"]):
+		print("usage: python -m app.stats [check]")
+		return 2
+	report = await run(write=not argv[1:])
+	await database.engine.dispose()
+	print(json.dumps(report, indent=2))
+	return 1 if argv[1:] and (report["drifted"] or report["orphans"]) else 0
+
+
+if __name__ == "__main__":
+	sys.exit(asyncio.run(_main(sys.argv)))
@@ -0,0 +1,258 @@
+"""
+Content-addressed upload store.
+
+Uploads are streamed in chunks to a temp file while being hashed (sha256) and
+size-checked, then moved to uploads/blobs/<h[:2]>/<h[2:4]>/<hash><ext> once the
+session that stored it commits (a rollback deletes the temp file instead). The
+extension is the first upload's (it sets the served content type); identical content
+uploaded later, under any name, gets that blob's URL back, so 50 copies of a lecture
+scan cost one file and one write after the first.
+
+Starlette spools a multipart body before the route runs, so `UploadLimit` refuses
+requests whose Content-Length already exceeds MAX_UPLOAD_BYTES before reading them;
+bodies without one are only checked as `store` copies them.
+
+The `blobs` table tracks each stored file with a reference count equal to the number
+of URL columns (avatars, note images, university images/banners, image requests)
+pointing at it. Mapper events keep the count in step with inserts, updates and
+deletes, including ORM cascades. `gc` removes the files of the rows it deletes before
+committing, while it still holds their row locks: a concurrent `store` of the same
+content waits on that lock, re-creates the row and then writes the file again.
+
+Compressible blobs also get a `<blob>.gz` sibling when it is meaningfully smaller,
+which `static.UploadFiles` serves to clients that accept gzip.
+
+	python -m app.storage gc           remove unreferenced blobs and their siblings
+	python -m app.storage precompress  write missing .gz siblings for existing blobs
+"""
+import asyncio
+import glob
+import gzip
+import hashlib
+import os
+import re
+import sys
+import uuid
+from typing import Any, Callable, List
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, event, func, inspect, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from . import database, models
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+BLOB_DIR = os.path.join(UPLOAD_DIR, "blobs")
+TMP_DIR = os.path.join(UPLOAD_DIR, "tmp")
+URL_PREFIX = "/uploads/blobs/"
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "25")) * 1024 * 1024)
+CHUNK_SIZE = 256 * 1024
+# Multipart framing and form fields on top of the file itself
+UPLOAD_OVERHEAD = 64 * 1024
+# Unreferenced blobs stored or re-uploaded less than this ago survive gc, covering uploads whose row is not committed yet
+GC_GRACE = timedelta(hours=1)
+# Precompressed siblings are kept only if they save at least this fraction
+PRECOMPRESS_EXTENSIONS = (".pdf", ".txt", ".md", ".csv", ".json", ".svg", ".html", ".xml")
+PRECOMPRESS_MIN_SAVING = 0.1
+
+# Columns holding upload URLs, per model
+URL_COLUMNS = {
+	models.User: ("avatar_url",),
+	models.University: ("image_url", "banner_url"),
+	models.UniversityImageRequest: ("new_image_url",),
+	models.Faculty: ("image_url",),
+	models.Note: ("image_url",),
+}
+
+_EXT = re.compile(r"^\.[a-z0-9]{1,8}$")
+
+# Called as listener(url) for every upload once the session that stored it has committed
+listeners: List[Callable[[str], Any]] = []
+
+
+def _extension(filename: str) -> str:
+	ext = os.path.splitext(filename or "")[1].lower()
+	return ext if _EXT.match(ext) else ""
+
+
+def blob_url(digest: str, ext: str) -> str:
+	return URL_PREFIX + "/".join((digest[:2], digest[2:4], digest + ext))
+
+
+def path_for_url(url: str) -> str:
+	return os.path.join(BLOB_DIR, *url[len(URL_PREFIX):].split("/"))
+
+
+def precompress(path: str) -> bool:
+	"""Write `path`.gz if the file is compressible and gzip saves enough; returns whether it exists now."""
+	target = path + ".gz"
+	if os.path.exists(target): return True
+	if not path.lower().endswith(PRECOMPRESS_EXTENSIONS): return False
+	with open(path, "rb") as f:
+		data = f.read()
+	packed = gzip.compress(data, compresslevel=9, mtime=0)
+	if len(packed) > len(data) * (1 - PRECOMPRESS_MIN_SAVING): return False
+	tmp = f"{target}.{os.getpid()}.tmp"
+	with open(tmp, "wb") as f:
+		f.write(packed)
+	os.replace(tmp, target)
+	return True
+
+
+async def store(db: AsyncSession, upload: UploadFile) -> str:
+	"""
+	Stream `upload` into the store and return its URL. Raises 413 once the copy exceeds
+	MAX_UPLOAD_BYTES. Registers the blob in this session's transaction (or refreshes the
+	existing one's created_at, restarting its gc grace period); the reference is counted
+	once a model row with the URL is flushed. The file is put in place when the session
+	commits.
+	"""
+	os.makedirs(TMP_DIR, exist_ok=True)
+	tmp = os.path.join(TMP_DIR, uuid.uuid4().hex)
+	digest, size = hashlib.sha256(), 0
+	try:
+		with open(tmp, "wb") as f:
+			while chunk := await upload.read(CHUNK_SIZE):
+				size += len(chunk)
+				if size > MAX_UPLOAD_BYTES:
+					raise HTTPException(413, f"File larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+				digest.update(chunk)
+				await run_in_threadpool(f.write, chunk)
+		hexdigest = digest.hexdigest()
+		# Content already stored under another extension keeps its URL
+		url = (await db.execute(
+			database.insert(models.Blob).values(
+				hash=hexdigest, url=blob_url(hexdigest, _extension(upload.filename)), size=size,
+				content_type=upload.content_type,
+			).on_conflict_do_update(index_elements=["hash"], set_={"created_at": func.now()})
+			.returning(models.Blob.url)
+		)).scalar_one()
+	except BaseException:
+		if os.path.exists(tmp): os.remove(tmp)
+		raise
+	db.sync_session.info.setdefault("staged_blobs", []).append((tmp, url))
+	return url
+
+
+def _in_background(fn, *args):
+	try:
+		loop = asyncio.get_running_loop()
+	except RuntimeError:  # committed outside the event loop (scripts)
+		return fn(*args)
+	loop.run_in_executor(None, fn, *args)
+
+
+@event.listens_for(Session, "after_commit")
+def _promote_staged(session):
+	for tmp, url in session.info.pop("staged_blobs", ()):
+		final = path_for_url(url)
+		if os.path.exists(final):
+			os.remove(tmp)
+		else:
+			os.makedirs(os.path.dirname(final), exist_ok=True)
+			os.replace(tmp, final)
+			_in_background(precompress, final)
+		for listener in listeners: listener(url)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_staged(session, transaction):
+	# Still staged when the outermost transaction ends: it was rolled back (or never committed)
+	if transaction.parent is not None: return
+	for tmp, _ in session.info.pop("staged_blobs", ()):
+		if os.path.exists(tmp): os.remove(tmp)
+
+
+class UploadLimit:
+	"""Pure ASGI middleware answering 413 to multipart requests declaring a body over the upload limit."""
+
+	def __init__(self, app):
+		self.app = app
+
+	async def __call__(self, scope, receive, send):
+		if scope["type"] == "http":
+			headers = dict(scope["headers"])
+			length = headers.get(b"content-length", b"")
+			if headers.get(b"content-type", b"").startswith(b"multipart/") and length.isdigit() \
+					and int(length) > MAX_UPLOAD_BYTES + UPLOAD_OVERHEAD:
+				body = b'{"detail":"File larger than %d MB"}' % (MAX_UPLOAD_BYTES // (1024 * 1024))
+				await send({"type": "http.response.start", "status": 413,
+				            "headers": [(b"content-type", b"application/json"), (b"connection", b"close")]})
+				await send({"type": "http.response.body", "body": body})
+				return
+		await self.app(scope, receive, send)
+
+
+def _adjust(conn, urls, delta: int):
+	for url in urls:
+		if url and url.startswith(URL_PREFIX):
+			conn.execute(update(models.Blob).where(models.Blob.url == url)
+			             .values(refcount=models.Blob.refcount + delta))
+
+
+def _after_insert(mapper, conn, target):
+	_adjust(conn, (getattr(target, c) for c in URL_COLUMNS[type(target)]), 1)
+
+
+def _after_update(mapper, conn, target):
+	state = inspect(target)
+	for column in URL_COLUMNS[type(target)]:
+		history = state.attrs[column].history
+		if history.has_changes():
+			_adjust(conn, history.deleted or (), -1)
+			_adjust(conn, history.added or (), 1)
+
+
+def _after_delete(mapper, conn, target):
+	_adjust(conn, (getattr(target, c) for c in URL_COLUMNS[type(target)]), -1)
+
+
+for _model in URL_COLUMNS:
+	event.listen(_model, "after_insert", _after_insert)
+	event.listen(_model, "after_update", _after_update)
+	event.listen(_model, "after_delete", _after_delete)
+
+
+async def gc() -> int:
+	"""Delete unreferenced blobs older than GC_GRACE; returns how many were removed."""
+	cutoff = datetime.now(timezone.utc) - GC_GRACE
+	async with database.SessionLocal() as db:
+		rows = (await db.execute(
+			delete(models.Blob).where(models.Blob.refcount <= 0, models.Blob.created_at < cutoff)
+			.returning(models.Blob.url)
+		)).scalars().all()
+		# Before the commit, while the deleted rows stay locked against a concurrent re-upload
+		await run_in_threadpool(_remove_files, rows)
+		await db.commit()
+	return len(rows)
+
+
+def _remove_files(urls):
+	for url in urls:
+		path = path_for_url(url)
+		# The blob plus its derived siblings (.gz, image variants)
+		for name in [path, *glob.glob(glob.escape(path) + ".*")]:
+			try:
+				os.remove(name)
+			except FileNotFoundError:
+				pass
+
+
+def precompress_all() -> int:
+	return sum(precompress(os.path.join(root, name)) for root, _, names in os.walk(BLOB_DIR)
+	           for name in names if name.lower().endswith(PRECOMPRESS_EXTENSIONS))
+
+
+async def _main(argv):
+	if argv[1:] == ["gc"]:
+		print(f"--- REMOVED {await gc()} UNREFERENCED BLOBS ---")
+		await database.engine.dispose()
+	elif argv[1:] == ["precompress"]:
+		print(f"--- {precompress_all()} BLOBS HAVE A .gz SIBLING ---")
+	else:
+		print("usage: python -m app.storage gc|precompress")
+
+
+if __name__ == "__main__":
+	asyncio.run(_main(sys.argv))
@@ -0,0 +1,192 @@
+"""
+Bulk syllabus import: University -> Faculty -> FieldOfStudy -> Subject.
+
+Accepts CSV with one row per subject,
+
+	university,city,region,faculty,field_of_study,degree_level,semester,subject
+
+(city/region are only needed for new universities, degree_level and semester are
+optional), or JSON in the shape of GET /universities/{id}/tree:
+
+	[{"name": ..., "city": ..., "region": ..., "faculties": [{"name": ..., "fields":
+	  [{"name": ..., "degree_level": ..., "subjects": [{"name": ..., "semester": 1}]}]}]}]
+
+Rows are matched by name within their parent. Each level costs one SELECT of the
+existing rows plus batched multi-row INSERT ... RETURNING for the missing ones (and
+an executemany UPDATE for changed semesters/degree levels), all in one transaction.
+Core statements skip the mapper events, so new fields and subjects are indexed for
+search explicitly and the hierarchy cache is bumped after commit.
+
+	python -m app.syllabus path/to/syllabus.csv [--dry-run]
+"""
+import asyncio
+import csv
+import io
+import json
+import sys
+import time
+from typing import Dict, List, Tuple
+from sqlalchemy import bindparam, insert, null, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import database, fulltext, hierarchy, models
+
+BATCH_SIZE = 1000
+COLUMNS = ("university", "city", "region", "faculty", "field_of_study", "degree_level", "semester", "subject")
+REQUIRED = ("university", "faculty", "field_of_study", "subject")
+
+
+def _clean(value):
+	value = value.strip() if isinstance(value, str) else value
+	return value if value not in ("", None) else None
+
+
+def parse_csv(content: str) -> List[dict]:
+	reader = csv.DictReader(io.StringIO(content))
+	missing = [c for c in REQUIRED if c not in (reader.fieldnames or ())]
+	if missing: raise ValueError(f"CSV is missing columns: {', '.join(missing)}")
+	return [{c: _clean(row.get(c)) for c in COLUMNS} for row in reader]
+
+
+def parse_json(content: str) -> List[dict]:
+	rows = []
+	for uni in json.loads(content):
+		for fac in uni.get("faculties", []):
+			for field in fac.get("fields", []):
+				for subject in field.get("subjects", []):
+					rows.append({
+						"university": _clean(uni.get("name")), "city": _clean(uni.get("city")),
+						"region": _clean(uni.get("region")), "faculty": _clean(fac.get("name")),
+						"field_of_study": _clean(field.get("name")), "degree_level": _clean(field.get("degree_level")),
+						"semester": subject.get("semester"), "subject": _clean(subject.get("name")),
+					})
+	return rows
+
+
+def parse(filename: str, content: bytes) -> List[dict]:
+	"""Rows from a .csv or .json upload. Raises ValueError on malformed input."""
+	try:
+		text = content.decode("utf-8-sig")
+		rows = parse_json(text) if filename.lower().endswith(".json") else parse_csv(text)
+	except (UnicodeDecodeError, json.JSONDecodeError, AttributeError, TypeError) as e:
+		raise ValueError(f"Could not parse {filename}: {e}")
+	for i, row in enumerate(rows, start=1):
+		missing = [c for c in REQUIRED if not row[c]]
+		if missing: raise ValueError(f"Row {i}: missing {', '.join(missing)}")
+		try:
+			row["semester"] = int(row["semester"]) if row["semester"] is not None else None
+		except ValueError:
+			raise ValueError(f"Row {i}: semester must be a number")
+	return rows
+
+
+def _batches(items: list):
+	for i in range(0, len(items), BATCH_SIZE):
+		yield items[i:i + BATCH_SIZE]
+
+
+async def _level(db: AsyncSession, model, parent, wanted: Dict[Tuple, dict], counts: dict) -> Dict[Tuple, int]:
+	"""
+	Ensure a `model` row exists for every (parent_id, name) key of `wanted`, whose values
+	are the extra columns for new rows. Returns {key: id}; records created/existing counts
+	and the new rows' (id, name) in counts["new"].
+	"""
+	table = model.__table__
+	parent_col = table.c[parent] if parent else null()
+	ids = {}
+	for batch in _batches(sorted({name for _, name in wanted})):
+		stmt = select(table.c.id, parent_col, table.c.name).where(table.c.name.in_(batch)).order_by(table.c.id.desc())
+		for id_, parent_id, name in (await db.execute(stmt)).all():
+			if (parent_id, name) in wanted: ids[(parent_id, name)] = id_  # lowest id wins on duplicates
+	missing = [key for key in wanted if key not in ids]
+	if model is models.University:
+		unlocated = [name for _, name in missing if not (wanted[(None, name)]["city"] and wanted[(None, name)]["region"])]
+		if unlocated: raise ValueError(f"New universities need city and region: {', '.join(unlocated)}")
+	# RETURNING the natural key rather than relying on row order keeps this one statement per batch
+	stmt = insert(table).returning(table.c.id, parent_col, table.c.name)
+	for batch in _batches(missing):
+		params = [{"name": name, **({parent: parent_id} if parent else {}), **wanted[(parent_id, name)], "is_approved": True}
+		          for parent_id, name in batch]
+		for id_, parent_id, name in (await db.execute(stmt, params)).all():
+			ids[(parent_id, name)] = id_
+	counts.update(created=len(missing), existing=len(wanted) - len(missing))
+	counts["new"] = [(ids[key], key[1]) for key in missing]
+	return ids
+
+
+async def _update(db: AsyncSession, model, column: str, ids: Dict[Tuple, int], wanted: Dict[Tuple, dict]) -> int:
+	"""Executemany UPDATE of `column` where the stored value differs from a non-null wanted one."""
+	table = model.__table__
+	current = {}
+	for batch in _batches(sorted(ids.values())):
+		current.update((await db.execute(select(table.c.id, table.c[column]).where(table.c.id.in_(batch)))).all())
+	changes = [{"_id": ids[key], "_value": values[column]} for key, values in wanted.items()
+	           if values[column] is not None and current[ids[key]] != values[column]]
+	stmt = update(table).where(table.c.id == bindparam("_id")).values({column: bindparam("_value")})
+	for batch in _batches(changes):
+		await db.execute(stmt, batch)
+	return len(changes)
+
+
+async def import_rows(db: AsyncSession, rows: List[dict], dry_run: bool = False) -> dict:
+	"""
+	Upsert the syllabus `rows` (see `parse`) in one transaction and return per-level
+	counts and throughput. Commits and bumps the hierarchy version unless `dry_run`.
+	"""
+	started = time.perf_counter()
+	report = {"rows": len(rows), "dry_run": dry_run}
+	try:
+		unis = {(None, r["university"]): {"city": r["city"], "region": r["region"]} for r in rows}
+		uni_ids = await _level(db, models.University, None, unis, report.setdefault("universities", {}))
+
+		facs = {(uni_ids[(None, r["university"])], r["faculty"]): {} for r in rows}
+		fac_ids = await _level(db, models.Faculty, "university_id", facs, report.setdefault("faculties", {}))
+
+		fields = {}
+		for r in rows:
+			key = (fac_ids[(uni_ids[(None, r["university"])], r["faculty"])], r["field_of_study"])
+			fields[key] = {"degree_level": r["degree_level"] or (fields.get(key) or {}).get("degree_level")}
+		field_ids = await _level(db, models.FieldOfStudy, "faculty_id", fields, report.setdefault("fields", {}))
+		report["fields"]["updated"] = await _update(db, models.FieldOfStudy, "degree_level", field_ids, fields)
+
+		subjects = {}
+		for r in rows:
+			field_id = field_ids[(fac_ids[(uni_ids[(None, r["university"])], r["faculty"])], r["field_of_study"])]
+			subjects[(field_id, r["subject"])] = {"semester": r["semester"]}
+		subject_ids = await _level(db, models.Subject, "field_of_study_id", subjects, report.setdefault("subjects", {}))
+		report["subjects"]["updated"] = await _update(db, models.Subject, "semester", subject_ids, subjects)
+
+		conn = await db.connection()
+		for kind, level in (("field", "fields"), ("subject", "subjects")):
+			await conn.run_sync(fulltext.index, kind, report[level]["new"])
+	except BaseException:
+		await db.rollback()
+		raise
+	if dry_run:
+		await db.rollback()
+	else:
+		await db.commit()
+		hierarchy.bump()
+
+	for level in ("universities", "faculties", "fields", "subjects"):
+		del report[level]["new"]
+	report["seconds"] = round(time.perf_counter() - started, 3)
+	report["rows_per_second"] = round(len(rows) / report["seconds"]) if report["seconds"] else None
+	return report
+
+
+async def _main(argv) -> int:
+	paths = [a for a in argv[1:] if a != "--dry-run"]
+	if len(paths) != 1:
+		print("usage: python -m app.syllabus path/to/syllabus.csv|.json [--dry-run]")
+		return 2
+	with open(paths[0], "rb") as f:
+		rows = parse(paths[0], f.read())
+	async with database.SessionLocal() as db:
+		report = await import_rows(db, rows, dry_run="--dry-run" in argv)
+	await database.engine.dispose()
+	print(json.dumps(report, indent=2))
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(asyncio.run(_main(sys.argv)))
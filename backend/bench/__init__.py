@@ -0,0 +1 @@
+"""Benchmarks; run from backend/ as `python -m bench.<name>`. Not part of the app."""
@@ -0,0 +1,195 @@
+"""
+Query-plan check for the API's endpoint queries.
+
+Calls each endpoint in ENDPOINTS in-process against DATABASE_URL, records every SQL
+statement it executes, runs EXPLAIN on each SELECT/UPDATE/DELETE with the same
+parameters, and fails (exit 1) if any plan reads a large table (--min-rows, default
+10000) with a sequential scan. Run it on generated data, after migrating:
+
+	python -m bench.generate
+	python -m bench.explain --analyze
+
+Writes are limited to toggling a vote and a favorite twice, which leaves data unchanged.
+tests/test_explain.py runs the same check on a small dataset in the test suite.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+from typing import Dict, List, Optional, Tuple
+import httpx
+from sqlalchemy import event, func, inspect, select, text
+from app import database, models, seed
+from .generate import PASSWORD, WORDS
+
+# SQLite: "SCAN notes" reads the whole table; "SCAN notes USING INDEX ..." or a
+# "SEARCH ..." does not. Aliases like users_1 are matched to their table.
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+?)(?:_\d+)?(?: AS \w+)?$")
+
+_current: Optional[str] = None
+_captured: List[Tuple[str, str, tuple]] = []
+
+
+def _capture(conn, cursor, statement, parameters, context, executemany):
+	if _current and not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+		_captured.append((_current, statement, parameters))
+
+
+async def _sample(db) -> Dict[str, object]:
+	"""Ids and credentials the endpoints are called with: the busiest university, note, field."""
+	university = await db.scalar(select(models.Note.university_id).group_by(models.Note.university_id)
+	                             .order_by(func.count().desc()).limit(1))
+	note = await db.scalar(select(models.Note.id).where(models.Note.university_id == university)
+	                       .order_by(models.Note.comment_count.desc()).limit(1))
+	subject = await db.scalar(select(models.Note.subject_id).where(models.Note.id == note))
+	faculty = await db.scalar(select(models.Faculty.id).where(models.Faculty.university_id == university).limit(1))
+	field = await db.scalar(select(models.FieldOfStudy.id).where(models.FieldOfStudy.faculty_id == faculty).limit(1))
+	email = await db.scalar(select(models.User.email).where(models.User.email.like("%@bench.local")).limit(1))
+	if None in (university, note, faculty, field, email):
+		sys.exit("No benchmark data: run `python -m bench.generate` first")
+	return {"university": university, "note": note, "subject": subject, "faculty": faculty, "field": field,
+	        "email": email, "password": PASSWORD}
+
+
+def endpoints(ids: dict) -> List[Tuple[str, str, str, dict]]:
+	"""(label, method, path, params); "user"/"admin" in the label selects the credentials."""
+	u, n, s = ids["university"], ids["note"], ids["subject"]
+	return [
+		("notes", "GET", "/notes", {}),
+		("notes by university", "GET", "/notes", {"university_id": u}),
+		("notes by university, page 2", "GET", "/notes", {"university_id": u, "cursor": "next"}),
+		("notes by university, hot", "GET", "/notes", {"university_id": u, "sort": "hot"}),
+		("notes by subject", "GET", "/notes", {"subject_id": s}),
+		("notes by subject, hot", "GET", "/notes", {"subject_id": s, "sort": "hot"}),
+		("notes search", "GET", "/notes", {"search": WORDS[0][:5]}),
+		("comments", "GET", f"/notes/{n}/comments", {}),
+		("reviews", "GET", f"/universities/{u}/reviews", {}),
+		("global search", "GET", "/search/global", {"q": WORDS[1][:4]}),
+		("universities", "GET", "/universities", {}),
+		("university", "GET", f"/universities/{u}", {}),
+		("faculties", "GET", f"/universities/{u}/faculties", {}),
+		("tree", "GET", f"/universities/{u}/tree", {}),
+		("fields", "GET", f"/faculties/{ids['faculty']}/fields", {}),
+		("subjects", "GET", f"/fields/{ids['field']}/subjects", {}),
+		("login", "POST", "/token", {}),
+		("user: me", "GET", "/users/me", {}),
+		("user: dashboard", "GET", "/users/me/dashboard", {}),
+		("user: vote", "POST", f"/notes/{n}/vote", {}),
+		("user: unvote", "POST", f"/notes/{n}/vote", {}),
+		("user: favorite", "POST", f"/notes/{n}/favorite", {}),
+		("user: unfavorite", "POST", f"/notes/{n}/favorite", {}),
+		("admin: pending counts", "GET", "/admin/pending_counts", {}),
+		("admin: pending notes", "GET", "/admin/pending/note", {}),
+		("admin: pending items", "GET", "/admin/pending_items", {}),
+	]
+
+
+def _seq_scans_sqlite(rows, large: set) -> List[str]:
+	return [detail for *_, detail in rows if (m := _SQLITE_SCAN.match(detail)) and m.group(1) in large]
+
+
+def _seq_scans_postgres(rows, large: set) -> List[str]:
+	found = []
+
+	def walk(node):
+		if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in large:
+			found.append(f"Seq Scan on {node['Relation Name']}")
+		for child in node.get("Plans", ()): walk(child)
+
+	plan = rows[0][0]
+	walk((json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"])
+	return found
+
+
+async def explain(statement: str, parameters, large: set) -> Tuple[List, List[str]]:
+	postgres = database.engine.dialect.name == "postgresql"
+	prefix = "EXPLAIN (FORMAT JSON) " if postgres else "EXPLAIN QUERY PLAN "
+	async with database.engine.connect() as conn:
+		rows = (await conn.exec_driver_sql(prefix + statement, parameters)).all()
+	if postgres: return [rows[0][0]], _seq_scans_postgres(rows, large)
+	return [r[-1] for r in rows], _seq_scans_sqlite(rows, large)
+
+
+async def table_sizes(analyze: bool = False) -> Dict[str, int]:
+	"""Row count of every table, after ANALYZE if asked."""
+	async with database.engine.begin() as conn:
+		if analyze: await conn.execute(text("ANALYZE"))
+		tables = await conn.run_sync(lambda c: inspect(c).get_table_names())
+		return {t: await conn.scalar(text(f'SELECT count(*) FROM "{t}"')) for t in tables}
+
+
+async def capture(client: httpx.AsyncClient, ids: dict, headers: dict) -> List[Tuple[str, str, tuple]]:
+	"""
+	Call every endpoint through `client`, with headers["user"] / headers["admin"] where
+	the label asks for them; returns (label, statement, parameters) of what they executed.
+	"""
+	global _current
+	_captured.clear()
+	event.listen(database.engine.sync_engine, "before_cursor_execute", _capture)
+	try:
+		next_cursor = None
+		for label, method, path, params in endpoints(ids):
+			role = label.partition(":")[0] if ":" in label else None
+			if role and role not in headers:
+				print(f"skipping {label!r}: no {role} credentials", file=sys.stderr)
+				continue
+			if params.get("cursor") == "next":
+				if not next_cursor: continue
+				params = {**params, "cursor": next_cursor}
+			data = {"username": ids["email"], "password": ids["password"]} if path == "/token" else None
+			_current = label
+			r = await client.request(method, path, params=params, data=data, headers=headers.get(role))
+			_current = None
+			if r.status_code >= 400: print(f"{label}: HTTP {r.status_code}", file=sys.stderr)
+			if label == "notes by university": next_cursor = r.json().get("next_cursor")
+	finally:
+		_current = None
+		event.remove(database.engine.sync_engine, "before_cursor_execute", _capture)
+	return list(_captured)
+
+
+async def check(captured, large: set, verbose: bool = False) -> Tuple[int, List[dict]]:
+	"""EXPLAIN every captured statement; returns (statements scanning a large table, report)."""
+	report, failures = [], 0
+	for label, statement, parameters in captured:
+		plan, scans = await explain(statement, parameters, large)
+		failures += bool(scans)
+		if scans or verbose:
+			report.append({"endpoint": label, "sql": " ".join(statement.split())[:300], "plan": plan, "seq_scans": scans})
+	return failures, report
+
+
+async def main(args) -> int:
+	os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+	from app.main import app
+
+	counts = await table_sizes(args.analyze)
+	large = {t for t, n in counts.items() if n >= args.min_rows}
+	async with database.SessionLocal() as db:
+		ids = await _sample(db)
+
+	async with httpx.AsyncClient(app=app, base_url="http://explain") as client:
+		headers = {}
+		for role, email, password in (("user", ids["email"], PASSWORD), ("admin", seed.ADMIN_EMAIL, seed.ADMIN_PASS)):
+			r = await client.post("/token", data={"username": email, "password": password})
+			if r.status_code == 200: headers[role] = {"Authorization": f"Bearer {r.json()['access_token']}"}
+		captured = await capture(client, ids, headers)
+	failures, report = await check(captured, large, args.verbose)
+	await database.engine.dispose()
+	print(json.dumps({"large_tables": {t: counts[t] for t in sorted(large)}, "statements": len(captured),
+	                  "failures": failures, "details": report}, indent=2, default=str))
+	return 1 if failures else 0
+
+
+def parse_args(argv=None):
+	parser = argparse.ArgumentParser(description="Fail on sequential scans of large tables in endpoint queries.")
+	parser.add_argument("--min-rows", type=int, default=10000, help="tables at least this big count as large")
+	parser.add_argument("--analyze", action="store_true", help="run ANALYZE first so the planner has statistics")
+	parser.add_argument("--verbose", action="store_true", help="list every plan, not only failures")
+	return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+	sys.exit(asyncio.run(main(parse_args())))
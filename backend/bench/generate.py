@@ -0,0 +1,197 @@
+"""
+Synthetic dataset generator for benchmarks.
+
+Fills users, universities, faculties, fields of study, subjects, notes, votes, favorites,
+comments and reviews at configurable volumes with a fixed random seed, so two runs with
+the same arguments produce the same data. Rows are written with batched Core inserts
+(explicit ids, appended after existing rows); note counters, scores and hot scores are consistent
+with the generated votes/favorites/comments and every note/field/subject is indexed for
+search; university stats are rebuilt at the end. Applies pending migrations first.
+
+	python -m bench.generate --universities 100 --notes 1000000
+
+Every generated user's password is PASSWORD; emails are user<N>@bench.local.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, insert, select, text
+from app import auth, database, fulltext, migrate, models, ranking, stats
+
+PASSWORD = "bench-password"
+BATCH_SIZE = 5000
+WORDS = [
+	"analiza", "algebra", "algorytmy", "struktury", "danych", "bazy", "systemy", "operacyjne", "sieci",
+	"komputerowe", "programowanie", "obiektowe", "fizyka", "matematyka", "dyskretna", "grafika",
+	"inżynieria", "oprogramowania", "sztuczna", "inteligencja", "bezpieczeństwo", "kompilatory",
+	"statystyka", "prawdopodobieństwo", "elektronika", "automatyka", "robotyka", "chemia", "mechanika",
+	"termodynamika", "ekonomia", "zarządzanie", "logika", "optymalizacja", "kryptografia", "sygnały",
+]
+NOTE_WORDS = ["notatki", "kolokwium", "egzamin", "wykład", "ćwiczenia", "laboratorium", "ściąga", "zadania", "projekt"]
+CITIES = [("Kraków", "Małopolskie"), ("Warszawa", "Mazowieckie"), ("Wrocław", "Dolnośląskie"),
+          ("Gdańsk", "Pomorskie"), ("Poznań", "Wielkopolskie"), ("Łódź", "Łódzkie"), ("Lublin", "Lubelskie")]
+
+
+def _phrase(rng: random.Random, words, n: int) -> str:
+	return " ".join(rng.choice(words) for _ in range(n)).capitalize()
+
+
+class Generator:
+	def __init__(self, args):
+		self.args = args
+		self.rng = random.Random(args.seed)
+		self.now = datetime.now(timezone.utc)
+		self.counts = {}
+
+	async def _next_id(self, conn, model) -> int:
+		return (await conn.scalar(select(func.coalesce(func.max(model.id), 0)))) + 1
+
+	async def _write(self, model, rows, index_kind: str = None, attrs=()):
+		"""Insert `rows` (dicts with explicit ids) in batches, indexing them for search if asked."""
+		for i in range(0, len(rows), BATCH_SIZE):
+			batch = rows[i:i + BATCH_SIZE]
+			async with database.engine.begin() as conn:
+				await conn.execute(insert(model.__table__), batch)
+				if index_kind:
+					await conn.run_sync(fulltext.index, index_kind, [(r["id"], *(r.get(a) for a in attrs)) for r in batch])
+		self.counts[model.__tablename__] = self.counts.get(model.__tablename__, 0) + len(rows)
+
+	def _ago(self, days: int) -> datetime:
+		return self.now - timedelta(seconds=self.rng.randrange(days * 86400))
+
+	async def hierarchy(self):
+		a, rng = self.args, self.rng
+		async with database.engine.connect() as conn:
+			uni_id, fac_id, field_id, subject_id = [await self._next_id(conn, m) for m in
+			                                        (models.University, models.Faculty, models.FieldOfStudy, models.Subject)]
+		unis, facs, fields, subjects = [], [], [], []
+		self.subjects_by_uni = {}
+		for u in range(a.universities):
+			city, region = rng.choice(CITIES)
+			unis.append({"id": uni_id, "name": f"Uniwersytet Testowy {uni_id}", "city": city, "region": region,
+			             "description": _phrase(rng, WORDS, 12), "is_approved": True})
+			self.subjects_by_uni[uni_id] = []
+			for f in range(a.faculties):
+				facs.append({"id": fac_id, "name": f"Wydział {_phrase(rng, WORDS, 2)}", "university_id": uni_id, "is_approved": True})
+				for s in range(a.fields):
+					fields.append({"id": field_id, "name": _phrase(rng, WORDS, 2), "degree_level": rng.choice(["I stopień", "II stopień"]),
+					               "faculty_id": fac_id, "is_approved": True})
+					for _ in range(a.subjects):
+						subjects.append({"id": subject_id, "name": _phrase(rng, WORDS, rng.randint(1, 3)), "semester": rng.randint(1, 7),
+						                 "field_of_study_id": field_id, "is_approved": True})
+						self.subjects_by_uni[uni_id].append(subject_id)
+						subject_id += 1
+					field_id += 1
+				fac_id += 1
+			uni_id += 1
+		await self._write(models.University, unis)
+		await self._write(models.Faculty, facs)
+		await self._write(models.FieldOfStudy, fields, "field", ("name",))
+		await self._write(models.Subject, subjects, "subject", ("name",))
+
+	async def users(self):
+		a, rng = self.args, self.rng
+		hashed = auth.get_password_hash(PASSWORD)
+		async with database.engine.connect() as conn:
+			first = await self._next_id(conn, models.User)
+		uni_ids = list(self.subjects_by_uni)
+		self.user_ids = range(first, first + a.users)
+		await self._write(models.User, [{
+			"id": i, "email": f"user{i}@bench.local", "hashed_password": hashed, "nickname": f"user{i}",
+			"university_id": rng.choice(uni_ids), "is_verified": True, "created_at": self._ago(730),
+		} for i in self.user_ids])
+
+	async def reviews(self):
+		rng = self.rng
+		await self._write(models.Review, [{
+			"user_id": rng.choice(self.user_ids), "university_id": uni_id, "rating": rng.choices(range(1, 6), (1, 1, 2, 4, 3))[0],
+			"content": _phrase(rng, WORDS, 20), "created_at": self._ago(730),
+		} for uni_id in self.subjects_by_uni for _ in range(self.args.reviews)])
+
+	async def notes(self):
+		"""Notes with their votes, favorites and comments, generated one batch at a time."""
+		a, rng = self.args, self.rng
+		async with database.engine.connect() as conn:
+			note_id = await self._next_id(conn, models.Note)
+		uni_ids = list(self.subjects_by_uni)
+		remaining = a.notes
+		while remaining:
+			notes, votes, favorites, comments = [], [], [], []
+			for _ in range(min(BATCH_SIZE, remaining)):
+				uni_id = rng.choice(uni_ids)
+				voters = rng.sample(self.user_ids, min(len(self.user_ids), int(rng.expovariate(1 / a.votes)))) if a.votes else []
+				fans = rng.sample(voters, len(voters) // 3)
+				n_comments = int(rng.expovariate(1 / a.comments)) if a.comments else 0
+				created = self._ago(365)
+				notes.append({
+					"id": note_id, "title": f"{_phrase(rng, NOTE_WORDS, 1)} {_phrase(rng, WORDS, 2).lower()}",
+					"content": _phrase(rng, WORDS + NOTE_WORDS, 30), "university_id": uni_id,
+					"subject_id": rng.choice(self.subjects_by_uni[uni_id]), "author_id": rng.choice(self.user_ids),
+					"score": float(len(voters)), "favorite_count": len(fans), "comment_count": n_comments,
+					"hot": ranking.hot(len(voters), len(fans), n_comments, created),
+					"is_approved": rng.random() > a.pending, "created_at": created,
+				})
+				votes += [{"user_id": u, "note_id": note_id, "value": 1} for u in voters]
+				favorites += [{"user_id": u, "note_id": note_id} for u in fans]
+				comments += [{"user_id": rng.choice(self.user_ids), "note_id": note_id, "content": _phrase(rng, WORDS, 8),
+				              "created_at": created + timedelta(minutes=rng.randrange(60 * 24 * 30))} for _ in range(n_comments)]
+				note_id += 1
+			await self._write(models.Note, notes, "note", ("title", "content"))
+			await self._write(models.Vote, votes)
+			await self._write(models.Favorite, favorites)
+			await self._write(models.Comment, comments)
+			remaining -= len(notes)
+			print(f"  notes: {a.notes - remaining}/{a.notes}", flush=True)
+
+	async def _sync_sequences(self):
+		# Explicit ids leave Postgres sequences behind; SQLite needs nothing
+		if database.engine.dialect.name != "postgresql": return
+		async with database.engine.begin() as conn:
+			for table in self.counts:
+				await conn.execute(text(
+					f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT coalesce(max(id), 1) FROM {table}))"
+				))
+
+	async def run(self) -> dict:
+		started = time.perf_counter()
+		async with database.locked("migrate") as conn:
+			await conn.run_sync(migrate.upgrade)
+		await self.hierarchy()
+		await self.users()
+		await self.reviews()
+		await self.notes()
+		await self._sync_sequences()
+		async with database.engine.begin() as conn:
+			await conn.run_sync(stats.rebuild)
+		seconds = time.perf_counter() - started
+		return {"seed": self.args.seed, "rows": self.counts, "seconds": round(seconds, 1),
+		        "rows_per_second": round(sum(self.counts.values()) / seconds)}
+
+
+def parse_args(argv=None):
+	parser = argparse.ArgumentParser(description="Fill the database with a synthetic dataset.")
+	parser.add_argument("--seed", type=int, default=42)
+	parser.add_argument("--universities", type=int, default=20)
+	parser.add_argument("--faculties", type=int, default=4, help="per university")
+	parser.add_argument("--fields", type=int, default=3, help="per faculty")
+	parser.add_argument("--subjects", type=int, default=20, help="per field of study")
+	parser.add_argument("--users", type=int, default=2000)
+	parser.add_argument("--notes", type=int, default=50000)
+	parser.add_argument("--votes", type=float, default=5, help="mean per note")
+	parser.add_argument("--comments", type=float, default=2, help="mean per note")
+	parser.add_argument("--reviews", type=int, default=20, help="per university")
+	parser.add_argument("--pending", type=float, default=0.05, help="fraction of notes left unapproved")
+	return parser.parse_args(argv)
+
+
+async def _main():
+	report = await Generator(parse_args()).run()
+	await database.engine.dispose()
+	print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+	asyncio.run(_main())
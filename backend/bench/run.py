@@ -0,0 +1,170 @@
+"""
+Endpoint load test.
+
+Drives the main routes at a fixed concurrency for a fixed number of requests each and
+prints p50/p95/p99 latency and throughput as JSON. By default the app runs in-process
+(ASGI transport, no network; client and app share one event loop and CPU), against
+DATABASE_URL; with --url it drives a running server instead. Generate data first:
+
+	python -m bench.generate
+	python -m bench.run --concurrency 16 --requests 500 --output before.json
+	python -m bench.run --compare before.json        # exits 1 on a regression
+
+Requires httpx (bench/requirements.txt). With --url, start the server with RATE_LIMIT_ENABLED=0.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List
+import httpx
+from sqlalchemy import func, select
+from app import database, models
+from .generate import PASSWORD, WORDS
+
+SCENARIOS = ("notes", "notes_hot", "notes_search", "search", "reviews", "vote", "token")
+# --compare fails when p95 grows, or throughput drops, by more than this fraction
+TOLERANCE = 0.2
+
+
+def percentile(values: List[float], q: float) -> float:
+	values = sorted(values)
+	return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+class Bench:
+	def __init__(self, client: httpx.AsyncClient, args):
+		self.client = client
+		self.args = args
+		self.rng = random.Random(args.seed)
+
+	async def setup(self):
+		"""Sample ids to hit, and log in a pool of generated users for the authenticated routes."""
+		async with database.SessionLocal() as db:
+			self.university_ids = (await db.scalars(select(models.University.id).where(models.University.is_approved == True))).all()
+			self.note_ids = (await db.scalars(select(models.Note.id).where(models.Note.is_approved == True)
+			                                  .order_by(func.random()).limit(1000))).all()
+			self.emails = (await db.scalars(select(models.User.email).where(models.User.email.like("%@bench.local"))
+			                                .order_by(models.User.id).limit(self.args.concurrency))).all()
+		if not (self.university_ids and self.note_ids and self.emails):
+			sys.exit("No benchmark data: run `python -m bench.generate` first")
+		self.headers = []
+		for email in self.emails:
+			r = await self.client.post("/token", data={"username": email, "password": PASSWORD})
+			r.raise_for_status()
+			self.headers.append({"Authorization": f"Bearer {r.json()['access_token']}"})
+
+	def request(self, scenario: str, worker: int) -> Callable[[], Awaitable[httpx.Response]]:
+		rng, c = self.rng, self.client
+		if scenario == "notes":
+			return lambda: c.get("/notes", params={"university_id": rng.choice(self.university_ids)})
+		if scenario == "notes_hot":
+			return lambda: c.get("/notes", params={"university_id": rng.choice(self.university_ids), "sort": "hot"})
+		if scenario == "notes_search":
+			return lambda: c.get("/notes", params={"search": rng.choice(WORDS)[:5]})
+		if scenario == "search":
+			return lambda: c.get("/search/global", params={"q": rng.choice(WORDS)[:rng.randint(3, 8)]})
+		if scenario == "reviews":
+			return lambda: c.get(f"/universities/{rng.choice(self.university_ids)}/reviews")
+		if scenario == "vote":
+			headers = self.headers[worker % len(self.headers)]
+			return lambda: c.post(f"/notes/{rng.choice(self.note_ids)}/vote", headers=headers)
+		if scenario == "token":
+			email = self.emails[worker % len(self.emails)]
+			return lambda: c.post("/token", data={"username": email, "password": PASSWORD})
+		raise KeyError(scenario)
+
+	async def scenario(self, name: str) -> Dict:
+		latencies, errors = [], 0
+		remaining = self.args.requests
+
+		async def worker(i: int):
+			nonlocal remaining, errors
+			send = self.request(name, i)
+			while remaining > 0:
+				remaining -= 1
+				started = time.perf_counter()
+				try:
+					ok = (await send()).status_code < 400
+				except httpx.HTTPError:
+					ok = False
+				latencies.append(time.perf_counter() - started)
+				errors += not ok
+
+		started = time.perf_counter()
+		await asyncio.gather(*(worker(i) for i in range(self.args.concurrency)))
+		elapsed = time.perf_counter() - started
+		ms = [l * 1000 for l in latencies]
+		return {
+			"requests": len(ms), "errors": errors, "throughput_rps": round(len(ms) / elapsed, 1),
+			"p50_ms": round(percentile(ms, 50), 2), "p95_ms": round(percentile(ms, 95), 2),
+			"p99_ms": round(percentile(ms, 99), 2), "max_ms": round(max(ms), 2),
+		}
+
+
+def _commit() -> str:
+	try:
+		return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+	except OSError:
+		return ""
+
+
+def compare(baseline: Dict, current: Dict) -> List[str]:
+	"""Human-readable regressions of `current` against `baseline` (empty if none)."""
+	regressions = []
+	for name, now in current["scenarios"].items():
+		before = baseline.get("scenarios", {}).get(name)
+		if not before: continue
+		if now["p95_ms"] > before["p95_ms"] * (1 + TOLERANCE):
+			regressions.append(f"{name}: p95 {before['p95_ms']} -> {now['p95_ms']} ms")
+		if now["throughput_rps"] < before["throughput_rps"] * (1 - TOLERANCE):
+			regressions.append(f"{name}: throughput {before['throughput_rps']} -> {now['throughput_rps']} rps")
+	return regressions
+
+
+async def main(args) -> int:
+	if args.url:
+		client = httpx.AsyncClient(base_url=args.url, timeout=60)
+	else:
+		# Every simulated client shares one IP and a few users; budgets would throttle the run
+		os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+		from app.main import app
+		client = httpx.AsyncClient(app=app, base_url="http://bench", timeout=60)
+	async with client:
+		bench = Bench(client, args)
+		await bench.setup()
+		results = {name: await bench.scenario(name) for name in args.scenarios}
+	await database.engine.dispose()
+
+	report = {
+		"commit": _commit(), "database": database.engine.dialect.name, "target": args.url or "in-process",
+		"concurrency": args.concurrency, "requests_per_scenario": args.requests, "scenarios": results,
+	}
+	print(json.dumps(report, indent=2))
+	if args.output:
+		with open(args.output, "w") as f: json.dump(report, f, indent=2)
+	if args.compare:
+		with open(args.compare) as f: regressions = compare(json.load(f), report)
+		for line in regressions: print(f"REGRESSION {line}", file=sys.stderr)
+		return 1 if regressions else 0
+	return 0
+
+
+def parse_args(argv=None):
+	parser = argparse.ArgumentParser(description="Load-test the main API routes.")
+	parser.add_argument("--url", help="base URL of a running server (default: in-process)")
+	parser.add_argument("--concurrency", type=int, default=8)
+	parser.add_argument("--requests", type=int, default=200, help="per scenario")
+	parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+	parser.add_argument("--seed", type=int, default=42)
+	parser.add_argument("--output", help="also write the JSON report here")
+	parser.add_argument("--compare", help="baseline JSON report; exit 1 on regressions beyond TOLERANCE")
+	return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+	sys.exit(asyncio.run(main(parse_args())))
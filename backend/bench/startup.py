@@ -0,0 +1,62 @@
+"""
+Worker cold-start benchmark.
+
+Boots N workers at once (as uvicorn --workers N would), each timing `import app.main`
+and the startup handlers, over several rounds against DATABASE_URL. The database is
+migrated and seeded once beforehand, as a deploy would. Prints JSON:
+
+	python -m bench.startup --workers 4 --rounds 5
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+
+def _child():
+	started = time.perf_counter()
+	from app.main import app
+	imported = time.perf_counter()
+	asyncio.run(app.router.startup())
+	print(json.dumps({"import_s": imported - started, "startup_s": time.perf_counter() - imported}))
+
+
+def _summary(values):
+	values = sorted(values)
+	return {"p50": round(statistics.median(values), 4), "max": round(values[-1], 4)}
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument("--workers", type=int, default=4)
+	parser.add_argument("--rounds", type=int, default=5)
+	parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+	args = parser.parse_args()
+	if args.child: return _child()
+
+	for module in ("app.migrate", "app.seed"):
+		subprocess.run([sys.executable, "-m", module], check=True, stdout=subprocess.DEVNULL)
+	samples, walls = [], []
+	for _ in range(args.rounds):
+		started = time.perf_counter()
+		procs = [subprocess.Popen([sys.executable, "-m", "bench.startup", "--child"], stdout=subprocess.PIPE, text=True)
+		         for _ in range(args.workers)]
+		for proc in procs:
+			out, _ = proc.communicate()
+			if proc.returncode: sys.exit(f"worker exited with {proc.returncode}")
+			samples.append(json.loads(out.strip().splitlines()[-1]))
+		walls.append(time.perf_counter() - started)
+	print(json.dumps({
+		"workers": args.workers,
+		"rounds": args.rounds,
+		"import_s": _summary([s["import_s"] for s in samples]),
+		"startup_s": _summary([s["startup_s"] for s in samples]),
+		"all_workers_ready_s": _summary(walls),
+	}, indent=2))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,88 @@
+"""
+Fixtures for the API tests: the app against a throwaway SQLite database, migrated and
+seeded on startup, driven in-process through an httpx ASGI client.
+
+Run from backend/:  python -m pytest
+"""
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="colloq-tests-")
+os.environ.update(
+	DATABASE_URL=os.getenv("TEST_DATABASE_URL", f"sqlite:///{_tmp}/test.db"),
+	AUTO_MIGRATE="1",
+	UPLOAD_DIR=os.path.join(_tmp, "uploads"),
+	RATE_LIMIT_ENABLED="0",
+	RANKING_REFRESH_SECONDS="0",
+	BCRYPT_ROUNDS="4",
+	MAX_UPLOAD_MB="1",
+)
+
+import httpx
+import pytest
+from sqlalchemy import event, select
+from app import database, models, seed
+
+if database.engine.dialect.name == "sqlite":
+	# Enforce foreign keys like Postgres does, so tests catch writes that would violate them
+	@event.listens_for(database.engine.sync_engine, "connect")
+	def _foreign_keys(dbapi_connection, _):
+		cursor = dbapi_connection.cursor()
+		cursor.execute("PRAGMA foreign_keys=ON")
+		cursor.close()
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+	return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def client(anyio_backend):
+	from app.main import app
+	await app.router.startup()
+	try:
+		async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+			yield client
+	finally:
+		await app.router.shutdown()
+
+
+async def auth_headers(client, email: str, password: str) -> dict:
+	r = await client.post("/token", data={"username": email, "password": password})
+	assert r.status_code == 200, r.text
+	return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+async def admin(client):
+	return await auth_headers(client, seed.ADMIN_EMAIL, seed.ADMIN_PASS)
+
+
+@pytest.fixture
+async def user(client):
+	"""A freshly registered student of university 1, as auth headers."""
+	email = f"student{next(_users)}@colloq-tests.pl"
+	r = await client.post("/register", json={"user": {"email": email, "password": "password1", "university_id": 1}})
+	assert r.status_code in (200, 201), r.text
+	return await auth_headers(client, email, "password1")
+
+
+_users = iter(range(1, 1_000_000))
+
+
+@pytest.fixture
+def approved_note(client, admin):
+	"""approved_note(title, ...) uploads a note as the admin and approves it; returns its id."""
+	async def create(title: str, content: str = "", university_id: int = 1, subject_id: int = 1) -> int:
+		r = await client.post("/notes", data={"university_id": university_id, "subject_id": subject_id,
+		                                      "title": title, "content": content}, headers=admin)
+		assert r.status_code == 201, r.text
+		async with database.SessionLocal() as db:
+			note_id = await db.scalar(select(models.Note.id).where(models.Note.title == title)
+			                          .order_by(models.Note.id.desc()))
+		r = await client.post("/admin/moderate", json={"action": "approve", "items": [{"type": "note", "id": note_id}]},
+		                      headers=admin)
+		assert r.status_code == 200, r.text
+		return note_id
+	return create
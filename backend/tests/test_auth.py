@@ -0,0 +1,20 @@
+import pytest
+from sqlalchemy import select
+from app import auth, database, models
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_user_cache_is_evicted_on_commit_not_flush(client, user):
+	me = (await client.get("/users/me", headers=user)).json()
+	assert auth.user_cache.get(me["email"]) is not None
+
+	async with database.SessionLocal() as db:
+		row = await db.scalar(select(models.User).where(models.User.id == me["id"]))
+		row.is_active = False
+		await db.flush()
+		# Until the commit other requests must keep reading (and caching) the committed row
+		assert auth.user_cache.get(me["email"]) is not None
+		await db.commit()
+	assert auth.user_cache.get(me["email"]) is None
+	assert (await client.get("/users/me", headers=user)).status_code in (400, 401)
@@ -0,0 +1,28 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def _comment_ids(client, note_id, **params):
+	ids, cursor = [], None
+	while True:
+		page = (await client.get(f"/notes/{note_id}/comments", params={**params, "limit": 2,
+		                                                                   **({"cursor": cursor} if cursor else {})})).json()
+		ids += [c["id"] for c in page["items"]]
+		cursor = page["next_cursor"]
+		if not cursor: return ids
+
+
+async def test_newest_order_puts_new_comments_on_first_page(client, user, approved_note):
+	note_id = await approved_note("Thread")
+	for i in range(5):
+		r = await client.post(f"/notes/{note_id}/comments", json={"content": f"c{i}"}, headers=user)
+		assert r.status_code in (200, 201), r.text
+
+	oldest = await _comment_ids(client, note_id)
+	newest = await _comment_ids(client, note_id, order="newest")
+	assert newest == oldest[::-1]
+
+	await client.post(f"/notes/{note_id}/comments", json={"content": "latest"}, headers=user)
+	first = (await client.get(f"/notes/{note_id}/comments", params={"order": "newest", "limit": 2})).json()["items"]
+	assert first[0]["content"] == "latest"
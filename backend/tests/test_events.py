@@ -0,0 +1,26 @@
+import pytest
+from sqlalchemy import select
+from app import database, events, models
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("path", ["/notes/999999/events", "/universities/999999/events"])
+async def test_unknown_stream_is_404(client, path):
+	assert (await client.get(path)).status_code == 404
+
+
+async def test_pending_note_publishes_nothing(client, user, monkeypatch):
+	r = await client.post("/notes", data={"university_id": 1, "subject_id": 1, "title": "Unreviewed"}, headers=user)
+	assert r.status_code == 201, r.text
+	async with database.SessionLocal() as db:
+		note_id = await db.scalar(select(models.Note.id).where(models.Note.title == "Unreviewed"))
+	published = []
+	monkeypatch.setattr(events, "publish", lambda topic, type, data: published.append((topic, type)))
+
+	assert (await client.get(f"/notes/{note_id}/events")).status_code == 404
+	for action in ("vote", "favorite"):
+		assert (await client.post(f"/notes/{note_id}/{action}", headers=user)).status_code == 200
+	r = await client.post(f"/notes/{note_id}/comments", json={"content": "early"}, headers=user)
+	assert r.status_code in (200, 201), r.text
+	assert published == []
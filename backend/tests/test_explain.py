@@ -0,0 +1,38 @@
+"""
+bench.explain on a small dataset: every statement the endpoints run must reach each
+non-empty table through an index, never a full scan. Without ANALYZE the planner
+does not know the tables are tiny, so plans match those of a large database.
+"""
+import pytest
+from sqlalchemy import select
+from app import database, models
+from app.pagination import DEFAULT_PAGE_SIZE
+from bench import explain
+
+pytestmark = pytest.mark.anyio
+
+MIN_ROWS = 1
+
+
+async def test_endpoint_queries_use_indexes(client, user, admin, approved_note):
+	note = await approved_note("Explained", "całki oznaczone")
+	await approved_note("Explained too")
+	assert (await client.post(f"/notes/{note}/comments", json={"content": "ok"}, headers=user)).status_code in (200, 201)
+	assert (await client.post("/reviews", json={"university_id": 1, "rating": 5, "content": "ok"},
+	                          headers=user)).status_code == 200
+	me = (await client.get("/users/me", headers=user)).json()
+	async with database.SessionLocal() as db:
+		# Enough for the "page 2" call to have a cursor
+		db.add_all(models.Note(title=f"filler {i}", university_id=1, subject_id=1, author_id=me["id"], is_approved=True)
+		           for i in range(DEFAULT_PAGE_SIZE))
+		await db.commit()
+		faculty = await db.scalar(select(models.Faculty.id).where(models.Faculty.university_id == 1).limit(1))
+		field = await db.scalar(select(models.FieldOfStudy.id).where(models.FieldOfStudy.faculty_id == faculty).limit(1))
+	ids = {"university": 1, "note": note, "subject": 1, "faculty": faculty, "field": field,
+	       "email": me["email"], "password": "password1"}
+
+	captured = await explain.capture(client, ids, {"user": user, "admin": admin})
+	assert "notes by university, page 2" in {label for label, *_ in captured}
+	large = {t for t, n in (await explain.table_sizes()).items() if n >= MIN_ROWS}
+	failures, report = await explain.check(captured, large)
+	assert not failures, report
@@ -0,0 +1,20 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("action", ["vote", "favorite"])
+async def test_missing_note_is_404(client, user, action):
+	r = await client.post(f"/notes/999999/{action}", headers=user)
+	assert r.status_code == 404
+
+
+async def test_vote_and_favorite_toggle(client, user, approved_note):
+	note_id = await approved_note("Toggled")
+	first = (await client.post(f"/notes/{note_id}/vote", headers=user)).json()
+	second = (await client.post(f"/notes/{note_id}/vote", headers=user)).json()
+	assert (first["user_has_voted"], second["user_has_voted"]) == (True, False)
+	assert second["new_score"] == first["new_score"] - 1
+
+	assert (await client.post(f"/notes/{note_id}/favorite", headers=user)).json()["favorite_count"] == 1
+	assert (await client.post(f"/notes/{note_id}/favorite", headers=user)).json()["favorite_count"] == 0
@@ -0,0 +1,25 @@
+"""The migrations alone, applied to the empty test database on startup, must build the models' schema."""
+import pytest
+from sqlalchemy import inspect
+from app import database, migrate, models
+
+pytestmark = pytest.mark.anyio
+
+
+def _schema(conn):
+	inspector = inspect(conn)
+	return {name: ({c["name"] for c in inspector.get_columns(name)},
+	               {i["name"]: i["column_names"] for i in inspector.get_indexes(name)})
+	        for name in inspector.get_table_names()}
+
+
+async def test_migrations_build_the_models_schema(client):
+	async with database.engine.connect() as conn:
+		assert await conn.run_sync(migrate.pending) == []
+		schema = await conn.run_sync(_schema)
+	for table in models.Base.metadata.sorted_tables:
+		assert table.name in schema, table.name
+		columns, indexes = schema[table.name]
+		assert columns == {c.name for c in table.columns}, table.name
+		for index in table.indexes:
+			assert indexes.get(index.name) == [c.name for c in index.columns], index.name
@@ -0,0 +1,59 @@
+import pytest
+from app import database, models, stats
+
+pytestmark = pytest.mark.anyio
+
+
+async def _note_count(university_id: int) -> int:
+	async with database.SessionLocal() as db:
+		return (await db.get(models.UniversityStats, university_id)).note_count
+
+
+async def _branch_with_notes(university_id: int, approved_notes: int) -> dict:
+	"""An approved faculty/field/subject under `university_id` holding approved notes and one pending note."""
+	async with database.SessionLocal() as db:
+		faculty = models.Faculty(name="Doomed F", university_id=university_id, is_approved=True)
+		db.add(faculty)
+		await db.flush()
+		field = models.FieldOfStudy(name="Doomed FoS", faculty_id=faculty.id, is_approved=True)
+		db.add(field)
+		await db.flush()
+		subject = models.Subject(name="Doomed S", semester=1, field_of_study_id=field.id, is_approved=True)
+		db.add(subject)
+		await db.flush()
+		notes = [models.Note(title=f"doomed {i}", university_id=university_id, subject_id=subject.id,
+		                     is_approved=i < approved_notes) for i in range(approved_notes + 1)]
+		db.add_all(notes)
+		await db.commit()
+		return {"faculty": faculty.id, "field": field.id, "subject": subject.id, "note": notes[0].id}
+
+
+@pytest.mark.parametrize("type", ["subject", "field", "faculty"])
+async def test_rejecting_a_parent_keeps_note_counts(client, admin, type):
+	ids = await _branch_with_notes(1, approved_notes=3)
+	await stats.run()  # counts match before the rejection
+	before = await _note_count(1)
+
+	# One of the cascaded notes is also rejected by itself: it must be counted once
+	items = [{"type": type, "id": ids[type]}, {"type": "note", "id": ids["note"]}]
+	r = await client.post("/admin/moderate", json={"action": "reject", "items": items}, headers=admin)
+	assert r.status_code == 200, r.text
+
+	report = await stats.run(write=False)
+	assert (report["drifted"], report["orphans"]) == (0, 0)
+	assert await _note_count(1) == before - 3
+
+
+async def test_rejecting_a_university_leaves_no_drift(client, admin):
+	async with database.SessionLocal() as db:
+		university = models.University(name="Doomed U", city="X", region="Y", is_approved=True)
+		db.add(university)
+		await db.commit()
+	await _branch_with_notes(university.id, approved_notes=2)
+	await stats.run()
+
+	items = [{"type": "university", "id": university.id}]
+	r = await client.post("/admin/moderate", json={"action": "reject", "items": items}, headers=admin)
+	assert r.status_code == 200, r.text
+	report = await stats.run(write=False)
+	assert (report["drifted"], report["orphans"]) == (0, 0)
@@ -0,0 +1,19 @@
+import pytest
+from app.pagination import encode_cursor
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("values", [["x", "y"], [1.5, 2.5], [1, True], [{"dt": "yesterday"}, 1], [1]])
+async def test_mistyped_cursor_is_rejected(client, values):
+	r = await client.get("/notes", params={"cursor": encode_cursor(values)})
+	assert r.status_code == 400, r.text
+
+
+async def test_cursor_round_trips(client, approved_note):
+	for i in range(3):
+		await approved_note(f"Paged {i}")
+	page = (await client.get("/notes", params={"limit": 1})).json()
+	r = await client.get("/notes", params={"limit": 1, "cursor": page["next_cursor"]})
+	assert r.status_code == 200, r.text
+	assert r.json()["items"][0]["id"] != page["items"][0]["id"]
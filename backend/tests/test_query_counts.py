@@ -0,0 +1,155 @@
+"""
+List endpoints must issue the same number of statements however many rows they return:
+each case grows its data from 1 to 50 rows and compares the counts (app.querycount).
+"""
+import itertools
+import pytest
+from app import dashboard, database, hierarchy, models
+from app.querycount import assert_constant_queries
+
+pytestmark = pytest.mark.anyio
+
+_names = itertools.count()
+
+
+@pytest.fixture(scope="module")
+async def world(client):
+	"""An approved university with one faculty/field/subject, a note, and three authors."""
+	async with database.SessionLocal() as db:
+		university = models.University(name="Query U", city="Kraków", region="małopolskie", is_approved=True)
+		db.add(university)
+		await db.flush()
+		users = [models.User(email=f"qc{i}@colloq-tests.pl", hashed_password="-", university_id=university.id)
+		         for i in range(3)]
+		faculty = models.Faculty(name="Query F", university_id=university.id, is_approved=True)
+		db.add_all([*users, faculty])
+		await db.flush()
+		field = models.FieldOfStudy(name="Query FoS", faculty_id=faculty.id, is_approved=True)
+		db.add(field)
+		await db.flush()
+		subject = models.Subject(name="Query S", semester=1, field_of_study_id=field.id, is_approved=True)
+		db.add(subject)
+		await db.flush()
+		note = models.Note(title="Query N", university_id=university.id, subject_id=subject.id,
+		                   author_id=users[0].id, is_approved=True)
+		db.add(note)
+		await db.commit()
+		return {"university": university.id, "subject": subject.id, "note": note.id, "users": [u.id for u in users]}
+
+
+def grower(make):
+	"""grow(size) adding make(i, db) rows until `size` have been made, then dropping response caches."""
+	made = 0
+
+	async def grow(size):
+		nonlocal made
+		async with database.SessionLocal() as db:
+			for i in range(made, size):
+				await make(i, db)
+			await db.commit()
+		made = size
+		hierarchy.bump()
+		dashboard.cache.clear()
+	return grow
+
+
+async def _check(client, path, params, headers, make):
+	async def call():
+		r = await client.get(path, params=params, headers=headers)
+		assert r.status_code == 200, r.text
+	await call()  # warm per-process caches (current user, prepared state) before counting
+	await assert_constant_queries(database.engine, call, grower(make))
+
+
+def _add(*rows):
+	async def make(i, db):
+		db.add_all(row(i) for row in rows)
+	return make
+
+
+async def test_notes(client, world):
+	u, s, authors = world["university"], world["subject"], world["users"]
+	make = _add(lambda i: models.Note(title=f"kwadratura {i}", university_id=u, subject_id=s,
+	                                  author_id=authors[i % 3], is_approved=True))
+	await _check(client, "/notes", {"university_id": u}, None, make)
+
+
+async def test_notes_search(client, world):
+	u, s, authors = world["university"], world["subject"], world["users"]
+	make = _add(lambda i: models.Note(title=f"trapezy {i}", university_id=u, subject_id=s,
+	                                  author_id=authors[i % 3], is_approved=True))
+	await _check(client, "/notes", {"search": "trapezy"}, None, make)
+
+
+async def test_comments(client, world):
+	authors, note = world["users"], world["note"]
+	make = _add(lambda i: models.Comment(note_id=note, user_id=authors[i % 3], content=f"comment {i}"))
+	await _check(client, f"/notes/{note}/comments", {}, None, make)
+
+
+async def test_reviews(client, world):
+	u, authors = world["university"], world["users"]
+	make = _add(lambda i: models.Review(university_id=u, user_id=authors[i % 3], rating=i % 5 + 1, content="ok"))
+	await _check(client, f"/universities/{u}/reviews", {}, None, make)
+
+
+async def test_universities(client, world):
+	make = _add(lambda i: models.University(name=f"U{next(_names)}", city="X", region="Y", is_approved=True))
+	await _check(client, "/universities", {}, None, make)
+
+
+def _add_branch(university_id, approved, submitter=None):
+	async def make(i, db):
+		faculty = models.Faculty(name=f"F{i}", university_id=university_id, is_approved=approved, submitted_by_id=submitter)
+		db.add(faculty)
+		await db.flush()
+		field = models.FieldOfStudy(name=f"Algebra {i}", faculty_id=faculty.id, is_approved=approved,
+		                            submitted_by_id=submitter)
+		db.add(field)
+		await db.flush()
+		db.add(models.Subject(name=f"Algebra {i}", semester=i % 7 + 1, field_of_study_id=field.id,
+		                      is_approved=approved, submitted_by_id=submitter))
+	return make
+
+
+async def test_university_tree(client, world):
+	u = world["university"]
+	await _check(client, f"/universities/{u}/tree", {}, None, _add_branch(u, True))
+
+
+async def test_faculties(client, world):
+	u = world["university"]
+	await _check(client, f"/universities/{u}/faculties", {}, None, _add_branch(u, True))
+
+
+async def test_global_search(client, world):
+	await _check(client, "/search/global", {"q": "algebra"}, None, _add_branch(world["university"], True))
+
+
+async def test_pending_items(client, world, admin):
+	u, s, authors = world["university"], world["subject"], world["users"]
+	branch = _add_branch(u, False, authors[1])
+
+	async def make(i, db):
+		await branch(i, db)
+		db.add_all([
+			models.University(name=f"U{next(_names)}", city="X", region="Y", submitted_by_id=authors[1]),
+			models.Note(title=f"pending {i}", university_id=u, subject_id=s, author_id=authors[1]),
+			models.UniversityImageRequest(university_id=u, new_image_url=f"/img/{i}.png", submitted_by_id=authors[1]),
+		])
+	await _check(client, "/admin/pending_items", {}, admin, make)
+
+
+async def test_dashboard(client, world, user):
+	me = (await client.get("/users/me", headers=user)).json()["id"]
+	u, s, authors = world["university"], world["subject"], world["users"]
+	branch = _add_branch(u, False, me)
+
+	async def make(i, db):
+		await branch(i, db)
+		mine = models.Note(title=f"mine {i}", university_id=u, subject_id=s, author_id=me, is_approved=i % 2 == 0)
+		theirs = models.Note(title=f"theirs {i}", university_id=u, subject_id=s, author_id=authors[i % 3], is_approved=True)
+		db.add_all([mine, theirs])
+		await db.flush()
+		db.add(models.Favorite(user_id=me, note_id=theirs.id))
+	await _check(client, "/users/me/dashboard", {}, user, make)
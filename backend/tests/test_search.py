@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy import select
+from app import database, fulltext, models
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("forms", [
+	("całek", "całki", "całka", "całkami"),
+	("wyjątek", "wyjątku", "wyjątków"),
+	("koniec", "końca"),
+	("równań", "równania", "równanie"),
+])
+def test_inflections_share_a_stem(forms):
+	assert len({fulltext.stem(fulltext.fold(f)) for f in forms}) == 1
+
+
+async def test_inflected_query_finds_note(client, admin):
+	r = await client.post("/notes", data={"university_id": 1, "subject_id": 1, "title": "Całki oznaczone",
+	                                      "content": "Przykłady całki przez części"}, headers=admin)
+	assert r.status_code == 201
+	async with database.SessionLocal() as db:
+		note_id = await db.scalar(select(models.Note.id).where(models.Note.title == "Całki oznaczone"))
+	await client.post("/admin/moderate", json={"action": "approve", "items": [{"type": "note", "id": note_id}]},
+	                  headers=admin)
+
+	for query in ("całek", "całka", "calki"):
+		items = (await client.get("/notes", params={"search": query})).json()["items"]
+		assert note_id in [n["id"] for n in items], query
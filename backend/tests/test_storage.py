@@ -0,0 +1,68 @@
+import io
+import os
+from datetime import datetime, timezone
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import select, update
+from app import database, models, storage
+
+pytestmark = pytest.mark.anyio
+
+
+async def _upload_note(client, headers, filename, data):
+	r = await client.post("/notes", data={"university_id": 1, "subject_id": 1, "title": filename},
+	                      files={"image": (filename, data, "application/octet-stream")}, headers=headers)
+	assert r.status_code == 201, r.text
+	async with database.SessionLocal() as db:
+		return await db.scalar(select(models.Note.image_url).where(models.Note.title == filename))
+
+
+async def test_same_content_under_other_extensions_shares_one_blob(client, user):
+	data = os.urandom(4096)
+	urls = {await _upload_note(client, user, name, data) for name in ("scan.pdf", "scan.PDF", "scan.bin", "scan")}
+	assert len(urls) == 1
+	url = urls.pop()
+	assert url.endswith(".pdf")
+	async with database.SessionLocal() as db:
+		blob = await db.scalar(select(models.Blob).where(models.Blob.url == url))
+	assert blob.refcount == 4
+	blob_dir = os.path.dirname(storage.path_for_url(url))
+	assert [n for n in os.listdir(blob_dir) if not n.endswith(".gz")] == [os.path.basename(url)]
+
+
+async def test_reupload_restarts_gc_grace(client, user):
+	data = os.urandom(2048)
+	url = await _upload_note(client, user, "old.png.bin", data)
+	async with database.SessionLocal() as db:
+		await db.execute(update(models.Blob).where(models.Blob.url == url)
+		                 .values(refcount=0, created_at=datetime(2000, 1, 1, tzinfo=timezone.utc)))
+		await db.commit()
+	# Stored again, but the row that will reference it is not committed yet
+	async with database.SessionLocal() as db:
+		assert await storage.store(db, UploadFile(io.BytesIO(data), filename="again.bin")) == url
+		await db.commit()
+	await storage.gc()
+	async with database.SessionLocal() as db:
+		assert await db.scalar(select(models.Blob.hash).where(models.Blob.url == url))
+	assert os.path.exists(storage.path_for_url(url))
+
+
+async def test_oversized_upload_refused(client, user):
+	too_big = b"x" * (storage.MAX_UPLOAD_BYTES + storage.UPLOAD_OVERHEAD + 1)
+	r = await client.post("/notes", data={"university_id": 1, "subject_id": 1},
+	                      files={"image": ("big.bin", too_big)}, headers=user)
+	assert r.status_code == 413
+	r = await client.post("/notes", data={"university_id": 1, "subject_id": 1},
+	                      files={"image": ("big.bin", b"x" * (storage.MAX_UPLOAD_BYTES + 1))}, headers=user)
+	assert r.status_code == 413
+
+
+async def test_rolled_back_upload_leaves_no_file(client):
+	data = os.urandom(1024)
+	async with database.SessionLocal() as db:
+		url = await storage.store(db, UploadFile(io.BytesIO(data), filename="draft.bin"))
+		await db.rollback()
+	assert not os.path.exists(storage.path_for_url(url))
+	assert not os.listdir(storage.TMP_DIR)
+	async with database.SessionLocal() as db:
+		assert await db.scalar(select(models.Blob.hash).where(models.Blob.url == url)) is None
@@ -0,0 +1,24 @@
+import pytest
+from app import hierarchy
+
+pytestmark = pytest.mark.anyio
+
+
+async def _stats(client, university_id=1) -> dict:
+	return (await client.get(f"/universities/{university_id}")).json()["stats"]
+
+
+async def test_register_and_review_refresh_only_that_university(client, user):
+	before, version = await _stats(client), hierarchy.version()
+	r = await client.post("/register", json={"user": {"email": "newcomer@colloq-tests.pl", "password": "password1",
+	                                                   "university_id": 1}})
+	assert r.status_code == 201, r.text
+	assert (await _stats(client))["user_count"] == before["user_count"] + 1
+
+	r = await client.post("/reviews", json={"university_id": 1, "rating": 4, "content": "ok"}, headers=user)
+	assert r.status_code == 200, r.text
+	after = await _stats(client)
+	assert after["review_count"] == before["review_count"] + 1
+	listed = next(u for u in (await client.get("/universities")).json() if u["id"] == 1)
+	assert listed["stats"] == after
+	assert hierarchy.version() == version
@@ -1,7 +1,7 @@
-import React, { useState } from 'react';
-import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
+import React, { useEffect, useState } from 'react';
+import { useInfiniteQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { X, Send } from 'lucide-react';
-import { getNoteComments, addComment, Comment, API_URL } from '../utils/api';
+import { getNoteCommentsPage, addComment, subscribeEvents, API_URL } from '../utils/api';
 
 interface NoteModalProps { note: any; onClose: () => void; }
 
@@ -9,10 +9,19 @@ export const NoteModal: React.FC<NoteModalProps> = ({ note, onClose }) => {
   const [newComment, setNewComment] = useState('');
   const queryClient = useQueryClient();
 
-  const { data: comments } = useQuery<Comment[]>({
+  // Pages come newest first; shown oldest first, with earlier pages loaded above
+  const { data, hasNextPage, fetchNextPage, isFetchingNextPage } = useInfiniteQuery({
     queryKey: ['comments', note.id],
-    queryFn: () => getNoteComments(note.id),
+    queryFn: ({ pageParam }) => getNoteCommentsPage(note.id, pageParam),
+    initialPageParam: undefined as string | undefined,
+    getNextPageParam: (last) => last.next_cursor ?? undefined,
   });
+  const comments = data?.pages.flatMap((p) => p.items).reverse();
+
+  // New comments arrive as events instead of by polling
+  useEffect(() => subscribeEvents(`/notes/${note.id}/events`, (type) => {
+    if (type === 'comment' || type === 'resync') queryClient.invalidateQueries({ queryKey: ['comments', note.id] });
+  }), [note.id, queryClient]);
 
   const commentMutation = useMutation({
     mutationFn: (content: string) => addComment(note.id, content),
@@ -33,6 +42,11 @@ export const NoteModal: React.FC<NoteModalProps> = ({ note, onClose }) => {
         <div className="w-full md:w-1/3 h-full flex flex-col bg-base-200/50">
           <div className="p-4 border-b font-bold">Comments</div>
           <div className="flex-1 overflow-y-auto p-4 space-y-4">
+            {hasNextPage && (
+              <button onClick={() => fetchNextPage()} className="btn btn-ghost btn-xs w-full" disabled={isFetchingNextPage}>
+                {isFetchingNextPage ? 'Loading...' : 'Show earlier comments'}
+              </button>
+            )}
             {comments?.map((c) => (
               <div key={c.id} className="chat chat-start">
                 <div className="chat-header text-xs opacity-50 mb-1">{c.user.username}</div>
@@ -1,9 +1,9 @@
 import React, { useState, useRef } from 'react';
-import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
+import { useInfiniteQuery, useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { ShieldCheck, FileText, GraduationCap, Building, Layers, BookOpen, Camera, Check, X, Edit } from 'lucide-react';
 import {
-  getPendingItems, approveImageRequest, rejectImageRequest, rejectItem, approveItem,
-  updateUniversityImage, API_URL, type PendingItems
+  getPendingPage, getPendingCounts, approveImageRequest, rejectImageRequest, rejectItem, approveItem,
+  updateUniversityImage, API_URL
 } from '../utils/api';
 
 type TabType = 'universities' | 'faculties' | 'fields' | 'subjects' | 'notes' | 'images';
@@ -20,6 +20,9 @@ const getApiType = (tab: TabType): string => {
   }
 };
 
+// Queue names of /admin/pending/{type} and /admin/pending_counts
+const getQueueType = (tab: TabType): string => tab === 'images' ? 'image_request' : getApiType(tab);
+
 // FIX: Add t prop
 export function AdminPage({ t }: { t: any }) {
   const [activeTab, setActiveTab] = useState<TabType>('notes');
@@ -28,10 +31,19 @@ export function AdminPage({ t }: { t: any }) {
   const fileInputRef = useRef<HTMLInputElement>(null);
   const [editingUniId, setEditingUniId] = useState<number | null>(null);
 
-  const { data: pending, isLoading } = useQuery<PendingItems>({
-    queryKey: ['pending'],
-    queryFn: getPendingItems
+  // Only the open tab's queue is fetched, a page at a time; the badges come from the counts
+  const { data: counts } = useQuery({
+    queryKey: ['pending', 'counts'],
+    queryFn: getPendingCounts
+  });
+
+  const queue = useInfiniteQuery({
+    queryKey: ['pending', getQueueType(activeTab)],
+    queryFn: ({ pageParam }) => getPendingPage(getQueueType(activeTab), pageParam),
+    initialPageParam: undefined as string | undefined,
+    getNextPageParam: (last) => last.next_cursor ?? undefined,
   });
+  const items = queue.data?.pages.flatMap((p) => p.items);
 
   const approveMutation = useMutation({
     mutationFn: ({type, id}: {type: string, id: number}) => approveItem(type, id),
@@ -57,15 +69,13 @@ export function AdminPage({ t }: { t: any }) {
     }
   });
 
-  if (isLoading) return <div className="p-20 text-center">Loading...</div>;
-
   const tabs = [
-    { id: 'notes', icon: FileText, label: 'Notes', list: pending?.notes },
-    { id: 'universities', icon: GraduationCap, label: 'Universities', list: pending?.universities },
-    { id: 'faculties', icon: Building, label: 'Faculties', list: pending?.faculties },
-    { id: 'fields', icon: Layers, label: 'Fields', list: pending?.fields },
-    { id: 'subjects', icon: BookOpen, label: 'Subjects', list: pending?.subjects },
-    { id: 'images', icon: Camera, label: 'Images', list: pending?.image_requests }
+    { id: 'notes', icon: FileText, label: 'Notes' },
+    { id: 'universities', icon: GraduationCap, label: 'Universities' },
+    { id: 'faculties', icon: Building, label: 'Faculties' },
+    { id: 'fields', icon: Layers, label: 'Fields' },
+    { id: 'subjects', icon: BookOpen, label: 'Subjects' },
+    { id: 'images', icon: Camera, label: 'Images' }
   ];
 
   return (
@@ -81,7 +91,7 @@ export function AdminPage({ t }: { t: any }) {
               className={`tab ${activeTab === t.id ? 'tab-active' : ''}`}
               onClick={() => setActiveTab(t.id as any)}
             >
-                <t.icon size={16} className="mr-2"/> {t.label} ({t.list?.length || 0})
+                <t.icon size={16} className="mr-2"/> {t.label} ({counts?.[getQueueType(t.id as TabType)] || 0})
             </a>
         ))}
       </div>
@@ -94,8 +104,10 @@ export function AdminPage({ t }: { t: any }) {
       />
 
       <div className="space-y-2">
+        {queue.isLoading && <div className="p-20 text-center">Loading...</div>}
+
         {activeTab === 'images' ? (
-            pending?.image_requests.map((req: any) => (
+            items?.map((req: any) => (
                 <div key={req.id} className="card bg-base-100 shadow p-4 flex-col md:flex-row gap-4 items-center border border-base-200">
                     <div className="relative group cursor-pointer" onClick={() => setSelectedImage(`${API_URL}${req.new_image_url}`)}>
                       <img src={`${API_URL}${req.new_image_url}`} className="w-24 h-24 object-cover rounded-lg border-2 border-success"/>
@@ -113,7 +125,7 @@ export function AdminPage({ t }: { t: any }) {
                 </div>
             ))
         ) : (
-            (pending as any)?.[activeTab]?.map((item: any) => (
+            items?.map((item: any) => (
                 <div key={item.id} className="card bg-base-100 shadow p-4 flex-col md:flex-row justify-between items-center border border-base-200 gap-4">
                     <div className="flex gap-4 items-center w-full">
                         {activeTab === 'universities' && (
@@ -152,7 +164,13 @@ export function AdminPage({ t }: { t: any }) {
             ))
         )}
 
-        {(activeTab === 'images' ? pending?.image_requests : (pending as any)?.[activeTab])?.length === 0 && (
+        {queue.hasNextPage && (
+          <button onClick={() => queue.fetchNextPage()} className="btn btn-outline w-full" disabled={queue.isFetchingNextPage}>
+            {queue.isFetchingNextPage ? 'Loading...' : 'Load more'}
+          </button>
+        )}
+
+        {items?.length === 0 && (
           <div className="text-center py-16 opacity-50 border-2 border-dashed border-base-300 rounded-xl">
             <Check size={48} className="mx-auto mb-2 opacity-20"/>
             <p>All clean! Nothing pending here.</p>
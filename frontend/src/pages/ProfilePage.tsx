@@ -1,6 +1,17 @@
 import React, { useState, useRef } from 'react';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
-import { getCurrentUser, updateProfile, type User } from '../utils/api';
+import { getCurrentUser, getDashboard, updateProfile, type Note, type User, type UserDashboard } from '../utils/api';
+
+const NoteList: React.FC<{ title: string; notes: Note[] }> = ({ title, notes }) => (
+  <div>
+    <h3 className="text-xl font-bold mb-3">{title}</h3>
+    {notes.length === 0 ? <p className="text-base-content/50">—</p> : (
+      <ul className="space-y-2">
+        {notes.map(n => <li key={n.id} className="flex justify-between"><span>{n.title}</span><span className="badge">{n.score}</span></li>)}
+      </ul>
+    )}
+  </div>
+);
 
 // FIX: Add t prop
 const ProfilePage: React.FC<{ t: any }> = ({ t }) => {
@@ -12,6 +23,12 @@ const ProfilePage: React.FC<{ t: any }> = ({ t }) => {
     queryFn: getCurrentUser,
   });
 
+  const { data: dashboard } = useQuery<UserDashboard>({
+    queryKey: ['dashboard'],
+    queryFn: () => getDashboard(),
+    enabled: !!user,
+  });
+
   const [username, setUsername] = useState('');
   const [bio, setBio] = useState('');
   const [avatarFile, setAvatarFile] = useState<File | null>(null);
@@ -29,6 +46,7 @@ const ProfilePage: React.FC<{ t: any }> = ({ t }) => {
     mutationFn: updateProfile,
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ['currentUser'] });
+      queryClient.invalidateQueries({ queryKey: ['dashboard'] });
       alert('Profile updated successfully! ✅');
       setAvatarFile(null);
       if (fileInputRef.current) {
@@ -131,6 +149,25 @@ const ProfilePage: React.FC<{ t: any }> = ({ t }) => {
             </form>
           </div>
         </div>
+
+        {dashboard && (
+          <div className="card bg-base-100/50 backdrop-blur-xl shadow-2xl mt-8">
+            <div className="card-body p-8 grid md:grid-cols-2 gap-8">
+              <NoteList title="My notes" notes={dashboard.my_notes.items} />
+              <NoteList title="Favorites" notes={dashboard.my_favorites.items} />
+              {dashboard.pending_submissions.length > 0 && (
+                <div className="md:col-span-2">
+                  <h3 className="text-xl font-bold mb-3">Awaiting approval</h3>
+                  <ul className="space-y-1">
+                    {dashboard.pending_submissions.map(p => (
+                      <li key={`${p.type}-${p.id}`}><span className="badge badge-warning mr-2">{p.type}</span>{p.name}</li>
+                    ))}
+                  </ul>
+                </div>
+              )}
+            </div>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -1,8 +1,8 @@
 import React, { useState, useEffect } from 'react';
-import { useQuery } from '@tanstack/react-query';
+import { useInfiniteQuery } from '@tanstack/react-query';
 import { Link } from 'react-router-dom';
 import { Search, BookOpen, GraduationCap, ArrowRight, Library, Building2 } from 'lucide-react';
-import { globalSearch } from '../utils/api';
+import { globalSearch, type SearchResult } from '../utils/api';
 
 // Simple debounce hook
 function useDebounceValue<T>(value: T, delay: number): T {
@@ -22,11 +22,26 @@ export function TermPage({ t }: TermPageProps) {
   const [query, setQuery] = useState("");
   const debouncedQuery = useDebounceValue(query, 500);
 
-  const { data: results, isLoading } = useQuery({
+  // Both lists advance together; once one runs out (cursor null) its later pages are ignored
+  const search = useInfiniteQuery({
     queryKey: ['globalSearch', debouncedQuery],
-    queryFn: () => globalSearch(debouncedQuery),
+    queryFn: ({ pageParam }) => globalSearch(debouncedQuery, pageParam),
+    initialPageParam: undefined as SearchResult['next_cursor'] | undefined,
+    getNextPageParam: (last, _, param) => {
+      const next = {
+        fields: param && !param.fields ? null : last.next_cursor.fields,
+        subjects: param && !param.subjects ? null : last.next_cursor.subjects,
+      };
+      return next.fields || next.subjects ? next : undefined;
+    },
     enabled: debouncedQuery.length > 1
   });
+  const { isLoading } = search;
+  const params = search.data?.pageParams ?? [];
+  const results = search.data && {
+    fields: search.data.pages.flatMap((p, i) => (i === 0 || params[i]?.fields ? p.fields : [])),
+    subjects: search.data.pages.flatMap((p, i) => (i === 0 || params[i]?.subjects ? p.subjects : [])),
+  };
 
   return (
     <div className="min-h-screen bg-base-200 p-6 md:p-12 animate-in fade-in">
@@ -125,6 +140,14 @@ export function TermPage({ t }: TermPageProps) {
               </section>
             )}
 
+            {search.hasNextPage && (
+              <div className="text-center">
+                <button onClick={() => search.fetchNextPage()} className="btn btn-outline" disabled={search.isFetchingNextPage}>
+                  {search.isFetchingNextPage ? 'Loading...' : 'Load more'}
+                </button>
+              </div>
+            )}
+
             {results.subjects.length === 0 && results.fields.length === 0 && debouncedQuery.length > 1 && (
               <div className="text-center py-12 opacity-50">
                 <Search size={48} className="mx-auto mb-4 opacity-20"/>
@@ -1,12 +1,12 @@
-import React, { useState, useRef } from 'react';
+import React, { useEffect, useState, useRef } from 'react';
 import { useParams } from 'react-router-dom';
-import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
+import { useInfiniteQuery, useQuery, useMutation, useQueryClient, type InfiniteData } from '@tanstack/react-query';
 import { Award, Building2, Edit, Search, ThumbsUp, Heart, MapPin, Star } from 'lucide-react';
 import {
   API_URL,
-  getUniversity, getFaculties, getNotes, getUniversityReviews,
-  requestUniversityImageChange, voteNote, toggleFavorite, addReview,
-  type University, type Faculty
+  getUniversity, getFaculties, getNotesPage, getUniversityReviewsPage,
+  requestUniversityImageChange, voteNote, toggleFavorite, addReview, subscribeEvents,
+  type University, type Faculty, type Note, type Page
 } from '../utils/api';
 import { AddNoteModal } from '../components/addNoteModal';
 import { AddFacultyModal } from '../components/AddFacultyModal';
@@ -57,8 +57,35 @@ export function UniversityPage({ t }: { t: any }) {
 
   const { data: university } = useQuery<University>({ queryKey: ['university', uniId], queryFn: () => getUniversity(uniId) });
   const { data: faculties } = useQuery<Faculty[]>({ queryKey: ['faculties', uniId], queryFn: () => getFaculties(uniId) });
-  const { data: notes } = useQuery({ queryKey: ['notes', uniId, search], queryFn: () => getNotes(uniId, search) });
-  const { data: reviews } = useQuery({ queryKey: ['reviews', uniId], queryFn: () => getUniversityReviews(uniId) });
+  const notesQuery = useInfiniteQuery({
+    queryKey: ['notes', uniId, search],
+    queryFn: ({ pageParam }) => getNotesPage(uniId, search, pageParam),
+    initialPageParam: undefined as string | undefined,
+    getNextPageParam: (last) => last.next_cursor ?? undefined,
+  });
+  const reviewsQuery = useInfiniteQuery({
+    queryKey: ['reviews', uniId],
+    queryFn: ({ pageParam }) => getUniversityReviewsPage(uniId, pageParam),
+    initialPageParam: undefined as string | undefined,
+    getNextPageParam: (last) => last.next_cursor ?? undefined,
+  });
+  const notes = notesQuery.data?.pages.flatMap((p) => p.items);
+  const reviews = reviewsQuery.data?.pages.flatMap((p) => p.items);
+
+  // Patch note counters in place from live events; refetch only for new notes or after a resync
+  useEffect(() => subscribeEvents(`/universities/${uniId}/events`, (type, data) => {
+    if (type === 'approved' || type === 'resync') {
+      queryClient.invalidateQueries({ queryKey: ['notes', uniId] });
+      return;
+    }
+    const patch = type === 'vote' ? { score: data.score }
+      : type === 'favorite' ? { favorite_count: data.favorite_count }
+      : { comment_count: data.comment_count };
+    queryClient.setQueriesData<InfiniteData<Page<Note>>>({ queryKey: ['notes', uniId] }, (old) => old && {
+      ...old,
+      pages: old.pages.map((p) => ({ ...p, items: p.items.map((n) => (n.id === data.note_id ? { ...n, ...patch } : n)) })),
+    });
+  }), [uniId, queryClient]);
 
   const imageReqMutation = useMutation({
     mutationFn: (file: File) => requestUniversityImageChange(uniId, file),
@@ -153,6 +180,13 @@ export function UniversityPage({ t }: { t: any }) {
                       </div>
                     )}
                 </div>
+                {notesQuery.hasNextPage && (
+                  <div className="text-center mt-8">
+                    <button onClick={() => notesQuery.fetchNextPage()} className="btn btn-outline" disabled={notesQuery.isFetchingNextPage}>
+                      {notesQuery.isFetchingNextPage ? 'Loading...' : 'Load more'}
+                    </button>
+                  </div>
+                )}
             </div>
         )}
 
@@ -189,6 +223,11 @@ export function UniversityPage({ t }: { t: any }) {
                         </div>
                     ))}
                     {reviews?.length === 0 && <p className="opacity-50 text-center py-10">No reviews yet.</p>}
+                    {reviewsQuery.hasNextPage && (
+                      <button onClick={() => reviewsQuery.fetchNextPage()} className="btn btn-outline w-full" disabled={reviewsQuery.isFetchingNextPage}>
+                        {reviewsQuery.isFetchingNextPage ? 'Loading...' : 'Load more reviews'}
+                      </button>
+                    )}
                 </div>
             </div>
         )}
@@ -208,7 +247,7 @@ export function UniversityPage({ t }: { t: any }) {
                         </div>
                         <div className="stat">
                             <div className="stat-title">Notes</div>
-                            <div className="stat-value">{notes?.length || 0}</div>
+                            <div className="stat-value">{university.stats?.note_count ?? notes?.length ?? 0}</div>
                         </div>
                     </div>
                 </div>
@@ -1,6 +1,6 @@
 import axios from 'axios';
 import { jwtDecode } from "jwt-decode";
-import { University, Faculty, FieldOfStudy, Subject, Note, User, Review, Comment, PendingItems } from './types';
+import { University, Faculty, FieldOfStudy, Subject, Note, User, Review, Comment } from './types';
 
 // Export types so components can use them directly
 export * from './types';
@@ -30,6 +30,13 @@ export interface GlobalSubject {
 export interface SearchResult {
   fields: GlobalField[];
   subjects: GlobalSubject[];
+  next_cursor: { fields: string | null; subjects: string | null };
+}
+
+// Keyset-paginated list responses
+export interface Page<T> {
+  items: T[];
+  next_cursor: string | null;
 }
 
 export const getAuthHeader = () => {
@@ -75,6 +82,26 @@ export const updateProfile = async (data: any) => {
   return await axios.put(`${API_URL}/users/me`, fd, { headers: { ...getAuthHeader(), 'Content-Type': 'multipart/form-data' } });
 };
 
+export interface PendingSubmission {
+  type: 'note' | 'university' | 'faculty' | 'field' | 'subject';
+  id: number;
+  name: string | null;
+}
+
+export interface UserDashboard {
+  my_notes: Page<Note>;
+  my_favorites: Page<Note>;
+  pending_submissions: PendingSubmission[];
+}
+
+// One request for the profile page; the two note lists page independently
+export const getDashboard = async (notesCursor?: string, favoritesCursor?: string): Promise<UserDashboard> => {
+  const params: any = {};
+  if (notesCursor) params.notes_cursor = notesCursor;
+  if (favoritesCursor) params.favorites_cursor = favoritesCursor;
+  return (await axios.get(`${API_URL}/users/me/dashboard`, { params, headers: getAuthHeader() })).data;
+};
+
 // --- DATA FETCHING ---
 export const getUniversities = async (): Promise<University[]> => (await axios.get(`${API_URL}/universities`)).data;
 export const getUniversity = async (id: number): Promise<University> => (await axios.get(`${API_URL}/universities/${id}`)).data;
@@ -82,16 +109,31 @@ export const getFaculties = async (id: number): Promise<Faculty[]> => (await axi
 export const getFields = async (id: number): Promise<FieldOfStudy[]> => (await axios.get(`${API_URL}/faculties/${id}/fields`)).data;
 export const getSubjects = async (id: number): Promise<Subject[]> => (await axios.get(`${API_URL}/fields/${id}/subjects`)).data;
 
-export const getNotes = async (uniId?: number, search?: string): Promise<Note[]> => {
+export interface UniversityTree {
+  university_id: number;
+  semester: number | null;
+  faculties: (Faculty & { fields: (FieldOfStudy & { subjects: Subject[] })[] })[];
+}
+// Whole approved syllabus in one request, optionally for a single semester
+export const getUniversityTree = async (id: number, semester?: number): Promise<UniversityTree> =>
+  (await axios.get(`${API_URL}/universities/${id}/tree`, { params: { semester } })).data;
+
+export const getNotesPage = async (uniId?: number, search?: string, cursor?: string, sort?: 'top' | 'hot'): Promise<Page<Note>> => {
   const params = new URLSearchParams();
   if (uniId) params.append('university_id', uniId.toString());
   if (search) params.append('search', search);
+  if (sort) params.append('sort', sort);
+  if (cursor) params.append('cursor', cursor);
   return (await axios.get(`${API_URL}/notes?${params.toString()}`)).data;
 };
 
 // --- GLOBAL SEARCH (MVP TERM) ---
-export const globalSearch = async (query: string): Promise<SearchResult> => {
-  return (await axios.get(`${API_URL}/search/global?q=${encodeURIComponent(query)}`)).data;
+// Pass the previous page's next_cursor; a list whose cursor is null comes back from its first page again
+export const globalSearch = async (query: string, cursor?: SearchResult['next_cursor']): Promise<SearchResult> => {
+  const params: any = { q: query };
+  if (cursor?.fields) params.fields_cursor = cursor.fields;
+  if (cursor?.subjects) params.subjects_cursor = cursor.subjects;
+  return (await axios.get(`${API_URL}/search/global`, { params })).data;
 };
 
 // --- CREATION & UPLOADS ---
@@ -125,14 +167,22 @@ export const createSubject = async (data: { name: string, semester: number, fiel
 export const voteNote = async (id: number) => (await axios.post(`${API_URL}/notes/${id}/vote`, {}, { headers: getAuthHeader() })).data;
 export const toggleFavorite = async (id: number) => (await axios.post(`${API_URL}/notes/${id}/favorite`, {}, { headers: getAuthHeader() })).data;
 
-export const getUniversityReviews = async (id: number): Promise<Review[]> => (await axios.get(`${API_URL}/universities/${id}/reviews`)).data;
+// Newest first; pass the previous page's next_cursor for older reviews
+export const getUniversityReviewsPage = async (id: number, cursor?: string): Promise<Page<Review>> =>
+  (await axios.get(`${API_URL}/universities/${id}/reviews`, { params: { cursor } })).data;
 export const addReview = async (data: any) => await axios.post(`${API_URL}/reviews`, data, { headers: getAuthHeader() });
 
-export const getNoteComments = async (id: number): Promise<Comment[]> => (await axios.get(`${API_URL}/notes/${id}/comments`)).data;
+// Newest first, so a new comment is always on the first page; next_cursor leads to older ones
+export const getNoteCommentsPage = async (id: number, cursor?: string): Promise<Page<Comment>> =>
+  (await axios.get(`${API_URL}/notes/${id}/comments`, { params: { order: 'newest', cursor } })).data;
 export const addComment = async (id: number, content: string) => await axios.post(`${API_URL}/notes/${id}/comments`, { content }, { headers: getAuthHeader() });
 
 // --- ADMIN ---
-export const getPendingItems = async (): Promise<PendingItems> => (await axios.get(`${API_URL}/admin/pending_items`, { headers: getAuthHeader() })).data;
+// One queue (note, university, faculty, field, subject or image_request), oldest first
+export const getPendingPage = async (type: string, cursor?: string): Promise<Page<any>> =>
+  (await axios.get(`${API_URL}/admin/pending/${type}`, { params: { cursor }, headers: getAuthHeader() })).data;
+export const getPendingCounts = async (): Promise<Record<string, number>> =>
+  (await axios.get(`${API_URL}/admin/pending_counts`, { headers: getAuthHeader() })).data;
 export const approveItem = async (type: string, id: number) => (await axios.post(`${API_URL}/admin/approve/${type}/${id}`, {}, { headers: getAuthHeader() })).data;
 export const rejectItem = async (type: string, id: number) => (await axios.delete(`${API_URL}/admin/reject/${type}/${id}`, { headers: getAuthHeader() })).data;
 export const approveImageRequest = async (id: number) => (await axios.post(`${API_URL}/admin/approve_image_request/${id}`, {}, { headers: getAuthHeader() })).data;
@@ -146,4 +196,15 @@ export const updateUniversity = async (id: number, data: any) => {
   if (data.description) fd.append('description', data.description);
   if (data.banner) fd.append('banner', data.banner);
   return await axios.put(`${API_URL}/universities/${id}`, fd, { headers: { ...getAuthHeader(), 'Content-Type': 'multipart/form-data' } });
-};
\ No newline at end of file
+};
+
+// Live updates (Server-Sent Events) from /notes/{id}/events or /universities/{id}/events; returns a close function.
+// "resync" means events were dropped for this client and it should refetch.
+export const LIVE_EVENTS = ['vote', 'favorite', 'comment', 'approved', 'resync'] as const;
+export const subscribeEvents = (path: string, onEvent: (type: typeof LIVE_EVENTS[number], data: any) => void): (() => void) => {
+  const source = new EventSource(`${API_URL}${path}`);
+  for (const type of LIVE_EVENTS) {
+    source.addEventListener(type, (e) => onEvent(type, JSON.parse((e as MessageEvent).data)));
+  }
+  return () => source.close();
+};
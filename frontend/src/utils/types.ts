@@ -1,15 +1,28 @@
 // Centralized type definitions to avoid "Property does not exist" errors
+
+// Responsive derivatives of an uploaded image: format -> width -> url
+export type ImageVariants = Record<string, Record<string, string>>;
+
 export interface User {
   id: number;
   email: string;
   username: string; // Mapped from backend 'nickname'
   bio?: string;
   avatar_url?: string;
+  avatar_variants?: ImageVariants | null;
   is_admin: boolean;
   is_verified: boolean;
   created_at: string;
 }
 
+export interface UniversityStats {
+  rating_histogram: number[]; // reviews with 1..5 stars
+  review_count: number;
+  average_rating: number | null;
+  note_count: number;
+  user_count: number;
+}
+
 export interface University {
   id: number;
   name: string;
@@ -20,7 +33,10 @@ export interface University {
   description?: string;
   image_url?: string;
   banner_url?: string;
+  image_variants?: ImageVariants | null;
+  banner_variants?: ImageVariants | null;
   is_approved: boolean;
+  stats?: UniversityStats;
   // Optional relations for frontend convenience
   faculties?: Faculty[];
   notes?: Note[];
@@ -52,7 +68,10 @@ export interface Note {
   title?: string;
   content?: string;
   score: number;
+  favorite_count: number;
+  comment_count: number;
   image_url?: string;
+  image_variants?: ImageVariants | null;
   video_url?: string;
   link_url?: string;
   created_at: string;